@@ -6,9 +6,22 @@ from src.customer_service.c2c_websocket import main_binance_c2c
 from src.trading_engine.p2p.automation.ads_updater import update_ads_main
 from src.data.database.populate_database import populate_ads_with_details
 from src.data.database.connection import create_connection, DB_FILE
+from src.data.database.migrations import run_migrations
+from src.data.database.archive import Archiver, ArchiveReader
 from src.data.database.deposits.binance_bank_deposit import PaymentManager
 from src.connectors.binance.api import BinanceAPI
+from src.connectors.asset_balances import BalanceStore
+from src.connectors.binance.wallet_snapshot import WalletSnapshotService
 from src.data.cache.share_data import SharedData, SharedSession
+from src.data.database.operations.write_behind import WriteBehindJournal
+from src.data.cache.user_cache import UserProfileCache
+from src.data.cache.blacklist_index import BlacklistIndex
+from src.data.cache.deposit_ledger import DepositLedger
+from src.data.database.job_queue import JobQueue
+from src.customer_service.completion_jobs import register_completion_jobs
+from src.trading_engine.p2p.payment_verification.ocr_engine import OCREngine
+from src.trading_engine.p2p.payment_verification.receipt_store import ReceiptStore
+from src.trading_engine.p2p.payment_verification.cep_cache import CEPValidationCache
 from src.connectors.bitso.orderbook import start_bitso_order_book
 import logging
 from src.utils.logging_config import setup_logging
@@ -26,6 +39,9 @@ async def main(payment_manager, binance_api):
     tasks = []
     try:
         tasks.append(asyncio.create_task(start_bitso_order_book()))
+        tasks.append(asyncio.create_task(WriteBehindJournal.run()))
+        tasks.append(asyncio.create_task(Archiver.run()))
+        tasks.append(asyncio.create_task((await WalletSnapshotService.get_instance()).run()))
         
         await asyncio.sleep(5)
 
@@ -45,9 +61,16 @@ async def run():
     conn = None
     try:
         conn = await create_connection(DB_FILE)
+        await run_migrations(conn)
         binance_api = await BinanceAPI.get_instance()
         payment_manager = await PaymentManager.get_instance()
         await payment_manager.initialize_payment_account_cache(conn)
+        await UserProfileCache.warm(conn)
+        await BlacklistIndex.load(conn)
+        await DepositLedger.load(conn)
+        job_queue = await JobQueue.get_instance()
+        register_completion_jobs(job_queue)
+        await job_queue.start()
         await populate_ads_with_details(binance_api)
         await main(payment_manager, binance_api)
     except Exception as e:
@@ -55,6 +78,13 @@ async def run():
     finally:
         if conn:
             await conn.close()
+        await WriteBehindJournal.close()
+        await (await JobQueue.get_instance()).close()
+        await (await OCREngine.get_instance()).close()
+        await (await ReceiptStore.get_instance()).close()
+        await (await CEPValidationCache.get_instance()).close()
+        await ArchiveReader.close()
+        await (await BalanceStore.get_instance()).close()
         await SharedData.save_all_ads_to_database()
         await binance_api.close_session() 
         await SharedSession.close_session()
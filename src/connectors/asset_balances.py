@@ -10,237 +10,237 @@ Key Features:
 - Asset aggregation and reporting
 - Async database operations for performance
 - Clean error handling and logging
+
+BalanceStore keeps the latest snapshot of every account in memory and is the
+only writer of the balances tables. A refresh of any number of accounts is
+one transaction: changed rows are written with executemany, and
+total_balances is moved by the per-asset deltas of those rows instead of
+being re-aggregated from the whole table. Reads are served from memory.
 """
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
 
-import sqlite3
-import aiosqlite
-from src.data.database.connection import DB_FILE
+from src.data.database.connection import create_connection, DB_FILE
 import logging
 from src.utils.logging_config import setup_logging
 
 setup_logging(log_filename='binance_main.log')
 logger = logging.getLogger(__name__)
 
-def setup_database():
-    """Initialize database tables for balance tracking"""
-    try:
-        connection = sqlite3.connect(DB_FILE)
-        cursor = connection.cursor()
-        
-        # Create main balances table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS balances (
-                id INTEGER PRIMARY KEY,
-                exchange_id INTEGER,
-                account TEXT,
-                asset TEXT,
-                balance FLOAT,
-                UNIQUE(exchange_id, account, asset)
-            )
-        ''')
-        
-        # Create aggregated balances table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS total_balances (
-                asset TEXT PRIMARY KEY,
-                total_balance FLOAT
+USD_ASSETS = ('USD', 'USDC', 'USDT', 'TUSD', 'DAI', 'FDUSD')
+
+CREATE_BALANCE_TABLES_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS balances (
+        id INTEGER PRIMARY KEY,
+        exchange_id INTEGER,
+        account TEXT,
+        asset TEXT,
+        balance FLOAT,
+        UNIQUE(exchange_id, account, asset)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS total_balances (
+        asset TEXT PRIMARY KEY,
+        total_balance FLOAT
+    )
+    ''',
+]
+
+AccountKey = Tuple[int, str]
+
+
+class BalanceStore:
+    _instance: Optional['BalanceStore'] = None
+    _lock = asyncio.Lock()
+
+    def __init__(self):
+        if self.__class__._instance is not None:
+            raise RuntimeError("This class is a singleton. Use get_instance() instead.")
+        self.conn = None
+        self.balances: Dict[AccountKey, Dict[str, float]] = {}
+        self.totals: Dict[str, float] = {}
+        self.write_lock = asyncio.Lock()
+        self.init_lock = asyncio.Lock()
+
+    @classmethod
+    async def get_instance(cls) -> 'BalanceStore':
+        if cls._instance is None:
+            async with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    async def initialize(self, conn=None) -> None:
+        """Create the tables and load the stored snapshot into memory."""
+        async with self.init_lock:
+            if self.conn is not None:
+                return
+            self.conn = conn or await create_connection(DB_FILE)
+            for sql in CREATE_BALANCE_TABLES_SQL:
+                await self.conn.execute(sql)
+
+            balances = {}
+            async with self.conn.execute("SELECT exchange_id, account, asset, balance FROM balances") as cursor:
+                for exchange_id, account, asset, balance in await cursor.fetchall():
+                    balances.setdefault((exchange_id, account), {})[asset] = balance or 0.0
+            totals = defaultdict(float)
+            for assets in balances.values():
+                for asset, balance in assets.items():
+                    totals[asset] += balance
+
+            # Totals are only ever moved by deltas from here on, so start them from the rows
+            await self.conn.execute("DELETE FROM total_balances")
+            await self.conn.executemany(
+                "INSERT INTO total_balances (asset, total_balance) VALUES (?, ?)", list(totals.items())
             )
-        ''')
-        
-        connection.commit()
-        logger.info("Database tables initialized successfully")
-        
-    except sqlite3.Error as e:
-        logger.error(f"Failed to initialize database: {e}")
-        raise
-    finally:
-        if connection:
-            connection.close()
-
-
-def update_balance(exchange_id, account, combined_balances):
+            await self.conn.commit()
+            self.balances = balances
+            self.totals = dict(totals)
+            logger.info(f"Loaded balances for {len(balances)} accounts, {len(totals)} assets")
+
+    async def update_accounts(self, snapshots: Dict[AccountKey, Dict[str, float]]) -> int:
+        """
+        Store fresh balances for several accounts in one transaction. Assets an
+        account no longer reports are set to zero. Returns the number of rows written.
+        """
+        await self.initialize()
+        async with self.write_lock:
+            rows = []
+            deltas = defaultdict(float)
+            for (exchange_id, account), assets in snapshots.items():
+                current = self.balances.get((exchange_id, account), {})
+                new = {asset: 0.0 for asset in current}
+                new.update({asset: float(balance) for asset, balance in assets.items()})
+                for asset, balance in new.items():
+                    if asset in current and current[asset] == balance:
+                        continue
+                    rows.append((exchange_id, account, asset, balance))
+                    deltas[asset] += balance - current.get(asset, 0.0)
+            if not rows:
+                return 0
+
+            totals = {asset: self.totals.get(asset, 0.0) + delta for asset, delta in deltas.items()}
+            try:
+                await self.conn.executemany(
+                    '''
+                    INSERT INTO balances (exchange_id, account, asset, balance) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(exchange_id, account, asset) DO UPDATE SET balance = excluded.balance
+                    ''', rows
+                )
+                await self.conn.executemany(
+                    '''
+                    INSERT INTO total_balances (asset, total_balance) VALUES (?, ?)
+                    ON CONFLICT(asset) DO UPDATE SET total_balance = excluded.total_balance
+                    ''', list(totals.items())
+                )
+                await self.conn.commit()
+            except Exception as e:
+                await self.conn.rollback()
+                logger.error(f"Failed to update balances for {list(snapshots)}: {e}")
+                raise
+
+            for exchange_id, account, asset, balance in rows:
+                self.balances.setdefault((exchange_id, account), {})[asset] = balance
+            self.totals.update(totals)
+            logger.debug(f"Updated {len(rows)} balance rows across {len(snapshots)} accounts")
+            return len(rows)
+
+    def get_balance(self, exchange_id: int, account: str) -> Dict[str, float]:
+        return dict(self.balances.get((exchange_id, account), {}))
+
+    def get_all_balances(self) -> List[Tuple[int, str, str, float]]:
+        return [(exchange_id, account, asset, balance)
+                for (exchange_id, account), assets in self.balances.items()
+                for asset, balance in assets.items() if balance > 0]
+
+    def get_total_asset_balances(self) -> List[Tuple[str, float]]:
+        totals = defaultdict(float)
+        for _, _, asset, balance in self.get_all_balances():
+            totals[asset] += balance
+        return list(totals.items())
+
+    def get_total_usd(self) -> float:
+        return sum(balance for _, _, asset, balance in self.get_all_balances() if asset in USD_ASSETS)
+
+    async def close(self) -> None:
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+
+
+async def update_balance(exchange_id, account, combined_balances):
     """
     Update account balances, setting missing assets to zero.
-    
+
     Args:
         exchange_id: Exchange identifier
         account: Account name
         combined_balances: Dict of {asset: balance}
     """
-    try:
-        connection = sqlite3.connect(DB_FILE)
-        cursor = connection.cursor()
-        
-        # Get existing assets for this account
-        cursor.execute('''
-            SELECT asset FROM balances 
-            WHERE exchange_id = ? AND account = ?
-        ''', (exchange_id, account))
-        existing_assets = set(row[0] for row in cursor.fetchall())
-
-        # Update or insert new balances
-        for asset, balance in combined_balances.items():
-            cursor.execute('''
-                INSERT OR REPLACE INTO balances (exchange_id, account, asset, balance)
-                VALUES (?, ?, ?, ?)
-            ''', (exchange_id, account, asset, balance))
-            existing_assets.discard(asset)
-
-        # Set missing assets to zero
-        for asset in existing_assets:
-            cursor.execute('''
-                UPDATE balances SET balance = 0
-                WHERE exchange_id = ? AND account = ? AND asset = ?
-            ''', (exchange_id, account, asset))
-
-        connection.commit()
-        logger.debug(f"Updated balances for {account}: {len(combined_balances)} assets")
-        
-    except sqlite3.Error as e:
-        logger.error(f"Failed to update balance for {account}: {e}")
-        raise
-    finally:
-        if connection:
-            connection.close()
-
-
-def update_total_balances():
-    """Aggregate individual account balances into total balances table"""
-    try:
-        connection = sqlite3.connect(DB_FILE)
-        cursor = connection.cursor()
-
-        # Calculate aggregated balances
-        cursor.execute('''
-            SELECT asset, SUM(balance)
-            FROM balances
-            GROUP BY asset
-        ''')
-        aggregated_balances = cursor.fetchall()
-
-        # Update total balances table
-        for asset, total_balance in aggregated_balances:
-            cursor.execute('''
-                INSERT OR REPLACE INTO total_balances (asset, total_balance)
-                VALUES (?, ?)
-            ''', (asset, total_balance))
-        
-        connection.commit()
-        logger.debug(f"Updated total balances for {len(aggregated_balances)} assets")
-        
-    except sqlite3.Error as e:
-        logger.error(f"Failed to update total balances: {e}")
-        raise
-    finally:
-        if connection:
-            connection.close()
-
-
-def get_balance(exchange_id, account):
+    store = await BalanceStore.get_instance()
+    return await store.update_accounts({(exchange_id, account): combined_balances})
+
+
+async def update_balances(exchange_id, balances_by_account):
+    """Update several accounts of one exchange in a single transaction."""
+    store = await BalanceStore.get_instance()
+    return await store.update_accounts({(exchange_id, account): balances
+                                        for account, balances in balances_by_account.items()})
+
+
+async def get_balance(exchange_id, account):
     """
     Get balances for a specific account.
-    
-    Args:
-        exchange_id: Exchange identifier
-        account: Account name
-        
+
     Returns:
         dict: {asset: balance} mapping
     """
-    try:
-        connection = sqlite3.connect(DB_FILE)
-        cursor = connection.cursor()
-        cursor.execute('''
-            SELECT asset, balance 
-            FROM balances 
-            WHERE exchange_id = ? AND account = ?
-        ''', (exchange_id, account))
-        balances = {asset: balance for asset, balance in cursor.fetchall()}
-        return balances
-        
-    except sqlite3.Error as e:
-        logger.error(f"Failed to get balance for {account}: {e}")
-        return {}
-    finally:
-        if connection:
-            connection.close()
-
-
-def get_all_balances():
+    store = await BalanceStore.get_instance()
+    await store.initialize()
+    return store.get_balance(exchange_id, account)
+
+
+async def get_all_balances():
     """
     Get all account balances.
-    
+
     Returns:
         list: [(exchange_id, account, asset, balance), ...]
     """
-    try:
-        connection = sqlite3.connect(DB_FILE)
-        cursor = connection.cursor()
-        cursor.execute('''
-            SELECT exchange_id, account, asset, balance 
-            FROM balances
-            WHERE balance > 0
-        ''')
-        balances_data = cursor.fetchall()
-        return balances_data
-        
-    except sqlite3.Error as e:
-        logger.error(f"Failed to get all balances: {e}")
-        return []
-    finally:
-        if connection:
-            connection.close()
-
-
-def get_total_asset_balances():
+    store = await BalanceStore.get_instance()
+    await store.initialize()
+    return store.get_all_balances()
+
+
+async def get_total_asset_balances():
     """
     Get aggregated balances by asset.
-    
+
     Returns:
         list: [(asset, total_balance), ...]
     """
-    try:
-        connection = sqlite3.connect(DB_FILE)
-        cursor = connection.cursor()
-        cursor.execute('''
-            SELECT asset, SUM(balance)
-            FROM balances
-            WHERE balance > 0
-            GROUP BY asset
-        ''')
-        total_balances = cursor.fetchall()
-        return total_balances
-        
-    except sqlite3.Error as e:
-        logger.error(f"Failed to get total asset balances: {e}")
-        return []
-    finally:
-        if connection:
-            connection.close()
+    store = await BalanceStore.get_instance()
+    await store.initialize()
+    return store.get_total_asset_balances()
 
 
 async def get_total_usd():
     """
     Get total USD-equivalent balance across all stablecoins.
-    
+
     Returns:
         float: Total USD balance
     """
     try:
-        async with aiosqlite.connect(DB_FILE) as connection:
-            async with connection.cursor() as cursor:
-                await cursor.execute('''
-                    SELECT SUM(balance)
-                    FROM balances
-                    WHERE asset IN ('USD', 'USDC', 'USDT', 'TUSD', 'DAI', 'FDUSD')
-                      AND balance > 0
-                ''')
-                result = await cursor.fetchone()
-                total_usd = result[0] if result and result[0] is not None else 0.0
-                
+        store = await BalanceStore.get_instance()
+        await store.initialize()
+        total_usd = store.get_total_usd()
         logger.debug(f"Total USD balance: {total_usd}")
         return total_usd
-        
+
     except Exception as e:
         logger.error(f"Failed to get total USD: {e}")
         return 0.0
@@ -250,40 +250,40 @@ async def generate_balance_report():
     """Generate comprehensive balance report"""
     try:
         logger.info("Generating balance report...")
-        
+
         # Get USD total
         usd_balance = await get_total_usd()
         logger.info(f"Total USD Balance: ${usd_balance:,.2f}")
-        
+
         # Get asset breakdown
-        asset_balances = get_total_asset_balances()
+        asset_balances = await get_total_asset_balances()
         if asset_balances:
             logger.info("Asset Breakdown:")
             for asset, balance in asset_balances:
                 logger.info(f"  {asset}: {balance:,.6f}")
-        
+
         # Get account breakdown
-        all_balances = get_all_balances()
+        all_balances = await get_all_balances()
         account_totals = {}
         for exchange_id, account, asset, balance in all_balances:
             key = f"{account} (ID: {exchange_id})"
             if key not in account_totals:
                 account_totals[key] = {}
             account_totals[key][asset] = balance
-        
+
         if account_totals:
             logger.info("Account Breakdown:")
             for account, assets in account_totals.items():
                 logger.info(f"  {account}:")
                 for asset, balance in assets.items():
                     logger.info(f"    {asset}: {balance:,.6f}")
-        
+
         return {
             'total_usd': usd_balance,
             'asset_balances': dict(asset_balances),
             'account_balances': account_totals
         }
-        
+
     except Exception as e:
         logger.error(f"Failed to generate balance report: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -1,6 +1,8 @@
 # bpa/binance_orders.py
 import asyncio
+from collections import defaultdict
 from src.connectors.binance.wallets import BinanceWallets
+from src.connectors.binance.wallet_snapshot import WalletSnapshotService
 import traceback
 import logging
 from src.utils.logging_config import setup_logging
@@ -8,6 +10,9 @@ from src.utils.logging_config import setup_logging
 setup_logging(log_filename='binance_main.log')
 logger = logging.getLogger(__name__)
 
+# One restock per asset at a time, so back-to-back completions do not both buy the gap
+_restock_locks = defaultdict(asyncio.Lock)
+
 async def get_wallets():
     wallets = BinanceWallets()
     await wallets.balances()
@@ -15,7 +20,7 @@ async def get_wallets():
 
 async def new_order(wallets, account_to_use, asset_type, most_usd_asset, missing_balance):
     try: 
-        await wallets.place_order(
+        return await wallets.place_order(
             api_key=wallets.credentials_dict[account_to_use]['KEY'],
             api_secret=wallets.credentials_dict[account_to_use]['SECRET'],
             symbol=f"{asset_type}{most_usd_asset}",
@@ -29,30 +34,43 @@ async def new_order(wallets, account_to_use, asset_type, most_usd_asset, missing
     except Exception as e:
         logger.error(f"An error occurred: {e}")
         logger.error(traceback.format_exc())
+        return None
 
 async def binance_buy_order(asset_type):
     try: 
-        wallets = await get_wallets()
-        missing_balance = wallets.check_asset_balance(asset_type)
+        async with _restock_locks[asset_type]:
+            snapshot = await WalletSnapshotService.get_instance()
+            await snapshot.ensure_fresh()
+            missing_balance = snapshot.check_asset_balance(asset_type)
 
-        logger.debug(f"Inside binance_buy_order for {asset_type}")
-        logger.info(f"Missing balance for {asset_type}: {missing_balance}")
+            logger.debug(f"Inside binance_buy_order for {asset_type}")
+            logger.info(f"Missing balance for {asset_type}: {missing_balance}")
 
-        if missing_balance > 0.00025:
-            account_to_use, most_usd_asset = wallets.get_account_with_most_usd()
-            logger.debug(f'account to use:{account_to_use}, most usd asset: {most_usd_asset}')
+            if missing_balance > 0.00025:
+                account_to_use, most_usd_asset = snapshot.get_account_with_most_usd()
+                logger.debug(f'account to use:{account_to_use}, most usd asset: {most_usd_asset}')
+                if account_to_use is None:
+                    logger.warning(f"No account has free USD to restock {asset_type}")
+                    return
 
-            await new_order(wallets, account_to_use, asset_type, most_usd_asset, missing_balance)
-        
-        else: 
-            logger.info(f"No missing balance for {asset_type}; {missing_balance}")
+                order = await new_order(BinanceWallets(), account_to_use, asset_type, most_usd_asset, missing_balance)
+                if not order:
+                    raise RuntimeError(f"Restock order for {missing_balance} {asset_type} on {account_to_use} failed")
+                snapshot.apply_fill(account_to_use, asset_type, float(order.get('executedQty', 0)),
+                                    most_usd_asset, float(order.get('cummulativeQuoteQty', 0)))
+            
+            else: 
+                logger.info(f"No missing balance for {asset_type}; {missing_balance}")
 
     except Exception as e:
         logger.error(f"An error occurred: {e}")
         logger.error(traceback.format_exc())
+        # Runs as a queued job: the queue has to see the failure to retry it
+        raise
 
 async def binance_orders_main(loop):
     await asyncio.gather(
         binance_buy_order('BTC'),
         binance_buy_order('ETH'),
+        return_exceptions=True
     )
\ No newline at end of file
@@ -0,0 +1,232 @@
+# bpa/binance_wallet_snapshot.py
+"""
+In-memory snapshot of every Binance account's spot and funding balances.
+
+refresh() fetches all accounts concurrently (spot and funding in parallel,
+over the shared aiohttp session) and swaps the new snapshot in at once; an
+account whose fetch failed keeps its previous balances. run() refreshes on a
+timer and also persists each snapshot through BalanceStore.
+
+Between refreshes our own fills are applied as local deltas, so restocking
+decisions see an order we just placed. A refresh drops an account's deltas
+recorded before its balance request was sent, since those balances include
+them. A fill made while the request was in flight may or may not be in the
+response, so it is kept until the next refresh, which certainly covers it:
+briefly counting it twice only delays a restock, while dropping it early
+could restock twice.
+Reads (check_asset_balance, get_account_with_most_usd) never hit the network.
+"""
+import asyncio
+import hashlib
+import hmac
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from src.connectors.asset_balances import update_balances
+from src.data.cache.share_data import SharedSession
+from src.utils.common_utils import get_server_timestamp
+import logging
+from src.utils.logging_config import setup_logging
+
+setup_logging(log_filename='binance_main.log')
+logger = logging.getLogger(__name__)
+
+BINANCE_API_URL = 'https://api.binance.com'
+SPOT_ASSETS_PATH = '/sapi/v3/asset/getUserAsset'
+FUNDING_ASSETS_PATH = '/sapi/v1/asset/get-funding-asset'
+
+REFRESH_INTERVAL_SECONDS = 60
+# Older than this and a read triggers a refresh first
+MAX_SNAPSHOT_AGE_SECONDS = 300
+BINANCE_EXCHANGE_ID = 1
+
+USD_ASSETS = ('USDC', 'USDT')
+# Inventory kept on hand for P2P sales
+RESTOCK_TARGETS = {
+    'BTC': 0.2,
+    'ETH': 1.25,
+}
+
+
+class WalletFetchError(Exception):
+    pass
+
+
+@dataclass
+class AccountBalances:
+    # free + locked + freeze over spot and funding
+    totals: Dict[str, float] = field(default_factory=dict)
+    # spot free only: what a market order can spend
+    free: Dict[str, float] = field(default_factory=dict)
+    # When the balance requests were sent and when their responses arrived
+    requested_at: float = 0.0
+    fetched_at: float = 0.0
+
+
+@dataclass
+class Fill:
+    account: str
+    asset: str
+    amount: float
+    recorded_at: float
+
+
+class WalletSnapshotService:
+    _instance: Optional['WalletSnapshotService'] = None
+    _lock = asyncio.Lock()
+
+    def __init__(self, credentials: Optional[dict] = None, base_url: str = BINANCE_API_URL):
+        if self.__class__._instance is not None:
+            raise RuntimeError("This class is a singleton. Use get_instance() instead.")
+        if credentials is None:
+            # Imported here so the service can run on explicit credentials without the module
+            from src.connectors.credentials import credentials_dict
+            credentials = credentials_dict
+        self.credentials = credentials
+        self.base_url = base_url
+        self.accounts: Dict[str, AccountBalances] = {}
+        self.fills: List[Fill] = []
+        self.refreshed_at: Optional[float] = None
+        self.refresh_lock = asyncio.Lock()
+        self.refreshes = 0
+        self.failed_fetches = 0
+
+    @classmethod
+    async def get_instance(cls) -> 'WalletSnapshotService':
+        if cls._instance is None:
+            async with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    async def _signed_post(self, session, path: str, api_key: str, api_secret: str) -> list:
+        query_string = f"timestamp={await get_server_timestamp()}"
+        signature = hmac.new(api_secret.encode('utf-8'), query_string.encode('utf-8'), hashlib.sha256).hexdigest()
+        url = f"{self.base_url}{path}?{query_string}&signature={signature}"
+        async with session.post(url, headers={"X-MBX-APIKEY": api_key}) as response:
+            if response.status != 200:
+                raise WalletFetchError(f"{path} returned {response.status}: {await response.text()}")
+            return await response.json()
+
+    async def _fetch_account(self, session, account: str, cred: dict) -> AccountBalances:
+        requested_at = time.time()
+        spot, funding = await asyncio.gather(
+            self._signed_post(session, SPOT_ASSETS_PATH, cred['KEY'], cred['SECRET']),
+            self._signed_post(session, FUNDING_ASSETS_PATH, cred['KEY'], cred['SECRET']),
+        )
+        balances = AccountBalances(requested_at=requested_at, fetched_at=time.time())
+        for data, is_funding in ((spot, False), (funding, True)):
+            for entry in data:
+                asset = entry['asset']
+                amount = sum(float(entry.get(kind, 0)) for kind in ('free', 'locked', 'freeze'))
+                balances.totals[asset] = balances.totals.get(asset, 0.0) + amount
+                if not is_funding:
+                    balances.free[asset] = balances.free.get(asset, 0.0) + float(entry.get('free', 0))
+        return balances
+
+    async def refresh(self) -> bool:
+        """Fetch every account concurrently. Returns True if all accounts were refreshed."""
+        async with self.refresh_lock:
+            started_at = time.time()
+            session = await SharedSession.get_session()
+            accounts = list(self.credentials.items())
+            results = await asyncio.gather(
+                *(self._fetch_account(session, account, cred) for account, cred in accounts),
+                return_exceptions=True
+            )
+
+            snapshot = dict(self.accounts)
+            refreshed = {}
+            for (account, _), result in zip(accounts, results):
+                if isinstance(result, Exception):
+                    self.failed_fetches += 1
+                    logger.error(f"Failed to fetch balances for {account}: {result}")
+                    continue
+                snapshot[account] = result
+                refreshed[account] = result
+            self.accounts = snapshot
+            # Only fills recorded before the request went out are surely in the response
+            self.fills = [fill for fill in self.fills
+                          if fill.account not in refreshed or fill.recorded_at >= refreshed[fill.account].requested_at]
+            if refreshed:
+                self.refreshed_at = started_at
+                self.refreshes += 1
+                await self._persist(refreshed)
+            return len(refreshed) == len(accounts)
+
+    async def _persist(self, refreshed: Dict[str, AccountBalances]) -> None:
+        try:
+            await update_balances(BINANCE_EXCHANGE_ID, {account: balances.totals
+                                                        for account, balances in refreshed.items()})
+        except Exception as e:
+            logger.error(f"Error persisting wallet snapshot: {e}")
+
+    async def ensure_fresh(self, max_age: float = MAX_SNAPSHOT_AGE_SECONDS) -> None:
+        if self.refreshed_at is None or time.time() - self.refreshed_at > max_age:
+            await self.refresh()
+
+    def apply_fill(self, account: str, asset: str, quantity: float, quote_asset: str, quote_quantity: float) -> None:
+        """Record one of our own fills: `quantity` of `asset` bought with `quote_quantity` of `quote_asset`."""
+        now = time.time()
+        self.fills.append(Fill(account, asset, float(quantity), now))
+        self.fills.append(Fill(account, quote_asset, -float(quote_quantity), now))
+
+    def _fill_deltas(self) -> Dict[Tuple[str, str], float]:
+        deltas = defaultdict(float)
+        for fill in self.fills:
+            deltas[(fill.account, fill.asset)] += fill.amount
+        return deltas
+
+    def total_balance(self, asset: str) -> float:
+        """Held across all accounts, spot and funding, including unconfirmed fills."""
+        total = sum(balances.totals.get(asset, 0.0) for balances in self.accounts.values())
+        return total + sum(fill.amount for fill in self.fills if fill.asset == asset)
+
+    def free_balance(self, account: str, asset: str) -> float:
+        balances = self.accounts.get(account)
+        free = balances.free.get(asset, 0.0) if balances else 0.0
+        return free + self._fill_deltas().get((account, asset), 0.0)
+
+    def check_asset_balance(self, asset: str) -> float:
+        """How much `asset` is missing to reach its restock target (negative if above it)."""
+        target = RESTOCK_TARGETS.get(asset)
+        if target is None:
+            logger.warning(f"No restock target for {asset}")
+            return 0.0
+        return target - self.total_balance(asset)
+
+    def get_account_with_most_usd(self) -> Tuple[Optional[str], Optional[str]]:
+        """The account with the most free USDC+USDT, and which of the two it holds more of."""
+        deltas = self._fill_deltas()
+        max_free_usd = 0
+        max_account = None
+        most_usd_asset = None
+        for account, balances in self.accounts.items():
+            assets = {asset: balances.free.get(asset, 0.0) + deltas.get((account, asset), 0.0)
+                      for asset in USD_ASSETS}
+            total_usd = sum(assets.values())
+            if total_usd > max_free_usd:
+                max_free_usd = total_usd
+                max_account = account
+                most_usd_asset = max(assets, key=assets.get)
+        return max_account, most_usd_asset
+
+    async def run(self, interval: float = REFRESH_INTERVAL_SECONDS) -> None:
+        """Refresh on a timer for the lifetime of the bot."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Wallet snapshot refresh failed: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'accounts': len(self.accounts),
+            'pending_fills': len(self.fills),
+            'refreshed_at': self.refreshed_at,
+            'refreshes': self.refreshes,
+            'failed_fetches': self.failed_fetches,
+        }
@@ -6,7 +6,7 @@ import asyncio
 import platform
 from src.connectors.credentials import credentials_dict
 from src.utils.common_utils import get_server_timestamp
-from src.connectors.asset_balances import update_balance, get_balance
+from src.connectors.asset_balances import BalanceStore, update_balance, update_balances, get_balance
 from src.utils.logging_config import setup_logging
 
 logger = setup_logging(log_filename='binance_main.log')
@@ -127,32 +127,46 @@ class BinanceWallets:
                     if response.status == 200:
                         order_data = await response.json()
                         logger.debug(f"Order successfully placed: {order_data}")
+                        return order_data
                     else:
                         logger.error(f"Failed to place order: {response.status} {await response.text()}")
         except Exception as e:
             logger.warning(f"An exception occurred in place_order: {e}")
+        return None
 
     async def save_balances_to_db(self, account):
         exchange_id = 1
         logger.debug("Calling update_balance from binance_wallets.py")
         try:
-            update_balance(exchange_id, account, self.combined_balances)
+            await update_balance(exchange_id, account, self.combined_balances)
             logger.debug(f"Cached balances for account {account}: {self.combined_balances}")
         except Exception as e:
             logger.error(f"Error in save_balances_to_db: {e}")
 
-    def validate_balances(self, account):
+    async def save_all_balances_to_db(self, balances_by_account):
         exchange_id = 1
-        balance = get_balance(exchange_id, account)
+        try:
+            await update_balances(exchange_id, balances_by_account)
+            logger.debug(f"Cached balances for accounts {list(balances_by_account)}")
+        except Exception as e:
+            logger.error(f"Error in save_all_balances_to_db: {e}")
+
+    async def validate_balances(self, account):
+        exchange_id = 1
+        balance = await get_balance(exchange_id, account)
         logger.debug(f"Balance for account {account} in exchange {exchange_id}: {balance}")
 
     async def main(self):
+        balances_by_account = {}
         for account, cred in credentials_dict.items():
             self.combined_balances = {}
             await self.get_user_assets(cred['KEY'], cred['SECRET'], account)
             await self.get_funding_assets(cred['KEY'], cred['SECRET'], account)
-            await self.save_balances_to_db(account)
-            self.validate_balances(account)
+            balances_by_account[account] = self.combined_balances
+        # All accounts in one transaction
+        await self.save_all_balances_to_db(balances_by_account)
+        for account in balances_by_account:
+            await self.validate_balances(account)
 
     async def balances(self):
         for account, cred in credentials_dict.items():
@@ -162,6 +176,12 @@ class BinanceWallets:
 if platform.system() == "Windows":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-if __name__ == "__main__":
+async def _run_once():
     wallets = BinanceWallets()
-    asyncio.run(wallets.main())
+    try:
+        await wallets.main()
+    finally:
+        await (await BalanceStore.get_instance()).close()
+
+if __name__ == "__main__":
+    asyncio.run(_run_once())
@@ -0,0 +1,142 @@
+# bpa/book_engine.py
+"""
+Price-sorted order book with depth-weighted reference prices.
+
+Each side keeps its levels in two parallel lists sorted best-first (bids
+are keyed by negated price), so a diff is one bisect plus a list
+insert/delete instead of re-sorting a dict of string prices.
+
+The reference price of a side is the volume-weighted price of the first
+`target_notional` MXN of depth. The side remembers how many levels that
+window spans. A change beyond the window (on a book deeper than the target)
+cannot move the price and costs nothing more. A change inside it marks the
+side dirty, and the window is walked again once, on the next read, however
+many diffs the frame carried.
+"""
+from bisect import bisect_left
+from typing import Iterable, List, Mapping, Tuple
+
+import logging
+from src.utils.logging_config import setup_logging
+
+setup_logging(log_filename='binance_main.log')
+logger = logging.getLogger(__name__)
+
+REFERENCE_DEPTH_MXN = 50000
+
+BID = 0
+ASK = 1
+
+
+class BookSide:
+    __slots__ = ('is_bid', 'target_notional', 'keys', 'amounts',
+                 '_window_levels', '_window_full', '_dirty', '_wavg', 'recomputes')
+
+    def __init__(self, is_bid: bool, target_notional: float = REFERENCE_DEPTH_MXN):
+        self.is_bid = is_bid
+        self.target_notional = target_notional
+        self.keys: List[float] = []
+        self.amounts: List[float] = []
+        # Levels (from the best) the last weighted average consumed, and
+        # whether they reached target_notional
+        self._window_levels = 0
+        self._window_full = False
+        self._dirty = True
+        self._wavg = 0.0
+        self.recomputes = 0
+
+    def _key(self, price: float) -> float:
+        return -price if self.is_bid else price
+
+    def load(self, levels: Iterable[Tuple[float, float]]) -> None:
+        """Replace the side with (price, amount) levels, sorting once."""
+        book = {self._key(price): amount for price, amount in levels if amount > 0}
+        self.keys = sorted(book)
+        self.amounts = [book[key] for key in self.keys]
+        self._dirty = True
+
+    def set_level(self, price: float, amount: float) -> bool:
+        """Set a level's amount (0 removes it). Returns whether the side changed."""
+        key = self._key(price)
+        keys = self.keys
+        i = bisect_left(keys, key)
+        exists = i < len(keys) and keys[i] == key
+        if amount > 0:
+            if exists:
+                if self.amounts[i] == amount:
+                    return False
+                self.amounts[i] = amount
+            else:
+                keys.insert(i, key)
+                self.amounts.insert(i, amount)
+        elif exists:
+            del keys[i]
+            del self.amounts[i]
+        else:
+            return False
+        if i < self._window_levels or not self._window_full:
+            self._dirty = True
+        return True
+
+    def weighted_average(self) -> float:
+        """Volume-weighted price of the best `target_notional` of depth (0 for an empty side)."""
+        if not self._dirty:
+            return self._wavg
+        remaining = self.target_notional
+        notional = 0.0
+        quantity = 0.0
+        levels = 0
+        full = False
+        for key, amount in zip(self.keys, self.amounts):
+            price = -key if self.is_bid else key
+            take = min(price * amount, remaining)
+            notional += take
+            quantity += take / price
+            remaining -= take
+            levels += 1
+            if remaining <= 0:
+                full = True
+                break
+        self._window_levels = levels
+        self._window_full = full
+        self._wavg = notional / quantity if quantity > 0 else 0
+        self._dirty = False
+        self.recomputes += 1
+        return self._wavg
+
+    def top(self, n: int) -> List[Tuple[float, float]]:
+        return [(-key if self.is_bid else key, amount) for key, amount in zip(self.keys[:n], self.amounts[:n])]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class OrderBookEngine:
+    def __init__(self, target_notional: float = REFERENCE_DEPTH_MXN):
+        self.bids = BookSide(is_bid=True, target_notional=target_notional)
+        self.asks = BookSide(is_bid=False, target_notional=target_notional)
+
+    def load_snapshot(self, bids: Iterable[Mapping], asks: Iterable[Mapping]) -> None:
+        """Load REST order book levels ({'price': str, 'amount': str, ...})."""
+        self.bids.load((float(bid['price']), float(bid['amount'])) for bid in bids)
+        self.asks.load((float(ask['price']), float(ask['amount'])) for ask in asks)
+
+    def apply_update(self, update: Mapping) -> bool:
+        """Apply one diff-orders entry (r=price, a=amount, s=status, t=0 bid/1 ask)."""
+        side = self.bids if update['t'] == BID else self.asks
+        amount = 0.0 if update['s'] == 'cancelled' else float(update.get('a', '0'))
+        return side.set_level(float(update['r']), amount)
+
+    def apply_frame(self, updates: Iterable[Mapping]) -> bool:
+        """Apply every entry of a diff-orders frame. Returns whether the book changed."""
+        changed = False
+        for update in updates:
+            try:
+                changed = self.apply_update(update) or changed
+            except (KeyError, TypeError, ValueError) as e:
+                logger.error(f"Skipping malformed order update {update}: {e}")
+        return changed
+
+    def reference_prices(self) -> Tuple[float, float]:
+        """(bid, ask) weighted over the reference depth."""
+        return self.bids.weighted_average(), self.asks.weighted_average()
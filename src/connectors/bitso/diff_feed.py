@@ -0,0 +1,175 @@
+# bpa/diff_feed.py
+"""
+Sequenced Bitso diff-orders feed on top of OrderBookEngine.
+
+Frames must apply in strict sequence order on top of a REST snapshot:
+- While a snapshot loads (aiohttp, in a background task), frames are
+  buffered. When it lands, the buffered frames newer than the snapshot are
+  replayed in sequence order on a fresh engine, which then replaces the
+  current one.
+- If the buffer does not continue the snapshot, or has a hole in it, nothing
+  is swapped in and a newer snapshot is fetched.
+- A frame that skips a sequence number (or a reconnect) starts such a
+  resync. Until it completes, the last good book keeps being served and the
+  reference prices in bitso_cache are flagged stale.
+
+on_frame never waits for the network, so the websocket reader keeps
+draining messages during a resync.
+"""
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+import aiohttp
+
+import src.data.cache.bitso_cache as bitso_cache
+from src.connectors.bitso.book_engine import OrderBookEngine
+from src.data.cache.share_data import SharedSession
+import logging
+from src.utils.logging_config import setup_logging
+
+setup_logging(log_filename='binance_main.log')
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_URL = "https://api.bitso.com/v3/order_book/?book={book}"
+SNAPSHOT_TIMEOUT_SECONDS = 10
+# Wait before each snapshot retry; the last delay repeats
+SNAPSHOT_RETRY_DELAYS = (0.5, 1, 2, 5, 10, 30)
+# Frames kept while a snapshot loads; losing older ones shows up as a hole
+MAX_BUFFERED_FRAMES = 10000
+
+Frame = Tuple[int, list]
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class DiffOrdersFeed:
+    def __init__(self, book: str, fetch_snapshot: Optional[Callable[[], Awaitable[Dict]]] = None):
+        self.book = book
+        self.engine = OrderBookEngine()
+        self.sequence: Optional[int] = None
+        self.stale = True
+        self.buffer: deque = deque(maxlen=MAX_BUFFERED_FRAMES)
+        self.fetch_snapshot = fetch_snapshot or self._fetch_snapshot
+        self.resync_task: Optional[asyncio.Task] = None
+        self.published_prices = None
+        self.gaps = 0
+        self.resyncs = 0
+        self.snapshot_failures = 0
+
+    @property
+    def syncing(self) -> bool:
+        return self.resync_task is not None and not self.resync_task.done()
+
+    async def _fetch_snapshot(self) -> Dict:
+        session = await SharedSession.get_session()
+        timeout = aiohttp.ClientTimeout(total=SNAPSHOT_TIMEOUT_SECONDS)
+        async with session.get(SNAPSHOT_URL.format(book=self.book), timeout=timeout) as response:
+            data = await response.json()
+        if not data.get('success'):
+            raise SnapshotError(f"Failed to get order book snapshot: {data.get('error')}")
+        return data['payload']
+
+    async def on_frame(self, sequence: int, payload: list) -> None:
+        """Handle one diff-orders message."""
+        if self.syncing:
+            self.buffer.append((sequence, payload))
+            return
+        if self.sequence is None:
+            self.buffer.append((sequence, payload))
+            await self.resync()
+            return
+        if sequence <= self.sequence:
+            return
+        if sequence != self.sequence + 1:
+            self.gaps += 1
+            logger.warning(f"{self.book} diff-orders gap: expected {self.sequence + 1}, got {sequence}. Resyncing.")
+            self.buffer.append((sequence, payload))
+            await self.resync()
+            return
+        self.sequence = sequence
+        if self.engine.apply_frame(payload):
+            await self.publish()
+
+    async def resync(self) -> asyncio.Task:
+        """Flag the book stale and start loading a snapshot, unless one is already loading."""
+        if not self.syncing:
+            self.stale = True
+            await bitso_cache.mark_reference_prices_stale()
+            self.resync_task = asyncio.create_task(self._resync())
+        return self.resync_task
+
+    async def _resync(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                snapshot = await self.fetch_snapshot()
+                if self._install(snapshot):
+                    break
+            except Exception as e:
+                self.snapshot_failures += 1
+                logger.error(f"Error loading {self.book} order book snapshot: {e}")
+            await asyncio.sleep(SNAPSHOT_RETRY_DELAYS[min(attempt, len(SNAPSHOT_RETRY_DELAYS) - 1)])
+            attempt += 1
+        self.resyncs += 1
+        logger.debug(f"{self.book} order book synced at sequence {self.sequence}")
+        await self.publish()
+
+    def _install(self, snapshot: Dict) -> bool:
+        """Replay the buffer on the snapshot and swap it in. False if the buffer does not continue it."""
+        snapshot_sequence = int(snapshot['sequence'])
+        frames = self._frames_after(snapshot_sequence)
+        expected = snapshot_sequence + 1
+        for sequence, _ in frames:
+            if sequence != expected:
+                logger.warning(f"{self.book} snapshot at {snapshot_sequence} does not continue the buffered "
+                               f"frames (missing {expected}). Fetching a newer one.")
+                return False
+            expected += 1
+
+        # No awaits from here on: frames arriving meanwhile cannot be missed
+        engine = OrderBookEngine()
+        engine.load_snapshot(snapshot['bids'], snapshot['asks'])
+        for _, payload in frames:
+            engine.apply_frame(payload)
+        self.engine = engine
+        self.sequence = expected - 1
+        self.buffer.clear()
+        self.stale = False
+        return True
+
+    def _frames_after(self, sequence: int) -> Iterable[Frame]:
+        frames = {seq: payload for seq, payload in self.buffer if seq > sequence}
+        return sorted(frames.items())
+
+    async def publish(self) -> None:
+        if self.stale:
+            return
+        prices = self.engine.reference_prices()
+        # Most frames only touch levels past the reference depth
+        if prices == self.published_prices and not bitso_cache.reference_prices['stale']:
+            return
+        self.published_prices = prices
+        highest_bid_wavg, lowest_ask_wavg = prices
+        await bitso_cache.update_reference_prices(highest_bid_wavg, lowest_ask_wavg)
+
+    async def close(self) -> None:
+        if self.syncing:
+            self.resync_task.cancel()
+            try:
+                await self.resync_task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'sequence': self.sequence,
+            'stale': self.stale,
+            'syncing': self.syncing,
+            'buffered': len(self.buffer),
+            'gaps': self.gaps,
+            'resyncs': self.resyncs,
+            'snapshot_failures': self.snapshot_failures,
+        }
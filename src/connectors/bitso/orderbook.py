@@ -1,10 +1,8 @@
 import asyncio
 import json
 import websockets
-import requests
 
-from collections import deque
-import src.data.cache.bitso_cache as bitso_cache 
+from src.connectors.bitso.diff_feed import DiffOrdersFeed
 import logging
 from src.utils.logging_config import setup_logging
 
@@ -14,20 +12,20 @@ logger = logging.getLogger(__name__)
 class BitsoOrderBook:
     def __init__(self, book):
         self.book = book
-        self.order_book = {"bids": {}, "asks": {}}
-        self.message_queue = deque()
+        self.feed = DiffOrdersFeed(book)
         self.websocket_url = "wss://ws.bitso.com"
-        self.rest_url = f"https://api.bitso.com/v3/order_book/?book={self.book}"
-        self.sequence = None
 
     async def start(self):
         await self.connect_websocket()
-        await self.get_initial_order_book()
-        await self.process_queued_messages()
-        await asyncio.gather(
-            self.handle_real_time_messages(),
-            self.log_order_book_periodically()
-        )
+        # The snapshot loads in the background while diffs are buffered
+        await self.feed.resync()
+        try:
+            await asyncio.gather(
+                self.handle_real_time_messages(),
+                self.log_order_book_periodically()
+            )
+        finally:
+            await self.feed.close()
         
     async def connect_websocket(self):
         retry_delays = [
@@ -74,50 +72,6 @@ class BitsoOrderBook:
         await self.websocket.send(json.dumps(subscribe_message))
         response = await self.websocket.recv()
 
-    async def get_initial_order_book(self):
-        try:
-            response = requests.get(self.rest_url)
-            data = response.json()
-            if data['success']:
-                self.sequence = int(data['payload']['sequence'])
-                self.order_book['bids'] = {bid['price']: bid for bid in data['payload']['bids']}
-                self.order_book['asks'] = {ask['price']: ask for ask in data['payload']['asks']}
-                logger.debug(f"Initial order book loaded. Sequence: {self.sequence}")
-                await self.log_reference_prices()
-            else:
-                raise ValueError(f"Failed to get initial order book: {data['error']}")
-        except Exception as e:
-            logger.error(f"Error getting initial order book: {str(e)}")
-            raise
-
-    async def process_queued_messages(self):
-        while self.message_queue:
-            message = self.message_queue.popleft()
-            if message['sequence'] > self.sequence:
-                await self.apply_order_update(message)  # Await the coroutine
-                self.sequence = max(self.sequence, message['sequence'])
-
-    async def apply_order_update(self, update):
-        try:
-            price = update['r']
-            amount = update.get('a', '0')
-            status = update['s']
-            side = 'bids' if update['t'] == 0 else 'asks'
-
-            if status == 'cancelled' or float(amount) == 0:
-                self.order_book[side].pop(price, None)
-            else:
-                self.order_book[side][price] = {
-                    'book': self.book,
-                    'price': price,
-                    'amount': amount
-                }
-                logger.debug(f"Updated order: {side} {price} {amount}")
-            await self.log_reference_prices()
-        except Exception as e:
-            logger.error(f"Error applying order update: {e}", exc_info=True)
-            logger.error(f"Problematic update: {update}")
-
     async def handle_real_time_messages(self):
         while True:
             try:
@@ -128,16 +82,13 @@ class BitsoOrderBook:
                     continue
                 
                 if data['type'] == 'diff-orders':
-                    sequence = int(data['sequence'])
-                    if sequence > self.sequence:
-                        logger.debug(f"Processing message with sequence {sequence}")
-                        for update in data['payload']:
-                            await self.apply_order_update(update)  # Await the coroutine
-                        self.sequence = sequence
+                    await self.feed.on_frame(int(data['sequence']), data['payload'])
 
             except websockets.exceptions.ConnectionClosed:
                 logger.warning("WebSocket connection closed. Reconnecting...")
                 await self.connect_websocket()
+                # Diffs were missed while disconnected; keep serving the old book as stale
+                await self.feed.resync()
             except json.JSONDecodeError:
                 logger.error("Failed to parse message")
             except Exception as e:
@@ -150,40 +101,16 @@ class BitsoOrderBook:
             self.log_order_book()
 
     def log_order_book(self):
-        for price, order in sorted(self.order_book['bids'].items(), reverse=True)[:5]:
-            logger.debug(f"  Price: {price}, Amount: {order.get('amount', 'N/A')}")
-        for price, order in sorted(self.order_book['asks'].items())[:5]:
-            logger.debug(f"  Price: {price}, Amount: {order.get('amount', 'N/A')}")
-
-    def calculate_weighted_average(self, side, target_mxn):
-        total_mxn = 0
-        total_amount = 0
-        orders = sorted(self.order_book[side].items(), reverse=(side == 'bids'))
-        
-        for price, order in orders:
-            price = float(price)
-            amount = float(order['amount'])
-            value = price * amount
-            
-            mxn_to_add = min(value, target_mxn - total_mxn)
-            amount_to_add = mxn_to_add / price
-            
-            total_mxn += mxn_to_add
-            total_amount += amount_to_add
-            
-            if total_mxn >= target_mxn:
-                break
-        
-        return total_mxn / total_amount if total_amount > 0 else 0
+        engine = self.feed.engine
+        if self.feed.stale:
+            logger.debug(f"{self.book} order book is stale: {self.feed.stats()}")
+        for price, amount in engine.bids.top(5):
+            logger.debug(f"  Price: {price}, Amount: {amount}")
+        for price, amount in engine.asks.top(5):
+            logger.debug(f"  Price: {price}, Amount: {amount}")
 
     def get_reference_prices(self):
-        highest_bid_wavg = self.calculate_weighted_average('bids', 50000)
-        lowest_ask_wavg = self.calculate_weighted_average('asks', 50000)
-        return highest_bid_wavg, lowest_ask_wavg
-
-    async def log_reference_prices(self):
-        highest_bid_wavg, lowest_ask_wavg = self.get_reference_prices()
-        await bitso_cache.update_reference_prices(highest_bid_wavg, lowest_ask_wavg)
+        return self.feed.engine.reference_prices()
 
 async def start_bitso_order_book():
     order_book = BitsoOrderBook("usdt_mxn")
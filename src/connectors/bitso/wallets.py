@@ -1,3 +1,4 @@
+import asyncio
 import json
 import requests
 import time
@@ -54,7 +55,8 @@ class BitsoWallets:
             return []
     async def save_balances_to_db(self, account):
         exchange_id = 2
-        original_balances = self.get_balances()
+        # requests is blocking; keep it off the event loop
+        original_balances = await asyncio.to_thread(self.get_balances)
         adjusted_balances = {}   
         for asset_balance in original_balances:
             asset = self._convert_currency_code(asset_balance['currency']).upper()
@@ -63,7 +65,7 @@ class BitsoWallets:
             if balance != 0.0:
                 adjusted_balances[asset] = balance
         
-        update_balance(exchange_id, account, adjusted_balances)
+        await update_balance(exchange_id, account, adjusted_balances)
         return adjusted_balances
     def _convert_currency_code(self, currency_code):
         conversion_map = {
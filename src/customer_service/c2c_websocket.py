@@ -4,6 +4,7 @@ import json
 import websockets
 
 from src.customer_service.merchant_handler import MerchantAccount
+from src.data.cache.order_cache import OrderCache
 from src.utils.common_utils import get_server_timestamp
 from src.data.database.connection import create_connection, DB_FILE
 from src.connectors.credentials import credentials_dict
@@ -211,6 +212,7 @@ async def main_binance_c2c(payment_manager, binance_api):
         for account in credentials_dict.keys()
     ]
     tasks.append(asyncio.create_task(connection_manager.check_connections()))
+    tasks.append(asyncio.create_task(OrderCache.run_eviction()))
     
     # Add the validation processor task to the list of tasks
     tasks.append(validation_processor_task)
@@ -0,0 +1,82 @@
+# bpa/completion_jobs.py
+"""
+Side effects of a completed SELL order, run by the job queue instead of the
+chat handler. Each effect is its own job keyed by order number, so a retry
+only repeats the step that failed.
+"""
+from dataclasses import dataclass
+
+from src.data.database.job_queue import Job, JobQueue
+from src.data.database.operations.binance_db_get import get_account_number
+from src.data.database.operations.binance_db_set import update_total_spent
+from src.data.database.deposits.binance_bank_deposit_db import log_deposit
+from src.data.database.deposits.binance_bank_deposit import PaymentManager
+from src.connectors.binance.orders import binance_buy_order
+import logging
+from src.utils.logging_config import setup_logging
+
+setup_logging(log_filename='binance_main.log')
+logger = logging.getLogger(__name__)
+
+RESTOCK_ASSETS = ['BTC', 'ETH']
+
+
+@dataclass
+class RestockAssetJob(Job):
+    JOB_TYPE = 'restock_asset'
+    orderNumber: str
+    asset: str
+
+    def idempotency_key(self) -> str:
+        return f"{self.JOB_TYPE}:{self.orderNumber}"
+
+
+@dataclass
+class UpdateTotalSpentJob(Job):
+    JOB_TYPE = 'update_total_spent'
+    orderNumber: str
+
+    def idempotency_key(self) -> str:
+        return f"{self.JOB_TYPE}:{self.orderNumber}"
+
+
+@dataclass
+class LogDepositJob(Job):
+    JOB_TYPE = 'log_deposit'
+    orderNumber: str
+    buyerName: str
+    totalPrice: float
+
+    def idempotency_key(self) -> str:
+        return f"{self.JOB_TYPE}:{self.orderNumber}"
+
+
+async def handle_restock_asset(job: RestockAssetJob, conn) -> None:
+    await binance_buy_order(job.asset)
+
+
+async def handle_update_total_spent(job: UpdateTotalSpentJob, conn) -> None:
+    await update_total_spent(conn, job.orderNumber)
+
+
+async def handle_log_deposit(job: LogDepositJob, conn) -> None:
+    bank_account_number = await get_account_number(conn, job.orderNumber)
+    await log_deposit(conn, job.buyerName, bank_account_number, job.totalPrice)
+    # The deposit now counts towards the limits, so the reservation must not too
+    (await PaymentManager.get_instance()).release_reservation(job.orderNumber)
+
+
+def register_completion_jobs(queue: JobQueue) -> None:
+    queue.register(RestockAssetJob, handle_restock_asset)
+    queue.register(UpdateTotalSpentJob, handle_update_total_spent)
+    queue.register(LogDepositJob, handle_log_deposit)
+
+
+async def enqueue_order_completion(orderNumber: str, buyerName: str, asset: str, totalPrice: float) -> None:
+    """Queue every completion side effect for an order."""
+    queue = await JobQueue.get_instance()
+    if asset in RESTOCK_ASSETS:
+        await queue.enqueue(RestockAssetJob(orderNumber, asset))
+    await queue.enqueue(UpdateTotalSpentJob(orderNumber))
+    await queue.enqueue(LogDepositJob(orderNumber, buyerName, float(totalPrice)))
+    logger.debug(f"Queued completion jobs for order {orderNumber}")
@@ -1,5 +1,7 @@
 import aiosqlite
 
+from src.data.cache.blacklist_index import BlacklistIndex
+
 async def initialize_database(conn):
     await conn.execute(
         """
@@ -19,6 +21,7 @@ async def initialize_database(conn):
 async def clear_blacklist(conn):
     await conn.execute("DELETE FROM P2PBlacklist")
     await conn.commit()
+    BlacklistIndex.clear()
 
 # Modify the function to accept response and anti_fraud_stage, both of which are optional
 async def add_to_blacklist(conn, name, order_no, country, response=None, anti_fraud_stage=0, merchant_id=None):
@@ -28,10 +31,13 @@ async def add_to_blacklist(conn, name, order_no, country, response=None, anti_fr
             (name, order_no, country, response, anti_fraud_stage, merchant_id)
         )
         await conn.commit()
+        BlacklistIndex.add(name, country)
     except aiosqlite.IntegrityError:
         pass
 
 async def is_blacklisted(conn, name):
+    if BlacklistIndex.is_loaded():
+        return BlacklistIndex.contains(name)
     cursor = await conn.execute("SELECT id FROM P2PBlacklist WHERE name = ?", (name,))
     result = await cursor.fetchone()
     return result is not None
@@ -39,13 +45,17 @@ async def is_blacklisted(conn, name):
 async def remove_from_blacklist(conn, name):
     await conn.execute("DELETE FROM P2PBlacklist WHERE name = ?", (name,))
     await conn.commit()
+    BlacklistIndex.remove(name)
 
 # Make an async function that removes users from the blacklist whose country is none
 async def remove_from_blacklist_no_country(conn):
     await conn.execute("DELETE FROM P2PBlacklist WHERE country IS NULL")
     await conn.commit()
+    BlacklistIndex.remove_countries([None])
     
 async def get_blacklist_counts_by_country(conn):
+    if BlacklistIndex.is_loaded():
+        return BlacklistIndex.counts_by_country()
     query = """
     SELECT country, COUNT(*) as count
     FROM P2PBlacklist
@@ -60,6 +70,7 @@ async def remove_from_blacklist_accepted_countries(conn, accepted_countries):
     query = f"DELETE FROM P2PBlacklist WHERE country IN ({placeholders})"
     await conn.execute(query, accepted_countries)
     await conn.commit()
+    BlacklistIndex.remove_countries(accepted_countries)
 
 # New function to update the merchant_id for a given order_no
 async def update_merchant_id(conn, order_no, merchant_id):
@@ -20,7 +20,7 @@ from enum import Enum
 
 from src.data.cache.order_cache import OrderCache
 from src.customer_service.kyc.blacklist import add_to_blacklist
-from src.data.database.operations.binance_db_set import update_anti_fraud_stage, update_buyer_bank, update_kyc_status, update_order_details
+from src.data.database.operations.write_behind import WriteBehindJournal
 from src.data.database.operations.binance_db_get import get_order_details
 from src.customer_service.kyc.language_selection import LanguageSelector
 from src.localization.lang_utils import (
@@ -155,11 +155,11 @@ class VerificationProcessor:
         await OrderCache.update_fields(order_no, {field: value})
         
         if field == 'anti_fraud_stage':
-            await update_anti_fraud_stage(self.conn, buyer_name, value)
+            WriteBehindJournal.record_user(buyer_name, anti_fraud_stage=value)
         elif field == 'buyer_bank':
-            await update_buyer_bank(self.conn, buyer_name, value)
+            WriteBehindJournal.record_user(buyer_name, user_bank=value)
         elif field == 'kyc_status':
-            await update_kyc_status(self.conn, buyer_name, value)
+            WriteBehindJournal.record_user(buyer_name, kyc_status=value)
     
     async def handle_fraud_detection(
         self,
@@ -254,11 +254,10 @@ class VerificationProcessor:
             }
             await OrderCache.update_fields(order_no, cache_updates)
             
-            await update_order_details(
-                self.conn,
+            WriteBehindJournal.record_order(
                 order_no,
-                payment_details['account_number'],
-                payment_details.get('bank_name')
+                account_number=payment_details['account_number'],
+                seller_bank=payment_details.get('bank_name')
             )
         
         # Send appropriate payment warning and details
@@ -18,17 +18,16 @@ from src.localization.lang_utils import (
     determine_language
 )
 from src.data.database.operations.binance_db_get import (
-    get_account_number, is_menu_presented, get_kyc_status,
+    is_menu_presented, get_kyc_status,
     get_anti_fraud_stage, get_buyer_bank, get_order_details,
     get_returning_customer_stage
 )
 
 from src.data.database.operations.binance_db_set import (
-    update_order_status, update_total_spent, update_buyer_bank,
     set_menu_presented
 )
-from src.data.database.deposits.binance_bank_deposit_db import log_deposit
-from src.connectors.binance.orders import binance_buy_order
+from src.data.database.operations.write_behind import WriteBehindJournal
+from src.customer_service.completion_jobs import enqueue_order_completion
 from src.customer_service.kyc.initial_verification import handle_user_verification
 from src.customer_service.kyc.blacklist import is_blacklisted
 from src.utils.common_vars import status_map
@@ -183,7 +182,9 @@ class MerchantAccount:
                 return
 
             orderStatus = status_map[system_type_str]
-            await update_order_status(conn, order_data.orderNumber, orderStatus)
+            WriteBehindJournal.record_order(order_data.orderNumber, orderStatus=orderStatus)
+            # Keep the cached status current so sync_to_db does not write back a stale one
+            await OrderCache.update_fields(order_data.orderNumber, {'orderStatus': orderStatus})
             order_data.orderStatus = orderStatus
             await self.handle_system_notifications(
                 connection_manager,
@@ -288,6 +289,10 @@ class MerchantAccount:
                     user_help = await get_default_help(language_for_reply)
                     await connection_manager.send_text_message(account, user_help, order_data.orderNumber)
             
+            # A cancelled order no longer holds its amount against the assigned account
+            if orderStatus in (6, 7):
+                self.payment_manager.release_reservation(order_data.orderNumber)
+
             # Clean up cache for terminal states
             if orderStatus in TERMINAL_STATES:
                 await OrderCache.sync_to_db(conn, order_data.orderNumber)
@@ -323,7 +328,7 @@ class MerchantAccount:
             
             # Handle special payType case
             if order_data.payType in ['OXXO', 'Zelle', 'SkrillMoneybookers']:
-                await update_buyer_bank(conn, order_data.buyerName, order_data.payType)
+                WriteBehindJournal.record_user(order_data.buyerName, user_bank=order_data.payType)
 
             # ALL new customers go through verification
             if kyc_status == 0 or kyc_status is None:
@@ -389,16 +394,12 @@ class MerchantAccount:
         """Handle order status 4 (completion) for SELL orders."""
         try:
             await self._generic_reply(connection_manager, account, order_data, 4, conn)
-            
-            if order_data.asset in ['BTC', 'ETH']:
-                await binance_buy_order(order_data.asset)
-            
-            await update_total_spent(conn, order_data.orderNumber)
-            bank_account_number = await get_account_number(conn, order_data.orderNumber)
-            await log_deposit(
-                conn,
+
+            # Restock, spend totals and deposit logging run in the job queue
+            await enqueue_order_completion(
+                order_data.orderNumber,
                 order_data.buyerName,
-                bank_account_number,
+                order_data.asset,
                 order_data.totalPrice
             )
 
@@ -770,11 +771,10 @@ class MerchantAccount:
                     logger.error(f"No image URL provided for order {order_data.orderNumber}")
                     return
 
-                # Get and validate buyer's bank
+                # Get buyer's bank; if unknown, the bank is detected from the receipt
                 buyer_bank = await get_buyer_bank(conn, order_data.buyerName)
                 if not buyer_bank:
-                    logger.error(f"No buyer bank found for {order_data.buyerName} in order {order_data.orderNumber}")
-                    return
+                    logger.info(f"No buyer bank found for {order_data.buyerName} in order {order_data.orderNumber}, detecting it from the receipt")
 
                 # Get and validate seller's bank
                 order_details = await get_order_details(conn, order_data.orderNumber)
@@ -12,7 +12,8 @@ from src.localization.lang_utils import (
     get_anti_fraud_user_denied, get_customer_verification_messages
 )
 from src.utils.common_vars import NOT_ACCEPTED_BANKS, ACCEPTED_BANKS, normalize_bank_name
-from src.data.database.operations.binance_db_set import update_buyer_bank, update_returning_customer_stage
+from src.data.database.operations.binance_db_set import update_returning_customer_stage
+from src.data.database.operations.write_behind import WriteBehindJournal
 from src.utils.common_utils import send_messages
 import logging
 from src.utils.logging_config import setup_logging
@@ -82,7 +83,7 @@ async def handle_bank_verification(
 
         if standard_bank_name in [normalize_bank_name(bank) for bank in ACCEPTED_BANKS]:
             await OrderCache.update_fields(orderNumber, {'buyer_bank': standard_bank_name})
-            await update_buyer_bank(conn, buyerName, standard_bank_name)
+            WriteBehindJournal.record_user(buyerName, user_bank=standard_bank_name)
             logger.info(f"Bank {standard_bank_name} verified successfully for buyer {buyerName}")
             return standard_bank_name
         
@@ -0,0 +1,139 @@
+# bpa/ad_store.py
+"""
+Copy-on-write store of our own ads.
+
+Every write builds a new AdSnapshot (the ads plus secondary indexes by
+trade_type, Group, account and (asset_type, fiat)) and swaps it in with a
+single assignment. Readers take the current snapshot and use it without a
+lock: it is never modified afterwards, and the ads in it are read-only.
+Writers do not await while building a version, so on one event loop they
+cannot interleave and need no lock either.
+
+Indexes are only rebuilt when a write touches an indexed field; price and
+amount updates from the repricer reuse the previous indexes.
+
+Ads are stored as OwnAd records, parsed once on the way in.
+"""
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from src.data.cache.own_ad import OwnAd
+from src.utils.logging_config import setup_logging
+
+logger = setup_logging(log_filename='binance_main.log')
+
+Ad = OwnAd
+
+# index name -> function of an ad giving its key in that index
+INDEXES = {
+    'trade_type': lambda ad: ad.trade_type,
+    'group': lambda ad: ad.Group,
+    'account': lambda ad: ad.account,
+    'asset_fiat': lambda ad: (ad.asset_type, ad.fiat),
+}
+INDEXED_FIELDS = frozenset({'trade_type', 'Group', 'account', 'asset_type', 'fiat'})
+
+
+def _build_indexes(ads: Mapping[str, Ad]) -> Dict[str, Mapping[Any, Tuple[str, ...]]]:
+    indexes = {}
+    for name, key_of in INDEXES.items():
+        buckets: Dict[Any, list] = {}
+        for advNo, ad in ads.items():
+            buckets.setdefault(key_of(ad), []).append(advNo)
+        indexes[name] = MappingProxyType({key: tuple(advNos) for key, advNos in buckets.items()})
+    return indexes
+
+
+@dataclass(frozen=True)
+class AdSnapshot:
+    version: int = 0
+    ads: Mapping[str, Ad] = field(default_factory=lambda: MappingProxyType({}))
+    indexes: Mapping[str, Mapping[Any, Tuple[str, ...]]] = field(
+        default_factory=lambda: _build_indexes({}))
+
+    def get(self, advNo: str) -> Optional[Ad]:
+        return self.ads.get(advNo)
+
+    def all(self) -> Tuple[Ad, ...]:
+        return tuple(self.ads.values())
+
+    def lookup(self, index: str, key: Any) -> Tuple[Ad, ...]:
+        return tuple(self.ads[advNo] for advNo in self.indexes[index].get(key, ()))
+
+    def by_trade_type(self, trade_type: str) -> Tuple[Ad, ...]:
+        return self.lookup('trade_type', trade_type)
+
+    def by_group(self, group: str) -> Tuple[Ad, ...]:
+        return self.lookup('group', group)
+
+    def by_account(self, account: str) -> Tuple[Ad, ...]:
+        return self.lookup('account', account)
+
+    def by_asset_fiat(self, asset_type: str, fiat: str) -> Tuple[Ad, ...]:
+        return self.lookup('asset_fiat', (asset_type, fiat))
+
+    def __len__(self) -> int:
+        return len(self.ads)
+
+
+class AdStore:
+    _snapshot = AdSnapshot()
+
+    @classmethod
+    def snapshot(cls) -> AdSnapshot:
+        """The current version; consistent for as long as the caller holds it."""
+        return cls._snapshot
+
+    @classmethod
+    def _publish(cls, ads: Dict[str, Ad], reindex: bool) -> AdSnapshot:
+        current = cls._snapshot
+        indexes = _build_indexes(ads) if reindex else current.indexes
+        cls._snapshot = AdSnapshot(current.version + 1, MappingProxyType(ads), indexes)
+        return cls._snapshot
+
+    @classmethod
+    def put_many(cls, ads: Iterable[Mapping[str, Any]]) -> AdSnapshot:
+        """Insert or replace whole ads (keyed by advNo) in one new version."""
+        new_ads = dict(cls._snapshot.ads)
+        for ad in ads:
+            ad = OwnAd.parse(ad)
+            new_ads[ad.advNo] = ad
+        return cls._publish(new_ads, reindex=True)
+
+    @classmethod
+    def put(cls, ad: Mapping[str, Any]) -> AdSnapshot:
+        return cls.put_many([ad])
+
+    @classmethod
+    def update_many(cls, updates: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        Apply (advNo, fields) updates in one new version. Only fields an ad
+        already has are changed, and unknown ads are skipped. Returns the number
+        of ads updated.
+        """
+        current = cls._snapshot.ads
+        changed: Dict[str, Ad] = {}
+        reindex = False
+        for advNo, fields in updates:
+            ad = changed.get(advNo) or current.get(advNo)
+            if ad is None:
+                logger.warning(f"Ad {advNo} not found in shared data.")
+                continue
+            applied = {key: value for key, value in fields.items() if key in ad}
+            if not applied:
+                continue
+            updated = ad.replace(**applied)
+            reindex = reindex or any(ad[key] != updated[key] for key in applied if key in INDEXED_FIELDS)
+            changed[advNo] = updated
+        if changed:
+            cls._publish({**current, **changed}, reindex)
+        return len(changed)
+
+    @classmethod
+    def update(cls, advNo: str, **fields: Any) -> bool:
+        return cls.update_many([(advNo, fields)]) == 1
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._snapshot = AdSnapshot(cls._snapshot.version + 1)
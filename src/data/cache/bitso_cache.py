@@ -1,10 +1,12 @@
 # TESTbitso_order_book_cache.py
 import asyncio
 
-# Global cache for storing reference prices
+# Global cache for storing reference prices. 'stale' is set while the Bitso
+# book is resyncing: the prices are then the last good ones.
 reference_prices = {
     'highest_bid': None,
-    'lowest_ask': None
+    'lowest_ask': None,
+    'stale': True
 }
 price_lock = asyncio.Lock()
 
@@ -13,6 +15,11 @@ async def update_reference_prices(highest_bid, lowest_ask):
     async with price_lock:
         reference_prices['highest_bid'] = highest_bid
         reference_prices['lowest_ask'] = lowest_ask
+        reference_prices['stale'] = False
+
+async def mark_reference_prices_stale():
+    async with price_lock:
+        reference_prices['stale'] = True
 
 async def get_reference_prices():
     async with price_lock:
@@ -0,0 +1,82 @@
+# bpa/blacklist_index.py
+"""
+In-memory index of the P2PBlacklist table.
+
+All names and their countries are loaded once at startup. The blacklist
+helpers apply every change incrementally, so membership checks and the
+per-country counts are answered without touching SQLite. Until load() has run,
+callers fall back to querying the table.
+"""
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.utils.logging_config import setup_logging
+
+logger = setup_logging(log_filename='binance_main.log')
+
+
+class BlacklistIndex:
+    _countries: Dict[str, Optional[str]] = {}
+    _country_counts: Counter = Counter()
+    _loaded = False
+
+    @classmethod
+    def is_loaded(cls) -> bool:
+        return cls._loaded
+
+    @classmethod
+    async def load(cls, conn) -> int:
+        """Load every blacklisted name. Returns the number of entries."""
+        try:
+            async with conn.execute("SELECT name, country FROM P2PBlacklist") as cursor:
+                rows = await cursor.fetchall()
+            cls._countries = {name: country for name, country in rows}
+            cls._country_counts = Counter(cls._countries.values())
+            cls._loaded = True
+            logger.info(f"Loaded {len(cls._countries)} blacklisted users into memory")
+            return len(cls._countries)
+        except Exception as e:
+            logger.error(f"Error loading blacklist index: {e}")
+            return 0
+
+    @classmethod
+    def contains(cls, name: str) -> bool:
+        return name in cls._countries
+
+    @classmethod
+    def add(cls, name: str, country: Optional[str]) -> None:
+        # Mirrors INSERT OR IGNORE: the first entry for a name wins
+        if name in cls._countries:
+            return
+        cls._countries[name] = country
+        cls._country_counts[country] += 1
+
+    @classmethod
+    def remove(cls, name: str) -> None:
+        if name not in cls._countries:
+            return
+        country = cls._countries.pop(name)
+        cls._country_counts[country] -= 1
+        if cls._country_counts[country] <= 0:
+            del cls._country_counts[country]
+
+    @classmethod
+    def remove_countries(cls, countries: Iterable[Optional[str]]) -> None:
+        """Drop every entry whose country is in `countries` (None for no country)."""
+        countries = set(countries)
+        for name in [name for name, country in cls._countries.items() if country in countries]:
+            cls.remove(name)
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._countries.clear()
+        cls._country_counts.clear()
+
+    @classmethod
+    def counts_by_country(cls) -> List[Tuple[Optional[str], int]]:
+        """Same shape and order as SELECT country, COUNT(*) ... GROUP BY country."""
+        return sorted(cls._country_counts.items(), key=lambda item: (item[0] is not None, item[0] or ''))
+
+    @classmethod
+    def size(cls) -> int:
+        return len(cls._countries)
@@ -0,0 +1,118 @@
+# bpa/deposit_ledger.py
+"""
+In-memory running totals of the deposits table.
+
+Holds today's and this month's deposited amounts per account and per
+(account, buyer). Totals are rebuilt from SQLite at startup and updated by
+log_deposit, so PaymentManager's limit checks are dictionary lookups instead
+of SUM scans. When the day or month changes, the matching totals restart from
+zero. Until load() has run, callers fall back to querying the table.
+"""
+import datetime
+from typing import Dict, Optional, Tuple
+
+from src.utils.logging_config import setup_logging
+
+logger = setup_logging(log_filename='binance_main.log')
+
+
+class DepositLedger:
+    _daily: Dict[str, float] = {}
+    _monthly: Dict[str, float] = {}
+    _daily_by_buyer: Dict[Tuple[str, str], float] = {}
+    _monthly_by_buyer: Dict[Tuple[str, str], float] = {}
+    _day: Optional[datetime.date] = None
+    _month: Optional[Tuple[int, int]] = None
+    _loaded = False
+
+    @classmethod
+    def is_loaded(cls) -> bool:
+        return cls._loaded
+
+    @classmethod
+    async def load(cls, conn) -> int:
+        """Rebuild the totals from the deposits table. Returns the number of (account, buyer) pairs."""
+        try:
+            now = datetime.datetime.now()
+            start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            start_of_month = start_of_day.replace(day=1)
+            query = '''
+                SELECT account_details, deposit_from, SUM(amount_deposited)
+                FROM deposits WHERE timestamp >= ?
+                GROUP BY account_details, deposit_from
+            '''
+            async with conn.execute(query, (start_of_month,)) as cursor:
+                monthly_rows = await cursor.fetchall()
+            async with conn.execute(query, (start_of_day,)) as cursor:
+                daily_rows = await cursor.fetchall()
+
+            cls._reset_day(now.date())
+            cls._reset_month((now.year, now.month))
+            for rows, totals, by_buyer in ((monthly_rows, cls._monthly, cls._monthly_by_buyer),
+                                           (daily_rows, cls._daily, cls._daily_by_buyer)):
+                for account, buyer, amount in rows:
+                    amount = amount or 0.0
+                    totals[account] = totals.get(account, 0.0) + amount
+                    if buyer:
+                        by_buyer[(account, buyer)] = amount
+            cls._loaded = True
+            logger.info(f"Loaded deposit ledger: {len(cls._monthly)} accounts, "
+                        f"{len(cls._monthly_by_buyer)} account/buyer pairs this month")
+            return len(monthly_rows)
+        except Exception as e:
+            logger.error(f"Error loading deposit ledger: {e}")
+            return 0
+
+    @classmethod
+    def _reset_day(cls, day: datetime.date) -> None:
+        cls._day = day
+        cls._daily = {}
+        cls._daily_by_buyer = {}
+
+    @classmethod
+    def _reset_month(cls, month: Tuple[int, int]) -> None:
+        cls._month = month
+        cls._monthly = {}
+        cls._monthly_by_buyer = {}
+
+    @classmethod
+    def _roll(cls) -> None:
+        """Start new totals once the day or month has changed."""
+        today = datetime.date.today()
+        if today != cls._day:
+            cls._reset_day(today)
+            if (today.year, today.month) != cls._month:
+                cls._reset_month((today.year, today.month))
+
+    @classmethod
+    def record(cls, account_details: str, deposit_from: Optional[str], amount: float) -> None:
+        """Apply a deposit that was just written to the deposits table."""
+        if not cls._loaded:
+            return
+        cls._roll()
+        amount = amount or 0.0
+        cls._daily[account_details] = cls._daily.get(account_details, 0.0) + amount
+        cls._monthly[account_details] = cls._monthly.get(account_details, 0.0) + amount
+        if deposit_from:
+            key = (account_details, deposit_from)
+            cls._daily_by_buyer[key] = cls._daily_by_buyer.get(key, 0.0) + amount
+            cls._monthly_by_buyer[key] = cls._monthly_by_buyer.get(key, 0.0) + amount
+
+    @classmethod
+    def daily_total(cls, account_details: str, buyer_name: Optional[str] = None) -> float:
+        cls._roll()
+        if buyer_name:
+            return cls._daily_by_buyer.get((account_details, buyer_name), 0.0)
+        return cls._daily.get(account_details, 0.0)
+
+    @classmethod
+    def monthly_total(cls, account_details: str, buyer_name: Optional[str] = None) -> float:
+        cls._roll()
+        if buyer_name:
+            return cls._monthly_by_buyer.get((account_details, buyer_name), 0.0)
+        return cls._monthly.get(account_details, 0.0)
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._reset_day(None)
+        cls._reset_month(None)
@@ -1,139 +1,229 @@
 # bpa/binance_order_cache.py
+"""
+In-memory cache for active P2P orders.
+
+Entries are compact: only the fields the chat handlers actually read are kept,
+not the full `orders` row. The cache is bounded (LRU), entries expire after a
+fixed TTL or after sitting idle, and mutations are serialized per order through
+a small set of sharded locks instead of one global lock.
+
+Reads never take a lock: dict operations are atomic on the event loop, and a
+shard lock is only needed around read-modify-write sequences that await.
+"""
 import asyncio
+import time
+from collections import OrderedDict
 from typing import Dict, Any, Optional
 
-from src.data.cache.async_dict import AsyncSafeDict
+from src.data.database.operations.write_behind import WriteBehindJournal
 from src.utils.logging_config import setup_logging
 
 logger = setup_logging(log_filename='binance_main.log')
 
+# Fields read by MerchantAccount._extract_order_data, the verification flows
+# and sync_to_db. Everything else in the `orders` row is left in the database.
+CACHED_ORDER_FIELDS = (
+    'orderNumber', 'buyerName', 'sellerName', 'tradeType', 'fiatUnit',
+    'totalPrice', 'asset', 'orderStatus', 'account_number', 'buyer_bank',
+    'payType', 'returning_customer_stage', 'seller_bank',
+    'anti_fraud_stage', 'kyc_status',
+)
+
+MAX_CACHED_ORDERS = 2000
+ORDER_TTL_SECONDS = 6 * 60 * 60       # Hard limit since the order was cached
+ORDER_IDLE_SECONDS = 60 * 60          # Evict orders nobody touched for an hour
+EVICTION_INTERVAL_SECONDS = 60
+LOCK_SHARDS = 16
+
+_MISSING = object()
+
+
+class CachedOrder:
+    """Compact cache entry holding only CACHED_ORDER_FIELDS."""
+    __slots__ = CACHED_ORDER_FIELDS + ('created_at', 'last_access')
+
+    def __init__(self, order_data: Dict[str, Any], now: float):
+        for field in CACHED_ORDER_FIELDS:
+            setattr(self, field, order_data.get(field, _MISSING))
+        self.created_at = now
+        self.last_access = now
+
+    def update(self, fields: Dict[str, Any]) -> None:
+        for field, value in fields.items():
+            if field in CACHED_ORDER_FIELDS:
+                setattr(self, field, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the cached fields as a plain dict, skipping fields never set."""
+        result = {}
+        for field in CACHED_ORDER_FIELDS:
+            value = getattr(self, field)
+            if value is not _MISSING:
+                result[field] = value
+        return result
+
+
 class OrderCache:
-    _orders_dict = AsyncSafeDict()
-    _lock = asyncio.Lock()
-    
+    _orders: 'OrderedDict[str, CachedOrder]' = OrderedDict()
+    _shard_locks = [asyncio.Lock() for _ in range(LOCK_SHARDS)]
+    _hits = 0
+    _misses = 0
+    _evictions = 0
+
+    @classmethod
+    def _lock_for(cls, orderNumber: str) -> asyncio.Lock:
+        return cls._shard_locks[hash(orderNumber) % LOCK_SHARDS]
+
+    @classmethod
+    def _is_expired(cls, entry: CachedOrder, now: float) -> bool:
+        return (now - entry.created_at > ORDER_TTL_SECONDS
+                or now - entry.last_access > ORDER_IDLE_SECONDS)
+
+    @classmethod
+    def _evict(cls, orderNumber: str) -> None:
+        if cls._orders.pop(orderNumber, None) is not None:
+            cls._evictions += 1
+
+    @classmethod
+    def _touch(cls, orderNumber: str, now: float) -> Optional[CachedOrder]:
+        """Return a live entry and mark it as most recently used."""
+        entry = cls._orders.get(orderNumber)
+        if entry is None:
+            return None
+        if cls._is_expired(entry, now):
+            cls._evict(orderNumber)
+            return None
+        entry.last_access = now
+        cls._orders.move_to_end(orderNumber)
+        return entry
+
     @classmethod
     async def get_order(cls, orderNumber: str) -> Optional[Dict[str, Any]]:
         """Get order from cache."""
-        async with cls._lock:
-            order = await cls._orders_dict.get(orderNumber)
-            if order:
-                logger.debug(f"Order {orderNumber} retrieved from cache")
-            else:
-                logger.debug(f"Order {orderNumber} not found in cache")
-            return order
-    
+        entry = cls._touch(orderNumber, time.monotonic())
+        if entry is None:
+            cls._misses += 1
+            return None
+        cls._hits += 1
+        return entry.to_dict()
+
     @classmethod
     async def set_order(cls, orderNumber: str, order_data: Dict[str, Any]) -> bool:
         """Add or update order in cache."""
         try:
-            async with cls._lock:
-                await cls._orders_dict.put(orderNumber, order_data)
-                logger.debug(f"Order {orderNumber} cached with data: {order_data}")
+            async with cls._lock_for(orderNumber):
+                cls._orders[orderNumber] = CachedOrder(order_data, time.monotonic())
+                cls._orders.move_to_end(orderNumber)
+                while len(cls._orders) > MAX_CACHED_ORDERS:
+                    oldest, _ = cls._orders.popitem(last=False)
+                    cls._evictions += 1
+                    logger.debug(f"Evicted least recently used order {oldest} from cache")
+            logger.debug(f"Order {orderNumber} cached")
             return True
         except Exception as e:
             logger.error(f"Error caching order {orderNumber}: {e}")
             return False
-    
+
     @classmethod
     async def update_fields(cls, orderNumber: str, fields: Dict[str, Any]) -> bool:
         """Update specific fields of cached order."""
-        async with cls._lock:
-            order_data = await cls._orders_dict.get(orderNumber)
-            if order_data is not None:
-                order_data.update(fields)
-                await cls._orders_dict.put(orderNumber, order_data)
-                logger.debug(f"Updated order {orderNumber} with fields: {fields}")
-                return True
-            else:
+        async with cls._lock_for(orderNumber):
+            entry = cls._touch(orderNumber, time.monotonic())
+            if entry is None:
                 logger.warning(f"Order {orderNumber} not found in cache for update")
                 return False
-    
+            entry.update(fields)
+            logger.debug(f"Updated order {orderNumber} fields: {list(fields)}")
+            return True
+
     @classmethod
     async def sync_to_db(cls, conn, orderNumber: str) -> bool:
-        """Sync all cached order changes to database."""
-        async with cls._lock:
-            order_data = await cls._orders_dict.get(orderNumber)
-            if not order_data:
+        """
+        Queue all cached order changes for the database.
+
+        Fields are recorded in the write-behind journal, which flushes them in
+        one transaction; `conn` is kept for callers that still pass it.
+        """
+        async with cls._lock_for(orderNumber):
+            entry = cls._orders.get(orderNumber)
+            if entry is None:
                 logger.warning(f"Order {orderNumber} not found in cache for sync")
                 return False
-            
+            order_data = entry.to_dict()
+
             try:
-                # Import all necessary update functions
-                from data.database.operations.binance_db_set import (
-                    update_anti_fraud_stage, 
-                    update_buyer_bank,
-                    update_kyc_status,
-                    update_order_details,
-                    update_order_status
-                )
-                
-                # Handle anti-fraud stage updates using new field names
-                if 'anti_fraud_stage' in order_data:
-                    buyerName = order_data.get('buyerName')
-                    if buyerName:
-                        await update_anti_fraud_stage(
-                            conn, 
-                            buyerName, 
-                            order_data.get('anti_fraud_stage')
-                        )
-                
-                # Handle buyer bank updates using new field names
-                if 'buyer_bank' in order_data:
-                    buyerName = order_data.get('buyerName')
-                    if buyerName:
-                        await update_buyer_bank(
-                            conn,
-                            buyerName,
-                            order_data.get('buyer_bank')
-                        )
-                
-                # Handle KYC status updates using new field names
-                if 'kyc_status' in order_data:
-                    buyerName = order_data.get('buyerName')
-                    if buyerName:
-                        await update_kyc_status(
-                            conn,
-                            buyerName,
-                            order_data.get('kyc_status')
-                        )
-                
-                # Handle order status updates using new field names
-                if 'orderStatus' in order_data:
-                    await update_order_status(
-                        conn,
-                        orderNumber,
-                        order_data.get('orderStatus')
-                    )
-                
-                # Handle order details updates using new field names
-                if 'account_number' in order_data and 'seller_bank' in order_data:
-                    await update_order_details(
-                        conn,
-                        orderNumber,
-                        order_data.get('account_number'),
-                        order_data.get('seller_bank')
-                    )
-                
-                logger.debug(f"Synced order {orderNumber} to database")
+                # A field the order never loaded is None here; writing it would
+                # overwrite the stored value (users.user_bank in particular)
+                buyerName = order_data.get('buyerName')
+                if buyerName:
+                    user_fields = {
+                        column: order_data[field]
+                        for field, column in (('anti_fraud_stage', 'anti_fraud_stage'),
+                                              ('buyer_bank', 'user_bank'),
+                                              ('kyc_status', 'kyc_status'))
+                        if order_data.get(field) is not None
+                    }
+                    if user_fields:
+                        WriteBehindJournal.record_user(buyerName, **user_fields)
+
+                order_fields = {}
+                if order_data.get('orderStatus') is not None:
+                    order_fields['orderStatus'] = order_data['orderStatus']
+                if order_data.get('account_number') is not None and order_data.get('seller_bank') is not None:
+                    order_fields['account_number'] = order_data['account_number']
+                    order_fields['seller_bank'] = order_data['seller_bank']
+                if order_fields:
+                    WriteBehindJournal.record_order(orderNumber, **order_fields)
+
+                logger.debug(f"Queued order {orderNumber} for database sync")
                 return True
-                
+
             except Exception as e:
                 logger.error(f"Error syncing order {orderNumber} to database: {e}")
                 return False
-    
+
     @classmethod
     async def remove_order(cls, orderNumber: str) -> None:
         """Remove order from cache (e.g., when order is completed)."""
-        async with cls._lock:
-            order_data = await cls._orders_dict.get(orderNumber)
-            if order_data:
-                # Create a new dict without the order
-                all_items = await cls._orders_dict.items()
-                new_dict = {k: v for k, v in all_items if k != orderNumber}
-                cls._orders_dict._dict = new_dict
+        async with cls._lock_for(orderNumber):
+            if cls._orders.pop(orderNumber, None) is not None:
                 logger.debug(f"Removed order {orderNumber} from cache")
-    
+
+    @classmethod
+    async def clear_old_orders(cls, max_age_minutes: int = 60) -> int:
+        """Evict orders idle for longer than max_age_minutes or past their TTL."""
+        now = time.monotonic()
+        max_idle = max_age_minutes * 60
+        expired = [
+            orderNumber for orderNumber, entry in cls._orders.items()
+            if now - entry.last_access > max_idle or now - entry.created_at > ORDER_TTL_SECONDS
+        ]
+        for orderNumber in expired:
+            cls._evict(orderNumber)
+        if expired:
+            logger.info(f"Evicted {len(expired)} stale orders from cache")
+        return len(expired)
+
     @classmethod
-    async def clear_old_orders(cls, max_age_minutes: int = 60) -> None:
-        """Clear orders older than specified age (implement if needed)."""
-        pass
\ No newline at end of file
+    def stats(cls) -> Dict[str, Any]:
+        """Size and hit-rate metrics for monitoring."""
+        lookups = cls._hits + cls._misses
+        return {
+            'size': len(cls._orders),
+            'max_size': MAX_CACHED_ORDERS,
+            'hits': cls._hits,
+            'misses': cls._misses,
+            'hit_rate': cls._hits / lookups if lookups else 0.0,
+            'evictions': cls._evictions,
+        }
+
+    @classmethod
+    async def run_eviction(cls, interval: int = EVICTION_INTERVAL_SECONDS) -> None:
+        """Periodically evict stale orders and log cache metrics."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await cls.clear_old_orders(ORDER_IDLE_SECONDS // 60)
+                logger.debug(f"Order cache stats: {cls.stats()}")
+            except Exception as e:
+                logger.error(f"Error during order cache eviction: {e}")
@@ -0,0 +1,144 @@
+# bpa/own_ad.py
+"""
+Typed, read-only record for one of our own ads.
+
+Ads are parsed once where they enter the process (a DB read, SharedData.set_ad)
+into an OwnAd: numeric fields become int/float, payTypes becomes a tuple, and
+the repeated strings (assets, fiats, accounts, pay types) are interned, so
+every ad shares them and identical payTypes tuples are one object. The
+repricer and the DB layer read the fields as they are, without converting
+them again.
+
+OwnAd is a Mapping, so ad['price'], ad.get('Group') and dict(ad) keep
+working. It cannot be modified; replace() returns an updated copy.
+"""
+import json
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+AD_FIELDS = (
+    'advNo', 'target_spot', 'asset_type', 'price', 'floating_ratio', 'last_updated', 'account',
+    'surplused_amount', 'fiat', 'transAmount', 'payTypes', 'Group', 'trade_type', 'minTransAmount',
+)
+_FIELD_SET = frozenset(AD_FIELDS)
+_INTERNED_FIELDS = ('asset_type', 'account', 'fiat', 'Group', 'trade_type')
+
+_pay_types_cache: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def ensure_numeric(value, default=0):
+    """Convert value to int/float (int for whole-number strings), or default."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value) if '.' in value else int(value)
+        except (ValueError, TypeError):
+            return default
+    return default
+
+
+def ensure_integer(value, default=0):
+    """Convert value to int, or default."""
+    if value is None:
+        return default
+    if isinstance(value, int):
+        return value
+    try:
+        return int(float(value))
+    except (ValueError, TypeError):
+        return default
+
+
+def parse_pay_types(value) -> Optional[Tuple[str, ...]]:
+    """A list, JSON array string, single pay type or None, as a shared tuple (None stays None)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        stripped = value.strip()
+        if stripped.startswith('['):
+            value = json.loads(stripped)
+        elif not stripped:
+            return None
+        else:
+            value = [stripped]
+    pay_types = tuple(sys.intern(str(pay_type)) for pay_type in value)
+    return _pay_types_cache.setdefault(pay_types, pay_types)
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class OwnAd(Mapping):
+    __slots__ = AD_FIELDS
+
+    def __init__(self, advNo: str, target_spot: int = 0, asset_type: str = '', price: float = 0.0,
+                 floating_ratio: float = 0.0, last_updated=None, account: str = '',
+                 surplused_amount=0, fiat: str = 'MXN', transAmount=0, payTypes: Optional[Tuple[str, ...]] = None,
+                 Group: str = '', trade_type: str = '', minTransAmount=0):
+        values = {
+            'advNo': advNo, 'target_spot': target_spot, 'asset_type': asset_type, 'price': price,
+            'floating_ratio': floating_ratio, 'last_updated': last_updated, 'account': account,
+            'surplused_amount': surplused_amount, 'fiat': fiat, 'transAmount': transAmount,
+            'payTypes': payTypes, 'Group': Group, 'trade_type': trade_type, 'minTransAmount': minTransAmount,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def parse(cls, raw: Mapping) -> 'OwnAd':
+        """Validate and convert a raw ad (DB row dict, API data). An OwnAd is returned as is."""
+        if isinstance(raw, OwnAd):
+            return raw
+        if not raw.get('advNo'):
+            raise ValueError(f"Ad without advNo: {raw}")
+        fields = {
+            'advNo': str(raw['advNo']),
+            'target_spot': ensure_integer(raw.get('target_spot', 0)),
+            'asset_type': raw.get('asset_type', ''),
+            'price': float(ensure_numeric(raw.get('price'))),
+            'floating_ratio': float(ensure_numeric(raw.get('floating_ratio'))),
+            'last_updated': raw.get('last_updated'),
+            'account': raw.get('account', ''),
+            'surplused_amount': ensure_numeric(raw.get('surplused_amount', 0)),
+            'fiat': raw.get('fiat') or 'MXN',
+            'transAmount': ensure_numeric(raw.get('transAmount', 0)),
+            'payTypes': parse_pay_types(raw.get('payTypes')),
+            'Group': raw.get('Group', ''),
+            'trade_type': raw.get('trade_type', ''),
+            'minTransAmount': ensure_numeric(raw.get('minTransAmount', 0)),
+        }
+        for name in _INTERNED_FIELDS:
+            fields[name] = _intern(fields[name])
+        return cls(**fields)
+
+    def replace(self, **changes: Any) -> 'OwnAd':
+        """A copy with some fields changed, parsed the same way as at ingestion."""
+        unknown = set(changes) - _FIELD_SET
+        if unknown:
+            raise KeyError(f"Unknown ad fields: {sorted(unknown)}")
+        return OwnAd.parse({**self.to_dict(), **changes})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in AD_FIELDS}
+
+    def __setattr__(self, name, value):
+        raise AttributeError("OwnAd is read-only; use replace()")
+
+    def __getitem__(self, key: str):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(AD_FIELDS)
+
+    def __len__(self) -> int:
+        return len(AD_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"OwnAd({self.advNo}, {self.trade_type} {self.asset_type}/{self.fiat}, ratio={self.floating_ratio})"
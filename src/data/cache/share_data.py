@@ -2,45 +2,35 @@
 import aiohttp
 import asyncio
 
-from src.data.cache.async_dict import AsyncSafeDict
+from src.data.cache.ad_store import AdStore
 from src.data.database.operations.ads_database import update_ad_in_database
 from src.utils.logging_config import setup_logging
 
 logger = setup_logging(log_filename='binance_main.log')
 
 class SharedData:
-    _ad_details_dict = AsyncSafeDict()
-    _lock = asyncio.Lock()
+    """
+    Async facade over AdStore, kept for existing callers. Reads take the
+    current immutable snapshot without locking; writes publish a new one.
+    """
 
     @classmethod
-    async def get_ad_details_dict(cls):
-        async with cls._lock:
-            return cls._ad_details_dict
+    def snapshot(cls):
+        return AdStore.snapshot()
 
     @classmethod
     async def get_ad(cls, advNo):
-        async with cls._lock:
-            ad_details = await cls._ad_details_dict.get(advNo)
-            if ad_details:
-                logger.debug(f"Ad {advNo} retrieved from SharedData with ad_details: {ad_details}")
-            else:
-                logger.warning(f"Ad {advNo} not found in SharedData.")
-            return ad_details
+        ad_details = AdStore.snapshot().get(advNo)
+        if ad_details is None:
+            logger.warning(f"Ad {advNo} not found in SharedData.")
+        return ad_details
 
     @classmethod
     async def set_ad(cls, advNo, ad_details):
-        logger.debug(f"Attempting to set ad {advNo} in SharedData.")
         try:
-            async def set_ad_with_lock():
-                async with cls._lock:
-                    logger.debug(f"Acquired lock to set ad {advNo}.")
-                    await cls._ad_details_dict.put(advNo, ad_details)
-                    logger.debug(f"Ad {advNo} set in SharedData with ad_details: {ad_details}.")
-
-            await asyncio.wait_for(set_ad_with_lock(), timeout=5.0)
-        except asyncio.TimeoutError:
-            logger.error(f"Timeout while setting ad {advNo} in SharedData")
-            return False
+            if ad_details.get('advNo') != advNo:
+                ad_details = {**ad_details, 'advNo': advNo}
+            AdStore.put(ad_details)
         except Exception as e:
             logger.error(f"Error setting ad {advNo} in SharedData: {e}")
             return False
@@ -48,38 +38,24 @@ class SharedData:
 
     @classmethod
     async def len(cls):
-        async with cls._lock:
-            return await cls._ad_details_dict.len()
+        return len(AdStore.snapshot())
 
     @classmethod
     async def update_ad(cls, advNo, **kwargs):
-        logger.debug(f"Attempting to update ad {advNo} with {kwargs}.")
-        async with cls._lock:
-            ad_details = await cls._ad_details_dict.get(advNo)
-            if ad_details is not None:
-                for key, value in kwargs.items():
-                    if key in ad_details:
-                        ad_details[key] = value
-                await cls._ad_details_dict.put(advNo, ad_details)
-                logger.debug(f"Updated ad {advNo} with {kwargs}")
-            else:
-                logger.warning(f"Ad {advNo} not found in shared data.")
+        AdStore.update(advNo, **kwargs)
+
+    @classmethod
+    async def update_ads(cls, updates):
+        """Apply a list of update dicts (each with its advNo) as one new version."""
+        return AdStore.update_many((update['advNo'], update) for update in updates)
+
     @classmethod
     async def fetch_all_ads(cls, trade_type=None):
-        try:
-            async with cls._lock:
-                ads = await cls._ad_details_dict.items()
-                logger.debug(f"Total ads in SharedData: {len(ads)}")
-                if trade_type:
-                    filtered_ads = [
-                        ad for advNo, ad in ads if ad.get('trade_type') == trade_type
-                    ]
-                    logger.debug(f"Filtered ads for trade_type {trade_type}: {len(filtered_ads)}")
-                    return filtered_ads
-                return [ad for advNo, ad in ads]
-        except Exception as e:
-            logger.error(f"Error fetching ads from SharedData: {e}")
-            raise
+        snapshot = AdStore.snapshot()
+        if trade_type:
+            return snapshot.by_trade_type(trade_type)
+        return snapshot.all()
+
     @classmethod
     async def save_all_ads_to_database(cls, trade_type=None):
         try:
@@ -0,0 +1,148 @@
+# bpa/user_cache.py
+"""
+In-memory cache of buyer profiles (KYC, anti-fraud, bank and language state)
+keyed by buyer name. Blacklist membership lives in BlacklistIndex.
+
+Profiles are loaded on first use or bulk-warmed at startup, and the setters in
+binance_db_set and the write-behind journal update the cached copy whenever
+they write, so a returning customer's status-1 flow is
+served from memory. The cache is an LRU bounded by MAX_CACHED_USERS. Unknown
+buyers are not cached; their first write creates the row and the next read
+loads it. Writes that land while a buyer's profile is being loaded are
+recorded and applied to the loaded copy, which may predate them.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from src.utils.logging_config import setup_logging
+
+logger = setup_logging(log_filename='binance_main.log')
+
+PROFILE_FIELDS = (
+    'kyc_status', 'anti_fraud_stage', 'user_bank',
+    'language_preference', 'language_selection_stage',
+)
+
+MAX_CACHED_USERS = 10000
+
+SELECT_PROFILE_SQL = f"SELECT name, {', '.join(PROFILE_FIELDS)} FROM users"
+
+# PROFILE_FIELDS values of a row created by find_or_insert_buyer
+NEW_USER_DEFAULTS = (0, 0, None, None, 0)
+
+
+class UserProfile:
+    __slots__ = PROFILE_FIELDS
+
+    def __init__(self, row):
+        for field, value in zip(PROFILE_FIELDS, row):
+            setattr(self, field, value)
+
+
+class UserProfileCache:
+    _profiles: 'OrderedDict[str, UserProfile]' = OrderedDict()
+    # name -> writes seen during each load of that name still in flight
+    _loading: Dict[str, List[Dict[str, Any]]] = {}
+    _hits = 0
+    _misses = 0
+
+    @classmethod
+    def _store(cls, name: str, profile: UserProfile) -> None:
+        cls._profiles[name] = profile
+        cls._profiles.move_to_end(name)
+        while len(cls._profiles) > MAX_CACHED_USERS:
+            cls._profiles.popitem(last=False)
+
+    @classmethod
+    async def _load(cls, conn, name: str) -> Optional[UserProfile]:
+        # Imported here: the journal writes through to this cache
+        from src.data.database.operations.write_behind import WriteBehindJournal
+
+        pending = WriteBehindJournal.pending_fields('users', name)
+        async with conn.execute(f"{SELECT_PROFILE_SQL} WHERE name = ?", (name,)) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            if not pending:
+                return None
+            # The journal will insert the user with these defaults on its next flush
+            row = (name,) + NEW_USER_DEFAULTS
+
+        profile = UserProfile(row[1:])
+        # Values recorded but not yet flushed are newer than the row
+        for field, value in pending.items():
+            if field in PROFILE_FIELDS:
+                setattr(profile, field, value)
+        return profile
+
+    @classmethod
+    async def get_profile(cls, conn, name: str) -> Optional[UserProfile]:
+        """Return the cached profile, loading it from the database on a miss."""
+        profile = cls._profiles.get(name)
+        if profile is not None:
+            cls._hits += 1
+            cls._profiles.move_to_end(name)
+            return profile
+
+        cls._misses += 1
+        writes: Dict[str, Any] = {}
+        cls._loading.setdefault(name, []).append(writes)
+        try:
+            profile = await cls._load(conn, name)
+        finally:
+            loads = cls._loading[name]
+            loads.remove(writes)
+            if not loads:
+                del cls._loading[name]
+        if profile is not None:
+            # Writes made during the load may not be in the row it read
+            for field, value in writes.items():
+                setattr(profile, field, value)
+            cls._store(name, profile)
+        return profile
+
+    @classmethod
+    def update(cls, name: str, **fields: Any) -> None:
+        """Apply a write to the cached profile, or to loads of it in flight."""
+        fields = {field: value for field, value in fields.items() if field in PROFILE_FIELDS}
+        for writes in cls._loading.get(name, ()):
+            writes.update(fields)
+        profile = cls._profiles.get(name)
+        if profile is None:
+            return
+        for field, value in fields.items():
+            setattr(profile, field, value)
+
+    @classmethod
+    def invalidate(cls, name: Optional[str] = None) -> None:
+        """Drop one profile, or the whole cache when no name is given."""
+        if name is None:
+            cls._profiles.clear()
+        else:
+            cls._profiles.pop(name, None)
+
+    @classmethod
+    async def warm(cls, conn, limit: int = MAX_CACHED_USERS) -> int:
+        """Bulk-load the most recently created users. Returns the number loaded."""
+        try:
+            async with conn.execute(f"{SELECT_PROFILE_SQL} ORDER BY rowid DESC LIMIT ?", (limit,)) as cursor:
+                rows = await cursor.fetchall()
+
+            # Oldest first so the newest users end up most recently used
+            for row in reversed(rows):
+                cls._store(row[0], UserProfile(row[1:]))
+            logger.info(f"Warmed user profile cache with {len(rows)} users")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error warming user profile cache: {e}")
+            return 0
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        lookups = cls._hits + cls._misses
+        return {
+            'size': len(cls._profiles),
+            'max_size': MAX_CACHED_USERS,
+            'hits': cls._hits,
+            'misses': cls._misses,
+            'hit_rate': cls._hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,307 @@
+# bpa/archive.py
+"""
+Hot/cold split of the order, deposit and transaction history.
+
+Rows past ARCHIVE_AFTER_DAYS (orders only once they are completed or
+cancelled) are moved from binance_main.db into binance_archive.db, so the
+live database and its page cache only hold recent data. Rows move in
+batches of BATCH_SIZE, each in its own short transaction with the archive
+ATTACHed, and the archiver sleeps between batches so chat handlers are never
+locked out for long. Pages freed by the deletes are returned to the OS with
+PRAGMA incremental_vacuum after every pass, once the database is in
+incremental auto_vacuum mode. That switch needs a full VACUUM, which locks
+the whole file, so it is a maintenance step run with the bot stopped:
+
+    python -m src.data.database.archive --enable-incremental-vacuum
+
+Aggregates that must see all history (buyer_daily_volume,
+users.total_crypto_sold_lifetime) live in the main database and are not
+touched. Archived rows stay readable through open_readonly(); order lookups
+share one read-only connection (ArchiveReader) instead of opening a file per
+lookup.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+from typing import Dict, List, Optional
+
+import aiosqlite
+
+from src.data.database.connection import create_connection, DB_FILE
+import logging
+from src.utils.logging_config import setup_logging
+
+setup_logging(log_filename='binance_main.log')
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DB_FILE = os.path.join(os.path.dirname(DB_FILE), 'binance_archive.db')
+
+ARCHIVE_AFTER_DAYS = 180
+# Deposit limits look back a calendar month; never archive anything they need
+MIN_ARCHIVE_AFTER_DAYS = 35
+BATCH_SIZE = 500
+BATCH_PAUSE_SECONDS = 0.2
+ARCHIVE_INTERVAL_SECONDS = 6 * 60 * 60
+VACUUM_PAGES_PER_PASS = 2000
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Binance order statuses that can no longer change: completed, cancelled, cancelled by system
+TERMINAL_ORDER_STATUSES = (4, 6, 7)
+
+# Table -> (column compared with the cutoff, extra condition)
+ARCHIVE_TABLES = {
+    'orders': ('order_date', f"orderStatus IN ({', '.join(map(str, TERMINAL_ORDER_STATUSES))})"),
+    'deposits': ('timestamp', None),
+    'transactions': ('order_date', None),
+}
+
+# Lookups made against the archive
+ARCHIVE_INDEXES = {
+    'orders': [('idx_archive_orders_number', ['orderNumber']),
+               ('idx_archive_orders_buyer', ['buyerName'])],
+    'deposits': [('idx_archive_deposits_account', ['account_details', 'timestamp'])],
+    'transactions': [('idx_archive_transactions_buyer', ['buyer_name'])],
+}
+
+
+async def _table_info(conn, schema: str, table: str) -> List[tuple]:
+    async with conn.execute(f"PRAGMA {schema}.table_info({table})") as cursor:
+        return await cursor.fetchall()
+
+
+async def _ensure_archive_table(conn, table: str) -> List[str]:
+    """
+    Create or widen archive.<table> to match the live columns. Returns the column list.
+    Only `id` is kept as a key: the archive never enforces the live table's constraints.
+    """
+    live = await _table_info(conn, 'main', table)
+    if not live:
+        return []
+    columns = [row[1] for row in live]
+    archived = {row[1] for row in await _table_info(conn, 'archive', table)}
+    if not archived:
+        definitions = ', '.join(
+            f"{name} INTEGER PRIMARY KEY" if name == 'id' else f"{name} {col_type}"
+            for _, name, col_type, *_ in live
+        )
+        await conn.execute(f"CREATE TABLE archive.{table} ({definitions})")
+        for index_name, index_columns in ARCHIVE_INDEXES.get(table, []):
+            if set(index_columns) <= set(columns):
+                await conn.execute(f"CREATE INDEX IF NOT EXISTS archive.{index_name} "
+                                   f"ON {table} ({', '.join(index_columns)})")
+    else:
+        for _, name, col_type, *_ in live:
+            if name not in archived:
+                await conn.execute(f"ALTER TABLE archive.{table} ADD COLUMN {name} {col_type}")
+    return columns
+
+
+class Archiver:
+    _archived: Dict[str, int] = {table: 0 for table in ARCHIVE_TABLES}
+    _passes = 0
+    _failed_passes = 0
+    _last_run: Optional[datetime.datetime] = None
+    _vacuum_warned = False
+
+    @classmethod
+    async def _move_batch(cls, conn, table: str, columns: List[str], cutoff: str, batch_size: int) -> int:
+        date_column, condition = ARCHIVE_TABLES[table]
+        where = f"{date_column} < ?" + (f" AND {condition}" if condition else "")
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            async with conn.execute(f"SELECT id FROM main.{table} WHERE {where} ORDER BY id LIMIT ?",
+                                    (cutoff, batch_size)) as cursor:
+                ids = [row[0] for row in await cursor.fetchall()]
+            if ids:
+                placeholders = ', '.join('?' * len(ids))
+                column_list = ', '.join(columns)
+                # OR REPLACE: a batch that reached the archive but not the delete
+                # (the two files do not share a journal in WAL mode) is simply redone
+                await conn.execute(
+                    f"INSERT OR REPLACE INTO archive.{table} ({column_list}) "
+                    f"SELECT {column_list} FROM main.{table} WHERE id IN ({placeholders})", ids
+                )
+                await conn.execute(f"DELETE FROM main.{table} WHERE id IN ({placeholders})", ids)
+            await conn.commit()
+            return len(ids)
+        except Exception:
+            await conn.rollback()
+            raise
+
+    @classmethod
+    async def archive_table(cls, conn, table: str, cutoff: str, batch_size: int = BATCH_SIZE,
+                            pause: float = BATCH_PAUSE_SECONDS) -> int:
+        """Move every row of `table` older than `cutoff` into the attached archive."""
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = await _ensure_archive_table(conn, table)
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+        if not columns:
+            logger.warning(f"Skipping archival of {table}: table does not exist")
+            return 0
+
+        moved = 0
+        while True:
+            count = await cls._move_batch(conn, table, columns, cutoff, batch_size)
+            moved += count
+            if count < batch_size:
+                break
+            await asyncio.sleep(pause)
+        cls._archived[table] += moved
+        return moved
+
+    @classmethod
+    async def _incremental_vacuum(cls, conn, pages: int) -> None:
+        async with conn.execute("PRAGMA main.auto_vacuum") as cursor:
+            mode = (await cursor.fetchone())[0]
+        if mode != AUTO_VACUUM_INCREMENTAL:
+            # Never switch modes here: the VACUUM it needs would lock the live database
+            if not cls._vacuum_warned:
+                logger.warning("Skipping incremental vacuum: auto_vacuum is not INCREMENTAL. Run "
+                               "`python -m src.data.database.archive --enable-incremental-vacuum` "
+                               "with the bot stopped.")
+                cls._vacuum_warned = True
+            return
+        async with conn.execute(f"PRAGMA main.incremental_vacuum({int(pages)})") as cursor:
+            await cursor.fetchall()
+
+    @classmethod
+    async def run_once(cls, conn=None, archive_path: str = ARCHIVE_DB_FILE,
+                       older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = BATCH_SIZE,
+                       pause: float = BATCH_PAUSE_SECONDS,
+                       vacuum_pages: int = VACUUM_PAGES_PER_PASS) -> Dict[str, int]:
+        """One archival pass over ARCHIVE_TABLES. Returns the rows moved per table."""
+        if older_than_days < MIN_ARCHIVE_AFTER_DAYS:
+            raise ValueError(f"older_than_days must be at least {MIN_ARCHIVE_AFTER_DAYS}")
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=older_than_days)).strftime('%Y-%m-%d %H:%M:%S')
+
+        own_conn = None
+        if conn is None:
+            own_conn = conn = await create_connection(DB_FILE)
+            if conn is None:
+                cls._failed_passes += 1
+                return {}
+        moved = {}
+        try:
+            await conn.commit()
+            await conn.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+            try:
+                for table in ARCHIVE_TABLES:
+                    moved[table] = await cls.archive_table(conn, table, cutoff, batch_size, pause)
+            finally:
+                await conn.execute("DETACH DATABASE archive")
+            await cls._incremental_vacuum(conn, vacuum_pages)
+            cls._passes += 1
+            cls._last_run = datetime.datetime.now()
+            logger.info(f"Archived rows older than {cutoff}: {moved}")
+        except Exception as e:
+            cls._failed_passes += 1
+            logger.error(f"Archival pass failed after moving {moved}: {e}")
+        finally:
+            if own_conn is not None:
+                await own_conn.close()
+        return moved
+
+    @classmethod
+    async def run(cls, interval: float = ARCHIVE_INTERVAL_SECONDS, **kwargs) -> None:
+        """Archive on a timer for the lifetime of the bot."""
+        while True:
+            await cls.run_once(**kwargs)
+            await asyncio.sleep(interval)
+
+    @classmethod
+    def stats(cls) -> Dict[str, object]:
+        return {
+            'archived': dict(cls._archived),
+            'passes': cls._passes,
+            'failed_passes': cls._failed_passes,
+            'last_run': cls._last_run,
+        }
+
+
+async def open_readonly(archive_path: str = ARCHIVE_DB_FILE) -> Optional[aiosqlite.Connection]:
+    """Read-only connection to the archive, or None if nothing has been archived yet."""
+    if not os.path.exists(archive_path):
+        return None
+    uri = 'file:' + archive_path.replace('?', '%3f').replace('#', '%23') + '?mode=ro'
+    return await aiosqlite.connect(uri, uri=True)
+
+
+class ArchiveReader:
+    """One long-lived read-only connection per archive file, for lookups on the hot path."""
+    _connections: Dict[str, aiosqlite.Connection] = {}
+    _lock = asyncio.Lock()
+
+    @classmethod
+    async def connection(cls, archive_path: str = ARCHIVE_DB_FILE) -> Optional[aiosqlite.Connection]:
+        """The shared connection, or None while nothing has been archived yet."""
+        conn = cls._connections.get(archive_path)
+        if conn is not None:
+            return conn
+        async with cls._lock:
+            if archive_path not in cls._connections:
+                conn = await open_readonly(archive_path)
+                if conn is None:
+                    return None
+                cls._connections[archive_path] = conn
+            return cls._connections[archive_path]
+
+    @classmethod
+    async def close(cls) -> None:
+        async with cls._lock:
+            connections = list(cls._connections.values())
+            cls._connections.clear()
+        for conn in connections:
+            await conn.close()
+
+
+async def fetch_archived_order(orderNumber: str, archive_path: str = ARCHIVE_DB_FILE) -> Optional[dict]:
+    conn = await ArchiveReader.connection(archive_path)
+    if conn is None:
+        return None
+    try:
+        async with conn.execute("SELECT * FROM orders WHERE orderNumber = ?", (orderNumber,)) as cursor:
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+            return {desc[0]: value for desc, value in zip(cursor.description, row)}
+    except aiosqlite.OperationalError:
+        # Archive exists but holds no orders yet
+        return None
+
+
+async def enable_incremental_vacuum(db_path: str = DB_FILE) -> bool:
+    """
+    Switch the live database to incremental auto_vacuum. Runs a full VACUUM,
+    which holds an exclusive lock on the file for the whole rewrite: only run
+    it while the bot is stopped. Returns False if the mode was already set.
+    """
+    async with aiosqlite.connect(db_path) as conn:
+        async with conn.execute("PRAGMA main.auto_vacuum") as cursor:
+            if (await cursor.fetchone())[0] == AUTO_VACUUM_INCREMENTAL:
+                logger.info("auto_vacuum is already INCREMENTAL")
+                return False
+        logger.info(f"Enabling incremental auto_vacuum on {db_path} (full VACUUM)")
+        await conn.execute("PRAGMA main.auto_vacuum = INCREMENTAL")
+        await conn.execute("VACUUM main")
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive maintenance for the live database")
+    parser.add_argument('--db', default=DB_FILE, help="Live database path")
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help="One-time switch to incremental auto_vacuum (bot must be stopped)")
+    args = parser.parse_args()
+    if args.enable_incremental_vacuum:
+        asyncio.run(enable_incremental_vacuum(args.db))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
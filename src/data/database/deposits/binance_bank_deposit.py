@@ -1,9 +1,13 @@
 # bpa/binance_bank_deposit.py
 import asyncio
-from typing import Dict, Optional, Any
+import heapq
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Optional, Any, Tuple
 
 from src.data.database.operations.binance_db_get import get_order_details
-from src.data.database.operations.binance_db_set import update_order_details
+from src.data.database.operations.write_behind import WriteBehindJournal
 from src.data.database.deposits.binance_bank_deposit_db import update_last_used_timestamp, sum_recent_deposits, sum_monthly_deposits
 import logging
 from src.utils.logging_config import setup_logging
@@ -18,6 +22,18 @@ USD_BUYER_DAILY_LIMIT = 950.00
 MXN_BUYER_MONTHLY_LIMIT = 75000.00
 # --- End of New Buyer Limit Constants ---
 
+# How long details sent to a buyer hold their amount against an account
+RESERVATION_TTL_SECONDS = 30 * 60
+
+
+@dataclass
+class Reservation:
+    account_details: str
+    pay_type: str
+    buyerName: str
+    amount: float
+    expires_at: float
+
 class PaymentManager:
     _instance: Optional['PaymentManager'] = None
     _lock = asyncio.Lock()
@@ -27,6 +43,12 @@ class PaymentManager:
             raise RuntimeError("This class is a singleton. Use get_instance() instead.")
         self.accounts_cache: Dict[str, list] = {}
         self.accounts_cache_lock = asyncio.Lock()
+        # Assignments for different payment methods never touch the same accounts
+        self.pay_type_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # Amounts promised to buyers who have the details but have not paid yet
+        self.reservations: Dict[str, Reservation] = {}
+        self.reserved_by_account: Dict[str, float] = defaultdict(float)
+        self.reserved_by_buyer: Dict[Tuple[str, str], float] = defaultdict(float)
 
     @classmethod
     async def get_instance(cls) -> 'PaymentManager':
@@ -41,17 +63,19 @@ class PaymentManager:
         async with self.accounts_cache_lock:
             cursor = await conn.execute('SELECT fiat, pay_type, beneficiary, account_details, daily_limit, monthly_limit FROM payment_accounts ORDER BY last_used_timestamp ASC')
             all_accounts = await cursor.fetchall()
-            self.accounts_cache = {}
+            accounts_cache = {}
             for acc in all_accounts:
                 pay_type = acc[1]
-                if pay_type not in self.accounts_cache:
-                    self.accounts_cache[pay_type] = []
+                if pay_type not in accounts_cache:
+                    accounts_cache[pay_type] = []
                 
                 account_data = {
                     'fiat': acc[0], 'pay_type': acc[1], 'beneficiary': acc[2],
                     'account_details': acc[3], 'daily_limit': acc[4], 'monthly_limit': acc[5]
                 }
-                self.accounts_cache[pay_type].append(account_data)
+                accounts_cache[pay_type].append(account_data)
+            # Swapped in one step so assignments never see a half-built cache
+            self.accounts_cache = accounts_cache
             logger.info(f"Initialized payment account cache with {len(all_accounts)} accounts.")
 
     async def get_payment_details(self, conn, orderNumber: str, buyerName: str) -> Optional[Dict[str, Any]]:
@@ -69,31 +93,88 @@ class PaymentManager:
     async def _assign_account(self, conn, pay_type: str, orderNumber: str, buyerName: str, amount: float) -> Optional[Dict[str, Any]]:
         """
         Assigns the best available account for any currency by checking limits
-        and selecting the one with the lowest current daily balance.
+        and selecting the one with the lowest current daily load (deposits plus
+        open reservations). The order's amount is reserved against the chosen
+        account until the deposit is logged, the order is cancelled, or the
+        reservation expires.
         """
-        async with self.accounts_cache_lock:
+        async with self.pay_type_locks[pay_type]:
             accounts = self.accounts_cache.get(pay_type, [])
             if not accounts:
                 logger.warning(f"No accounts found for pay_type: {pay_type}")
                 return None
 
-            valid_accounts = []
-            for account in accounts:
+            self._expire_reservations()
+            existing = self.reservations.get(orderNumber)
+            if existing and existing.pay_type == pay_type:
+                for account in accounts:
+                    if account['account_details'] == existing.account_details:
+                        logger.info(f"Order {orderNumber} keeps its reserved account {existing.account_details}")
+                        existing.expires_at = time.time() + RESERVATION_TTL_SECONDS
+                        return self._format_details(account, orderNumber)
+            # The order switched payment method (or its account is gone)
+            self.release_reservation(orderNumber)
+
+            heap = []
+            for index, account in enumerate(accounts):
+                load = await sum_recent_deposits(conn, account['account_details']) + self.reserved_by_account[account['account_details']]
+                heap.append((load, index, account))
+            heapq.heapify(heap)
+
+            best_account = None
+            while heap:
+                _, _, account = heapq.heappop(heap)
                 if await self._check_deposit_limit(conn, account, amount, buyerName):
-                    daily_total = await sum_recent_deposits(conn, account['account_details'])
-                    valid_accounts.append((account, daily_total))
+                    best_account = account
+                    break
             
-            if not valid_accounts:
+            if best_account is None:
                 logger.warning(f"All accounts for {pay_type} are over the limit for order {orderNumber}.")
                 return None
 
-            valid_accounts.sort(key=lambda x: x[1])
-            best_account = valid_accounts[0][0]
-            
-            await update_order_details(conn, orderNumber, best_account['account_details'], best_account['pay_type'])
-            await update_last_used_timestamp(conn, best_account['account_details'])
-            logger.info(f"Assigned account {best_account['account_details']} for order {orderNumber}")
-            return self._format_details(best_account, orderNumber)
+            self._reserve(orderNumber, best_account, buyerName, amount)
+
+        WriteBehindJournal.record_order(
+            orderNumber,
+            account_number=best_account['account_details'],
+            seller_bank=best_account['pay_type']
+        )
+        await update_last_used_timestamp(conn, best_account['account_details'])
+        logger.info(f"Assigned account {best_account['account_details']} for order {orderNumber}")
+        return self._format_details(best_account, orderNumber)
+
+    def _reserve(self, orderNumber: str, account: Dict, buyerName: str, amount: float) -> None:
+        reservation = Reservation(
+            account_details=account['account_details'],
+            pay_type=account['pay_type'],
+            buyerName=buyerName,
+            amount=amount or 0.0,
+            expires_at=time.time() + RESERVATION_TTL_SECONDS,
+        )
+        self.reservations[orderNumber] = reservation
+        self.reserved_by_account[reservation.account_details] += reservation.amount
+        self.reserved_by_buyer[(reservation.account_details, buyerName)] += reservation.amount
+
+    def release_reservation(self, orderNumber: str) -> None:
+        """Drop an order's reservation (deposit logged, order cancelled or expired)."""
+        reservation = self.reservations.pop(orderNumber, None)
+        if reservation is None:
+            return
+        account_key = reservation.account_details
+        buyer_key = (account_key, reservation.buyerName)
+        self.reserved_by_account[account_key] -= reservation.amount
+        if self.reserved_by_account[account_key] <= 1e-9:
+            del self.reserved_by_account[account_key]
+        self.reserved_by_buyer[buyer_key] -= reservation.amount
+        if self.reserved_by_buyer[buyer_key] <= 1e-9:
+            del self.reserved_by_buyer[buyer_key]
+        logger.debug(f"Released reservation of {reservation.amount} on {account_key} for order {orderNumber}")
+
+    def _expire_reservations(self) -> None:
+        now = time.time()
+        for orderNumber in [number for number, r in self.reservations.items() if r.expires_at <= now]:
+            logger.info(f"Reservation for order {orderNumber} expired")
+            self.release_reservation(orderNumber)
 
     async def _check_deposit_limit(self, conn, account: Dict, amount_to_deposit: float, buyerName: str) -> bool:
         """
@@ -103,28 +184,30 @@ class PaymentManager:
         fiat = account['fiat']
         amount_to_add = amount_to_deposit or 0.0
 
-        # --- Step 1: Check the account's own hard limits ---
-        daily_total = await sum_recent_deposits(conn, account_details)
+        # --- Step 1: Check the account's own hard limits (deposits plus open reservations) ---
+        reserved = self.reserved_by_account.get(account_details, 0.0)
+        daily_total = await sum_recent_deposits(conn, account_details) + reserved
         if daily_total + amount_to_add > account['daily_limit']:
             logger.info(f"Account {account_details} would exceed its daily limit of {account['daily_limit']}.")
             return False
 
-        monthly_total = await sum_monthly_deposits(conn, account_details)
+        monthly_total = await sum_monthly_deposits(conn, account_details) + reserved
         if monthly_total + amount_to_add > account['monthly_limit']:
             logger.info(f"Account {account_details} would exceed its monthly limit of {account['monthly_limit']}.")
             return False
             
         # --- Step 2: Check the buyer's currency-specific limits ---
+        buyer_reserved = self.reserved_by_buyer.get((account_details, buyerName), 0.0)
         if fiat == 'USD':
             # For USD, check the buyer's daily limit
-            buyer_daily_total = await sum_recent_deposits(conn, account_details, buyerName)
+            buyer_daily_total = await sum_recent_deposits(conn, account_details, buyerName) + buyer_reserved
             if buyer_daily_total + amount_to_add > USD_BUYER_DAILY_LIMIT:
                 logger.warning(f"Buyer '{buyerName}' would exceed their daily USD limit of ${USD_BUYER_DAILY_LIMIT}.")
                 return False
         
         elif fiat == 'MXN':
             # For MXN, check the buyer's monthly limit
-            buyer_monthly_total = await sum_monthly_deposits(conn, account_details, buyerName)
+            buyer_monthly_total = await sum_monthly_deposits(conn, account_details, buyerName) + buyer_reserved
             if buyer_monthly_total + amount_to_add > MXN_BUYER_MONTHLY_LIMIT:
                 logger.warning(f"Buyer '{buyerName}' would exceed their monthly MXN limit of ${MXN_BUYER_MONTHLY_LIMIT}.")
                 return False
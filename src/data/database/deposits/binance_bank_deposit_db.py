@@ -3,6 +3,7 @@ import datetime
 from typing import Optional
 
 from src.utils.common_vars import payment_accounts 
+from src.data.cache.deposit_ledger import DepositLedger
 import logging
 from src.utils.logging_config import setup_logging
 
@@ -95,6 +96,7 @@ async def log_deposit(conn, deposit_from: str, account_details: str, amount_depo
         (timestamp, account_details, amount_deposited, deposit_from, year, month)
     )
     await conn.commit()
+    DepositLedger.record(account_details, deposit_from, amount_deposited)
 
 async def update_last_used_timestamp(conn, account_details: str):
     """Updates the timestamp for any type of payment account."""
@@ -107,6 +109,8 @@ async def update_last_used_timestamp(conn, account_details: str):
 
 async def sum_recent_deposits(conn, account_details: str, buyer_name: Optional[str] = None) -> float:
     """Sums deposits for a specific account for the current day, optionally filtered by buyer."""
+    if DepositLedger.is_loaded():
+        return DepositLedger.daily_total(account_details, buyer_name)
     start_of_day = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
     
     query = 'SELECT SUM(amount_deposited) FROM deposits WHERE account_details = ? AND timestamp >= ?'
@@ -122,6 +126,8 @@ async def sum_recent_deposits(conn, account_details: str, buyer_name: Optional[s
 
 async def sum_monthly_deposits(conn, account_details: str, buyer_name: Optional[str] = None) -> float:
     """Sums deposits for a specific account for the current month, optionally filtered by buyer."""
+    if DepositLedger.is_loaded():
+        return DepositLedger.monthly_total(account_details, buyer_name)
     start_of_month = datetime.datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
     query = 'SELECT SUM(amount_deposited) FROM deposits WHERE account_details = ? AND timestamp >= ?'
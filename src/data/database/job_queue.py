@@ -0,0 +1,281 @@
+# bpa/job_queue.py
+"""
+Durable SQLite-backed job queue.
+
+Jobs are dataclasses with a JOB_TYPE and an idempotency key. Enqueueing the
+same key twice is a no-op, so a handler can be re-run safely after a crash.
+A pool of workers claims ready jobs by setting a visibility timeout
+(`locked_until`). A job whose worker died becomes claimable again once that
+timeout passes. Failed jobs are retried with exponential backoff until
+`max_attempts` is reached.
+
+Handlers never share the queue's connection: each worker gives its handlers
+a connection of their own, so one job's commit or rollback cannot take
+another job's half-done writes with it. A handler that raises or times out
+is rolled back before the job is marked failed.
+"""
+import asyncio
+import dataclasses
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
+
+from src.data.database.connection import create_connection, DB_FILE
+import logging
+from src.utils.logging_config import setup_logging
+
+setup_logging(log_filename='binance_main.log')
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_ATTEMPTS = 5
+VISIBILITY_TIMEOUT_SECONDS = 120
+POLL_INTERVAL_SECONDS = 1.0
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 300
+COMPLETED_RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+CREATE_JOBS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY,
+        job_type TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        idempotency_key TEXT UNIQUE NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        run_after REAL NOT NULL,
+        locked_until REAL,
+        last_error TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    )
+"""
+
+CREATE_JOBS_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs (status, run_after)"
+
+
+class Job:
+    """Base class for queued jobs. Subclasses are dataclasses."""
+    JOB_TYPE: str = ''
+
+    def idempotency_key(self) -> str:
+        raise NotImplementedError
+
+
+JobHandler = Callable[[Any, Any], Awaitable[None]]
+
+
+class JobQueue:
+    _instance: Optional['JobQueue'] = None
+    _lock = asyncio.Lock()
+
+    def __init__(self):
+        if self.__class__._instance is not None:
+            raise RuntimeError("This class is a singleton. Use get_instance() instead.")
+        self.conn = None
+        self.db_path = DB_FILE
+        self.handlers: Dict[str, JobHandler] = {}
+        self.job_types: Dict[str, Type[Job]] = {}
+        self.workers: List[asyncio.Task] = []
+        self.wakeup = asyncio.Event()
+
+    @classmethod
+    async def get_instance(cls) -> 'JobQueue':
+        if cls._instance is None:
+            async with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def register(self, job_cls: Type[Job], handler: JobHandler) -> None:
+        """Register the coroutine handler(job, conn) for a job class."""
+        self.job_types[job_cls.JOB_TYPE] = job_cls
+        self.handlers[job_cls.JOB_TYPE] = handler
+
+    async def initialize(self, conn=None, db_path: str = DB_FILE) -> None:
+        """`db_path` is the database handler connections are opened on."""
+        self.db_path = db_path
+        if self.conn is None:
+            self.conn = conn or await create_connection(db_path)
+        await self.conn.execute(CREATE_JOBS_TABLE_SQL)
+        await self.conn.execute(CREATE_JOBS_INDEX_SQL)
+        await self.conn.commit()
+
+    async def enqueue(self, job: Job, max_attempts: int = DEFAULT_MAX_ATTEMPTS, delay: float = 0) -> bool:
+        """Persist a job. Returns False if a job with the same idempotency key exists."""
+        now = time.time()
+        try:
+            cursor = await self.conn.execute(
+                """
+                INSERT OR IGNORE INTO jobs
+                (job_type, payload, idempotency_key, max_attempts, run_after, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (job.JOB_TYPE, json.dumps(dataclasses.asdict(job)), job.idempotency_key(),
+                 max_attempts, now + delay, now, now)
+            )
+            await self.conn.commit()
+        except Exception as e:
+            logger.error(f"Error enqueuing {job.JOB_TYPE} job {job.idempotency_key()}: {e}")
+            return False
+
+        if cursor.rowcount == 0:
+            logger.debug(f"Job {job.idempotency_key()} already queued, skipping")
+            return False
+        self.wakeup.set()
+        return True
+
+    async def _claim(self) -> Optional[tuple]:
+        """Claim one ready job, or one whose visibility timeout expired."""
+        now = time.time()
+        async with self.conn.execute(
+            """
+            SELECT id, job_type, payload, attempts, max_attempts, updated_at FROM jobs
+            WHERE (status = 'pending' AND run_after <= ?)
+               OR (status = 'running' AND locked_until <= ?)
+            ORDER BY run_after
+            LIMIT 1
+            """,
+            (now, now)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+
+        job_id, job_type, payload, attempts, max_attempts, updated_at = row
+        # Only one worker wins: the row must be unchanged since it was read
+        cursor = await self.conn.execute(
+            """
+            UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_until = ?, updated_at = ?
+            WHERE id = ? AND updated_at = ?
+            """,
+            (now + VISIBILITY_TIMEOUT_SECONDS, now, job_id, updated_at)
+        )
+        await self.conn.commit()
+        if cursor.rowcount != 1:
+            return None
+        return job_id, job_type, payload, attempts + 1, max_attempts
+
+    async def _finish(self, job_id: int) -> None:
+        await self.conn.execute(
+            "UPDATE jobs SET status = 'done', locked_until = NULL, last_error = NULL, updated_at = ? WHERE id = ?",
+            (time.time(), job_id)
+        )
+        await self.conn.commit()
+
+    async def _fail(self, job_id: int, job_type: str, attempts: int, max_attempts: int, error: str) -> None:
+        now = time.time()
+        if attempts >= max_attempts:
+            logger.error(f"Job {job_id} ({job_type}) failed permanently after {attempts} attempts: {error}")
+            status, run_after = 'failed', now
+        else:
+            backoff = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+            logger.warning(f"Job {job_id} ({job_type}) attempt {attempts} failed, retrying in {backoff}s: {error}")
+            status, run_after = 'pending', now + backoff
+        await self.conn.execute(
+            """
+            UPDATE jobs SET status = ?, run_after = ?, locked_until = NULL, last_error = ?, updated_at = ?
+            WHERE id = ?
+            """,
+            (status, run_after, error, now, job_id)
+        )
+        await self.conn.commit()
+
+    async def _handler_connection(self):
+        conn = await create_connection(self.db_path)
+        if conn is None:
+            raise RuntimeError(f"Could not open a handler connection to {self.db_path}")
+        return conn
+
+    async def run_next(self, handler_conn=None) -> bool:
+        """
+        Claim and run one job on `handler_conn` (a connection used by one job
+        at a time). Without one, a connection is opened for this job only.
+        Returns False when nothing was ready.
+        """
+        claimed = await self._claim()
+        if claimed is None:
+            return False
+
+        if handler_conn is None:
+            handler_conn = await self._handler_connection()
+            try:
+                return await self._run_claimed(claimed, handler_conn)
+            finally:
+                await handler_conn.close()
+        return await self._run_claimed(claimed, handler_conn)
+
+    async def _run_claimed(self, claimed: tuple, handler_conn) -> bool:
+        job_id, job_type, payload, attempts, max_attempts = claimed
+        handler = self.handlers.get(job_type)
+        if handler is None:
+            await self._fail(job_id, job_type, max_attempts, max_attempts, f"No handler registered for {job_type}")
+            return True
+
+        try:
+            job = self.job_types[job_type](**json.loads(payload))
+            # Never outlive the visibility timeout, or another worker could pick the job up
+            await asyncio.wait_for(handler(job, handler_conn), timeout=VISIBILITY_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            await self._rollback(handler_conn)
+            raise
+        except Exception as e:
+            # Nothing the handler left uncommitted may survive into the retry
+            await self._rollback(handler_conn)
+            await self._fail(job_id, job_type, attempts, max_attempts, repr(e))
+            return True
+        await self._finish(job_id)
+        logger.debug(f"Job {job_id} ({job_type}) done")
+        return True
+
+    async def _rollback(self, handler_conn) -> None:
+        try:
+            await handler_conn.rollback()
+        except Exception as e:
+            logger.error(f"Error rolling back job connection: {e}")
+
+    async def _worker(self, worker_id: int) -> None:
+        handler_conn = None
+        try:
+            while True:
+                try:
+                    if handler_conn is None:
+                        handler_conn = await self._handler_connection()
+                    if await self.run_next(handler_conn):
+                        continue
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Job worker {worker_id} error: {e}")
+
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+        finally:
+            if handler_conn is not None:
+                await handler_conn.close()
+
+    async def purge_completed(self, max_age_seconds: int = COMPLETED_RETENTION_SECONDS) -> None:
+        await self.conn.execute(
+            "DELETE FROM jobs WHERE status = 'done' AND updated_at < ?",
+            (time.time() - max_age_seconds,)
+        )
+        await self.conn.commit()
+
+    async def start(self, workers: int = DEFAULT_WORKERS) -> None:
+        await self.initialize()
+        await self.purge_completed()
+        self.workers = [asyncio.create_task(self._worker(i)) for i in range(workers)]
+        logger.info(f"Job queue started with {workers} workers")
+
+    async def close(self) -> None:
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
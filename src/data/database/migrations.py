@@ -0,0 +1,147 @@
+# bpa/migrations.py
+"""
+Versioned schema migrations.
+
+The applied version is kept in SQLite's PRAGMA user_version. run_migrations()
+applies every migration above it in order, each in its own transaction, then
+runs ANALYZE so the query planner has fresh statistics for the new indexes.
+
+To change the schema, append a (version, description, function) entry to
+MIGRATIONS; never edit one that has shipped.
+
+Tables are created outside the migrations, so an index in HOT_PATH_INDEXES
+can be skipped because its table does not exist yet. run_migrations()
+therefore checks those indexes on every start and creates the ones whose
+table has appeared since.
+"""
+from typing import Awaitable, Callable, List, Tuple
+
+from src.data.database.operations.buyer_volume import BACKFILL_BUYER_VOLUME_SQL, CREATE_BUYER_VOLUME_SQL
+import logging
+from src.utils.logging_config import setup_logging
+
+setup_logging(log_filename='binance_main.log')
+logger = logging.getLogger(__name__)
+
+
+async def _columns(conn, table: str) -> List[str]:
+    async with conn.execute(f"PRAGMA table_info({table})") as cursor:
+        return [row[1] for row in await cursor.fetchall()]
+
+
+async def create_index(conn, name: str, table: str, columns: List[str]) -> bool:
+    """CREATE INDEX IF NOT EXISTS, skipped (with a warning) if the table or a column is missing."""
+    existing = await _columns(conn, table)
+    missing = [column for column in columns if column not in existing]
+    if not existing or missing:
+        logger.warning(f"Skipping index {name}: table {table} is missing {missing or 'entirely'}")
+        return False
+    await conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+    return True
+
+
+# (name, table, columns)
+HOT_PATH_INDEXES: List[Tuple[str, str, List[str]]] = [
+    # Deposit limit checks: equality on the account, range on the timestamp,
+    # optional buyer filter, and the summed amount so the table itself is
+    # never read. The once-per-start DepositLedger rebuild reads this index
+    # in full too, which is cheaper than keeping a second one up to date.
+    ('idx_deposits_account_time', 'deposits',
+     ['account_details', 'timestamp', 'deposit_from', 'amount_deposited']),
+    # Completed-order volume per buyer (also backs the migration 2 backfill)
+    ('idx_orders_buyer_status_date', 'orders', ['buyerName', 'orderStatus', 'order_date', 'amount']),
+    # Blacklist lookups and removals by name
+    ('idx_p2pblacklist_name', 'P2PBlacklist', ['name']),
+]
+
+
+async def _hot_path_indexes(conn) -> None:
+    for name, table, columns in HOT_PATH_INDEXES:
+        await create_index(conn, name, table, columns)
+
+
+async def ensure_hot_path_indexes(conn) -> int:
+    """Create the hot-path indexes that are still missing. Returns how many were created."""
+    async with conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'") as cursor:
+        existing = {row[0] for row in await cursor.fetchall()}
+    created = 0
+    for name, table, columns in HOT_PATH_INDEXES:
+        if name in existing or not set(columns) <= set(await _columns(conn, table)):
+            # Migration 1 already warned about the missing table
+            continue
+        if await create_index(conn, name, table, columns):
+            logger.info(f"Created index {name} on {table}, which did not exist when migration 1 ran")
+            created += 1
+    if created:
+        await conn.commit()
+    return created
+
+
+async def _buyer_volume_buckets(conn) -> None:
+    for sql in CREATE_BUYER_VOLUME_SQL:
+        await conn.execute(sql)
+    # Seed the buckets from orders that completed before incremental upkeep existed
+    if not {'orderNumber', 'buyerName', 'orderStatus', 'order_date', 'amount', 'totalPrice'} <= set(
+            await _columns(conn, 'orders')):
+        logger.warning("Skipping buyer volume backfill: orders table is missing or incomplete")
+        return
+    for sql in BACKFILL_BUYER_VOLUME_SQL:
+        await conn.execute(sql)
+
+
+Migration = Tuple[int, str, Callable[..., Awaitable[None]]]
+
+MIGRATIONS: List[Migration] = [
+    (1, "indexes for deposit, order volume and blacklist lookups", _hot_path_indexes),
+    (2, "per-buyer daily volume buckets", _buyer_volume_buckets),
+]
+
+# Queries on the hot paths, with sample parameters. tests/integration/test_migrations.py
+# fails if any of them is planned as a full table scan.
+HOT_QUERIES: List[Tuple[str, tuple]] = [
+    ("SELECT SUM(amount_deposited) FROM deposits WHERE account_details = ? AND timestamp >= ?",
+     ('acc', '2024-01-01')),
+    ("SELECT SUM(amount_deposited) FROM deposits WHERE account_details = ? AND timestamp >= ? AND deposit_from = ?",
+     ('acc', '2024-01-01', 'buyer')),
+    ("SELECT SUM(amount) FROM orders WHERE buyerName = ? AND orderStatus = 4 "
+     "AND order_date >= datetime('now', '-30 day')",
+     ('buyer',)),
+    ("SELECT SUM(crypto_amount) FROM buyer_daily_volume WHERE buyerName = ? AND day > date('now', '-30 day')",
+     ('buyer',)),
+    ("SELECT * FROM orders WHERE orderNumber = ?", ('1',)),
+    ("SELECT id FROM P2PBlacklist WHERE name = ?", ('buyer',)),
+    ("SELECT kyc_status, anti_fraud_stage, user_bank, language_preference, language_selection_stage "
+     "FROM users WHERE name = ?", ('buyer',)),
+]
+
+
+async def get_schema_version(conn) -> int:
+    async with conn.execute("PRAGMA user_version") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def run_migrations(conn, migrations: List[Migration] = MIGRATIONS) -> int:
+    """Apply pending migrations and refresh planner statistics. Returns the schema version."""
+    version = await get_schema_version(conn)
+    pending = [m for m in sorted(migrations, key=lambda m: m[0]) if m[0] > version]
+    # BEGIN below must not land inside an implicit transaction left open by the caller
+    await conn.commit()
+    for number, description, migrate in pending:
+        try:
+            await conn.execute("BEGIN")
+            await migrate(conn)
+            # PRAGMA does not accept bound parameters; number is an int from MIGRATIONS
+            await conn.execute(f"PRAGMA user_version = {int(number)}")
+            await conn.commit()
+            logger.info(f"Applied migration {number}: {description}")
+            version = number
+        except Exception as e:
+            await conn.rollback()
+            logger.error(f"Migration {number} ({description}) failed, schema stays at version {version}: {e}")
+            raise
+
+    created = await ensure_hot_path_indexes(conn)
+    if pending or created:
+        await conn.execute("ANALYZE")
+        await conn.commit()
+    return version
@@ -4,6 +4,7 @@ import json
 import aiosqlite
 
 from src.utils.common_vars import ads_dict
+from src.data.cache.own_ad import AD_FIELDS, OwnAd, ensure_integer, ensure_numeric
 from src.data.database.connection import DB_FILE
 import logging
 from src.utils.logging_config import setup_logging
@@ -45,8 +46,12 @@ async def recreate_database():
         logger.info("Fresh ads table created successfully")
 
 
+def _row_to_ad(row):
+    """An ads row (SELECT * column order) as an OwnAd."""
+    return OwnAd.parse(dict(zip(AD_FIELDS, row)))
+
 async def fetch_all_ads_from_database(trade_type=None):
-    """Fetch ads from database with C2C API compatible data types"""
+    """Fetch ads from database as parsed OwnAd records"""
     async with aiosqlite.connect(DB_FILE) as conn:
         c = await conn.cursor()
         query = "SELECT * FROM ads"
@@ -56,73 +61,28 @@ async def fetch_all_ads_from_database(trade_type=None):
             params = (trade_type,)
         await c.execute(query, params)
         ads = await c.fetchall()
-    
-    return [
-        {
-            'advNo': ad[0],                                    # string
-            'target_spot': ad[1] if ad[1] is not None else 0,  # integer
-            'asset_type': ad[2],                               # string
-            'price': ad[3],                                    # float/None
-            'floating_ratio': ad[4],                           # float/None
-            'last_updated': ad[5],                             # timestamp
-            'account': ad[6],                                  # string
-            'surplused_amount': ad[7],                         # float
-            'fiat': ad[8],                                     # string
-            'transAmount': ad[9],                              # float
-            'payTypes': json.loads(ad[10]) if ad[10] and ad[10].strip().startswith('[') else None,
-            'Group': ad[11],                                   # string
-            'trade_type': ad[12],                              # string
-            'minTransAmount': ad[13] if ad[13] is not None else 0.0  # float
-        }
-        for ad in ads
-    ]
+
+    return [_row_to_ad(ad) for ad in ads]
 
 async def get_ad_from_database(advNo):
-    """Get single ad from database with C2C API compatible data types"""
+    """Get single ad from database as a parsed OwnAd"""
     async with aiosqlite.connect(DB_FILE) as conn:
         c = await conn.cursor()
         await c.execute("SELECT * FROM ads WHERE advNo=?", (advNo,))
         ad = await c.fetchone()
-    
+
     if ad:
-        return {
-            'advNo': ad[0],                                    # string
-            'target_spot': ad[1] if ad[1] is not None else 0,  # integer
-            'asset_type': ad[2],                               # string
-            'price': ad[3],                                    # float/None
-            'floating_ratio': ad[4],                           # float/None
-            'last_updated': ad[5],                             # timestamp
-            'account': ad[6],                                  # string
-            'surplused_amount': ad[7],                         # float
-            'fiat': ad[8],                                     # string
-            'transAmount': ad[9],                              # float 
-            'payTypes': json.loads(ad[10]) if ad[10] is not None else None,
-            'Group': ad[11],                                   # string
-            'trade_type': ad[12],                              # string
-            'minTransAmount': ad[13] if ad[13] is not None else 0.0  # float
-        }
+        return _row_to_ad(ad)
     return None
 
 async def update_ad_in_database(target_spot, advNo, asset_type, floating_ratio, price, surplusAmount, account, fiat, transAmount, minTransAmount):
     """Update ad with C2C API compatible data types and validation"""
     logger.debug(f"Attempting to update {advNo} with price: {price}, floating_ratio: {floating_ratio}, asset_type: {asset_type}, target_spot: {target_spot}, fiat: {fiat}, transAmount: {transAmount}, minTransAmount: {minTransAmount}")
 
-    # Ensure numeric types for C2C API compatibility
-    if target_spot is None:
-        target_spot = 0
-    
-    # Ensure transAmount and minTransAmount are numeric (float/int)
-    if isinstance(transAmount, str):
-        try:
-            transAmount = float(transAmount)
-        except (ValueError, TypeError):
-            transAmount = 0.0
-    
-    if isinstance(minTransAmount, str):
-        try:
-            minTransAmount = float(minTransAmount)
-        except (ValueError, TypeError):
-            minTransAmount = 0.0
+    # Values from an OwnAd are already typed; this only converts raw callers
+    target_spot = ensure_integer(target_spot)
+    transAmount = ensure_numeric(transAmount, 0.0)
+    minTransAmount = ensure_numeric(minTransAmount, 0.0)
 
     async with aiosqlite.connect(DB_FILE) as conn:
         c = await conn.cursor()
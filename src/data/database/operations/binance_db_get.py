@@ -5,6 +5,9 @@ from typing import Optional
 
 from src.utils.common_vars import BBVA_BANKS
 from src.data.database.connection import DB_FILE
+from src.data.database.archive import fetch_archived_order
+from src.data.cache.user_cache import UserProfileCache
+from src.data.database.operations.write_behind import WriteBehindJournal
 import logging
 from src.utils.logging_config import setup_logging
 
@@ -30,15 +33,20 @@ async def order_exists(conn, orderNumber):
 async def get_order_details(conn, orderNumber):
     try:
         if not await order_exists(conn, orderNumber):
-            logger.warning(f"Order {orderNumber} does not exist")
-            return None
+            archived = await fetch_archived_order(orderNumber)
+            if archived is None:
+                logger.warning(f"Order {orderNumber} does not exist")
+            return archived
             
         async with conn.cursor() as cursor:
             await cursor.execute("SELECT * FROM orders WHERE orderNumber=?", (orderNumber,))
             row = await cursor.fetchone()
             if row:
                 column_names = [desc[0] for desc in cursor.description]
-                return {column_names[i]: row[i] for i in range(len(row))}
+                order = {column_names[i]: row[i] for i in range(len(row))}
+                # Apply writes still waiting in the write-behind journal
+                order.update(WriteBehindJournal.pending_fields('orders', orderNumber))
+                return order
             else:
                 return None
     except Exception as e:
@@ -68,12 +76,12 @@ async def calculate_crypto_sold_30d(conn, buyerName):
             logger.warning(f"User {buyerName} does not exist")
             return 0
             
+        # Summed from the daily buckets maintained by update_total_spent
         sql = """
-            SELECT SUM(amount)
-            FROM orders
-            WHERE buyerName = ? 
-                AND orderStatus = 4
-                AND order_date >= datetime('now', '-30 day')
+            SELECT SUM(crypto_amount)
+            FROM buyer_daily_volume
+            WHERE buyerName = ?
+                AND day > date('now', 'localtime', '-30 day')
         """
         params = (buyerName,)
         total_crypto_sold_30d = await execute_and_fetchone(conn, sql, params)
@@ -84,28 +92,22 @@ async def calculate_crypto_sold_30d(conn, buyerName):
 
 async def get_kyc_status(conn, name):
     try:
-        if not await user_exists(conn, name):
+        profile = await UserProfileCache.get_profile(conn, name)
+        if profile is None:
             logger.warning(f"User {name} does not exist when checking KYC status")
             return None
-            
-        async with conn.cursor() as cursor:
-            await cursor.execute("SELECT kyc_status FROM users WHERE name=?", (name,))
-            result = await cursor.fetchone()
-            return result[0] if result else None
+        return profile.kyc_status
     except Exception as e:
         logger.error(f"Error getting KYC status for user {name}: {e}")
         return None
 
 async def get_anti_fraud_stage(conn, name):
     try:
-        if not await user_exists(conn, name):
+        profile = await UserProfileCache.get_profile(conn, name)
+        if profile is None:
             logger.warning(f"User {name} does not exist when checking anti-fraud stage")
             return None
-            
-        async with conn.cursor() as cursor:
-            await cursor.execute("SELECT anti_fraud_stage FROM users WHERE name=?", (name,))
-            result = await cursor.fetchone()
-            return result[0] if result else None
+        return profile.anti_fraud_stage
     except Exception as e:
         logger.error(f"Error getting anti-fraud stage for user {name}: {e}")
         return None
@@ -165,19 +167,19 @@ async def execute_and_fetchone(conn, sql, params=None):
 
 async def get_buyer_bank(conn, buyerName):
     try:
-        if not await user_exists(conn, buyerName):
+        profile = await UserProfileCache.get_profile(conn, buyerName)
+        if profile is None:
             logger.warning(f"User {buyerName} does not exist when getting buyer bank")
             return None
-            
-        async with conn.cursor() as cursor:
-            await cursor.execute("SELECT user_bank FROM users WHERE name=?", (buyerName,))
-            result = await cursor.fetchone()
-            return result[0] if result else None
+        return profile.user_bank
     except Exception as e:
         logger.error(f"Error getting buyer bank for user {buyerName}: {e}")
         return None
 
 async def get_account_number(conn, orderNumber):
+    pending = WriteBehindJournal.pending_fields('orders', orderNumber)
+    if 'account_number' in pending:
+        return pending['account_number']
     try:
         if not await order_exists(conn, orderNumber):
             logger.warning(f"Order {orderNumber} does not exist when getting account number")
@@ -263,32 +265,26 @@ async def has_specific_pay_type(conn, orderNumber: str, payment_types: list[str]
         return None
 
 async def get_user_language_preference(conn, buyerName: str) -> Optional[str]:
-    """Get user's language preference from database."""
+    """Get user's language preference from the profile cache or database."""
     try:
-        if not await user_exists(conn, buyerName):
+        profile = await UserProfileCache.get_profile(conn, buyerName)
+        if profile is None:
             logger.warning(f"User {buyerName} does not exist when getting language preference")
             return None
-            
-        async with conn.cursor() as cursor:
-            await cursor.execute("SELECT language_preference FROM users WHERE name = ?", (buyerName,))
-            result = await cursor.fetchone()
-            return result[0] if result and result[0] else None
+        return profile.language_preference or None
         
     except Exception as e:
         logger.error(f"Error getting language preference for {buyerName}: {str(e)}")
         return None
 
 async def get_language_selection_stage(conn, buyerName: str) -> Optional[int]:
-    """Get user's language selection stage from database."""
+    """Get user's language selection stage from the profile cache or database."""
     try:
-        if not await user_exists(conn, buyerName):
+        profile = await UserProfileCache.get_profile(conn, buyerName)
+        if profile is None:
             logger.warning(f"User {buyerName} does not exist when getting language selection stage")
             return 0  # Default stage for non-existent users
-            
-        async with conn.cursor() as cursor:
-            await cursor.execute("SELECT language_selection_stage FROM users WHERE name = ?", (buyerName,))
-            result = await cursor.fetchone()
-            return result[0] if result and result[0] is not None else 0
+        return profile.language_selection_stage or 0
         
     except Exception as e:
         logger.error(f"Error getting language selection stage for {buyerName}: {str(e)}")
@@ -3,7 +3,9 @@ import aiosqlite
 from typing import Any, Dict, Union
 
 from src.data.cache.share_data import SharedData
+from src.data.cache.user_cache import UserProfileCache
 from src.data.database.connection import execute_and_commit
+from src.data.database.operations.buyer_volume import record_order_volume
 import logging
 from src.utils.logging_config import setup_logging
 
@@ -194,7 +196,7 @@ async def register_merchant(conn, sellerName):
 async def update_total_spent(conn, orderNumber):
     try:
         order_sql = """
-            SELECT buyerName, sellerName, totalPrice, order_date
+            SELECT buyerName, sellerName, amount, totalPrice, order_date
             FROM orders
             WHERE orderNumber = ?
         """
@@ -205,20 +207,30 @@ async def update_total_spent(conn, orderNumber):
                 logger.warning(f"No order found with orderNumber: {orderNumber}")
                 return
             
-            buyerName, sellerName, totalPrice, order_date = order_details
+            buyerName, sellerName, amount, totalPrice, order_date = order_details
         
         # Ensure user exists before updating
         await find_or_insert_buyer(conn, buyerName)
+
+        # The volume marker makes a retried completion job a no-op instead of a double count
+        if not await record_order_volume(conn, orderNumber, buyerName, amount, totalPrice, order_date):
+            logger.info(f"Order {orderNumber} already counted towards {buyerName}'s totals")
+            await conn.commit()
+            return
         
         update_user_sql = """
             UPDATE users 
             SET total_crypto_sold_lifetime = total_crypto_sold_lifetime + ?
             WHERE name = ?
         """
-        await execute_and_commit(conn, update_user_sql, (totalPrice, buyerName))
+        await conn.execute(update_user_sql, (totalPrice, buyerName))
         await insert_transaction(conn, buyerName, sellerName, totalPrice, order_date)
+        await conn.commit()
     except Exception as e:
+        await conn.rollback()
         logger.error(f"An error occurred in update_total_spent: {e}")
+        # Runs as a queued job: the queue has to see the failure to retry it
+        raise
 
 async def insert_transaction(conn, buyerName, sellerName, totalPrice, order_date):
     # Ensure both users exist
@@ -240,6 +252,7 @@ async def update_kyc_status(conn, name, new_kyc_status):
         # Ensure user exists before updating
         await find_or_insert_buyer(conn, name)
         await update_table_column(conn, "users", "kyc_status", new_kyc_status, "name", name)
+        UserProfileCache.update(name, kyc_status=new_kyc_status)
     except Exception as e:
         logger.error(f"Error updating KYC status for user {name}: {e}")
 
@@ -248,6 +261,7 @@ async def update_anti_fraud_stage(conn, buyerName, new_stage):
         # Ensure user exists before updating
         await find_or_insert_buyer(conn, buyerName)
         await update_table_column(conn, "users", "anti_fraud_stage", new_stage, "name", buyerName)
+        UserProfileCache.update(buyerName, anti_fraud_stage=new_stage)
     except Exception as e:
         logger.error(f"Error updating anti-fraud stage for user {buyerName}: {e}")
 
@@ -296,6 +310,7 @@ async def update_buyer_bank(conn, buyerName, new_buyer_bank):
         # Ensure user exists before updating
         await find_or_insert_buyer(conn, buyerName)
         await update_table_column(conn, "users", "user_bank", new_buyer_bank, "name", buyerName)
+        UserProfileCache.update(buyerName, user_bank=new_buyer_bank)
     except Exception as e:
         logger.error(f"Error updating user_bank for user {buyerName}: {e}")
 
@@ -308,6 +323,7 @@ async def set_user_language_preference(conn, buyerName: str, language: str) -> b
         # Update the language preference
         sql = "UPDATE users SET language_preference = ? WHERE name = ?"
         await execute_and_commit(conn, sql, (language, buyerName))
+        UserProfileCache.update(buyerName, language_preference=language)
         return True
         
     except Exception as e:
@@ -323,6 +339,7 @@ async def set_language_selection_stage(conn, buyerName: str, stage: int) -> bool
         # Update the language selection stage
         sql = "UPDATE users SET language_selection_stage = ? WHERE name = ?"
         await execute_and_commit(conn, sql, (stage, buyerName))
+        UserProfileCache.update(buyerName, language_selection_stage=stage)
         return True
         
     except Exception as e:
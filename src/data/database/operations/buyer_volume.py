@@ -0,0 +1,109 @@
+# bpa/buyer_volume.py
+"""
+Per-buyer daily volume buckets.
+
+Every completed order is added once to buyer_daily_volume (crypto amount,
+fiat total and order count per buyer per day). buyer_volume_applied records
+which orders were added, so a retried completion job never counts an order
+twice. Rolling windows are sums over at most a window's worth of buckets
+instead of scans of the order history.
+
+The tables are created (and backfilled from completed orders) by migration 2
+in src/data/database/migrations.py.
+"""
+from typing import Dict, Optional
+
+import logging
+from src.utils.logging_config import setup_logging
+
+setup_logging(log_filename='binance_main.log')
+logger = logging.getLogger(__name__)
+
+# Window name -> days (None for lifetime)
+VOLUME_WINDOWS: Dict[str, Optional[int]] = {
+    '1d': 1,
+    '7d': 7,
+    '30d': 30,
+    'lifetime': None,
+}
+
+CREATE_BUYER_VOLUME_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS buyer_daily_volume (
+        buyerName TEXT NOT NULL,
+        day TEXT NOT NULL,
+        crypto_amount REAL NOT NULL DEFAULT 0,
+        fiat_total REAL NOT NULL DEFAULT 0,
+        order_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (buyerName, day)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS buyer_volume_applied (
+        orderNumber TEXT PRIMARY KEY
+    ) WITHOUT ROWID
+    """,
+]
+
+BACKFILL_BUYER_VOLUME_SQL = [
+    """
+    INSERT INTO buyer_daily_volume (buyerName, day, crypto_amount, fiat_total, order_count)
+    SELECT buyerName, date(order_date), COALESCE(SUM(amount), 0), COALESCE(SUM(totalPrice), 0), COUNT(*)
+    FROM orders
+    WHERE orderStatus = 4 AND buyerName IS NOT NULL AND order_date IS NOT NULL
+    GROUP BY buyerName, date(order_date)
+    ON CONFLICT (buyerName, day) DO NOTHING
+    """,
+    """
+    INSERT OR IGNORE INTO buyer_volume_applied (orderNumber)
+    SELECT orderNumber FROM orders
+    WHERE orderStatus = 4 AND buyerName IS NOT NULL AND order_date IS NOT NULL
+    """,
+]
+
+
+async def record_order_volume(conn, orderNumber: str, buyerName: str, amount: float,
+                              totalPrice: float, order_date: str) -> bool:
+    """
+    Add a completed order to its buyer's bucket. Does not commit, so callers
+    can make it atomic with their own writes. Returns False if the order had
+    already been counted.
+    """
+    cursor = await conn.execute(
+        "INSERT OR IGNORE INTO buyer_volume_applied (orderNumber) VALUES (?)", (orderNumber,)
+    )
+    if cursor.rowcount == 0:
+        return False
+    await conn.execute(
+        """
+        INSERT INTO buyer_daily_volume (buyerName, day, crypto_amount, fiat_total, order_count)
+        VALUES (?, COALESCE(date(?), date('now', 'localtime')), ?, ?, 1)
+        ON CONFLICT (buyerName, day) DO UPDATE SET
+            crypto_amount = crypto_amount + excluded.crypto_amount,
+            fiat_total = fiat_total + excluded.fiat_total,
+            order_count = order_count + 1
+        """,
+        (buyerName, order_date, amount or 0.0, totalPrice or 0.0)
+    )
+    return True
+
+
+async def get_buyer_volume(conn, buyerName: str, days: Optional[int] = None) -> Dict[str, float]:
+    """Totals over the last `days` calendar days including today, or lifetime if None."""
+    sql = """
+        SELECT COALESCE(SUM(crypto_amount), 0), COALESCE(SUM(fiat_total), 0), COALESCE(SUM(order_count), 0)
+        FROM buyer_daily_volume
+        WHERE buyerName = ?
+    """
+    params = [buyerName]
+    if days is not None:
+        sql += " AND day > date('now', 'localtime', ?)"
+        params.append(f"-{int(days)} day")
+    async with conn.execute(sql, params) as cursor:
+        crypto_amount, fiat_total, order_count = await cursor.fetchone()
+    return {'crypto_amount': crypto_amount, 'fiat_total': fiat_total, 'order_count': order_count}
+
+
+async def get_buyer_volume_windows(conn, buyerName: str) -> Dict[str, Dict[str, float]]:
+    """Every window in VOLUME_WINDOWS for one buyer."""
+    return {name: await get_buyer_volume(conn, buyerName, days) for name, days in VOLUME_WINDOWS.items()}
@@ -0,0 +1,189 @@
+# bpa/write_behind.py
+"""
+Write-behind journal for order and user mutations.
+
+Chat handlers record field changes here instead of issuing one UPDATE and one
+COMMIT per field. Dirty fields are grouped per row (a later write to the same
+field replaces the earlier one) and flushed in a single transaction either on
+a timer or as soon as enough rows are pending. close() performs a final flush
+on shutdown.
+
+Until a row is flushed, readers can overlay the pending values with
+pending_fields() so handlers still read their own writes.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict
+
+from src.data.cache.user_cache import UserProfileCache
+from src.data.database.connection import create_connection, DB_FILE
+from src.data.database.operations.binance_db_set import ALLOWED_TABLES
+import logging
+from src.utils.logging_config import setup_logging
+
+setup_logging(log_filename='binance_main.log')
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 1.0
+MAX_PENDING_ROWS = 200
+
+# Tables the journal may write to and the column identifying a row
+JOURNAL_TABLES = {
+    'users': 'name',
+    'orders': 'orderNumber',
+}
+
+INSERT_MISSING_USER_SQL = """
+    INSERT OR IGNORE INTO users
+    (name, kyc_status, total_crypto_sold_lifetime, anti_fraud_stage,
+     usd_verification_stage, language_preference, language_selection_stage)
+    VALUES (?, 0, 0.0, 0, 0, NULL, 0)
+"""
+
+
+class WriteBehindJournal:
+    _dirty: Dict[str, Dict[str, Dict[str, Any]]] = {table: {} for table in JOURNAL_TABLES}
+    _flush_lock = asyncio.Lock()
+    _flush_requested = asyncio.Event()
+    _conn = None
+    _flushed_rows = 0
+    _failed_flushes = 0
+
+    @classmethod
+    def _validate(cls, table: str, column: str, value: Any) -> Any:
+        if table not in JOURNAL_TABLES:
+            raise ValueError(f"Invalid table: {table}")
+        if column not in ALLOWED_TABLES[table] or column == JOURNAL_TABLES[table]:
+            raise ValueError(f"Invalid column: {column} for table: {table}")
+        if value is None:
+            return None
+        expected_type = ALLOWED_TABLES[table][column]
+        if not isinstance(value, expected_type):
+            raise TypeError(f"Expected {expected_type} for {column}, got {type(value)}")
+        if expected_type == bool:
+            return 1 if value else 0
+        return value
+
+    @classmethod
+    def record(cls, table: str, key: str, **fields: Any) -> None:
+        """Mark fields of one row as dirty. Raises on unknown columns or bad types."""
+        if not key:
+            logger.warning(f"Ignoring journal write to {table} without a key: {fields}")
+            return
+        validated = {column: cls._validate(table, column, value) for column, value in fields.items()}
+        cls._dirty[table].setdefault(key, {}).update(validated)
+        if table == 'users':
+            UserProfileCache.update(key, **validated)
+        if cls.pending_rows() >= MAX_PENDING_ROWS:
+            cls._flush_requested.set()
+
+    @classmethod
+    def record_user(cls, name: str, **fields: Any) -> None:
+        cls.record('users', name, **fields)
+
+    @classmethod
+    def record_order(cls, orderNumber: str, **fields: Any) -> None:
+        cls.record('orders', orderNumber, **fields)
+
+    @classmethod
+    def pending_fields(cls, table: str, key: str) -> Dict[str, Any]:
+        """Return the not yet flushed values for a row (empty if none)."""
+        return dict(cls._dirty.get(table, {}).get(key, {}))
+
+    @classmethod
+    def pending_rows(cls) -> int:
+        return sum(len(rows) for rows in cls._dirty.values())
+
+    @classmethod
+    async def _write_batch(cls, conn, batch: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+        users = batch.get('users', {})
+        if users:
+            await conn.executemany(INSERT_MISSING_USER_SQL, [(name,) for name in users])
+
+        for table, rows in batch.items():
+            key_column = JOURNAL_TABLES[table]
+            # Rows touching the same set of columns share one UPDATE statement
+            grouped = defaultdict(list)
+            for key, fields in rows.items():
+                columns = tuple(sorted(fields))
+                grouped[columns].append(tuple(fields[column] for column in columns) + (key,))
+
+            for columns, params in grouped.items():
+                assignments = ', '.join(f"{column} = ?" for column in columns)
+                sql = f"UPDATE {table} SET {assignments} WHERE {key_column} = ?"
+                await conn.executemany(sql, params)
+
+    @classmethod
+    async def flush(cls, conn=None) -> int:
+        """Write all pending rows in one transaction. Returns the number of rows written."""
+        async with cls._flush_lock:
+            cls._flush_requested.clear()
+            if not cls.pending_rows():
+                return 0
+
+            batch = cls._dirty
+            cls._dirty = {table: {} for table in JOURNAL_TABLES}
+            row_count = sum(len(rows) for rows in batch.values())
+
+            own_conn = None
+            if conn is None:
+                if cls._conn is None:
+                    own_conn = await create_connection(DB_FILE)
+                conn = cls._conn or own_conn
+
+            try:
+                if conn is None:
+                    raise RuntimeError("No database connection available")
+                await cls._write_batch(conn, batch)
+                await conn.commit()
+                cls._flushed_rows += row_count
+                logger.debug(f"Flushed {row_count} journaled rows to database")
+                return row_count
+            except Exception as e:
+                cls._failed_flushes += 1
+                logger.error(f"Error flushing write-behind journal ({row_count} rows): {e}")
+                if conn is not None:
+                    try:
+                        await conn.rollback()
+                    except Exception:
+                        pass
+                # Put the batch back without clobbering values recorded since the swap
+                for table, rows in batch.items():
+                    for key, fields in rows.items():
+                        newer = cls._dirty[table].setdefault(key, {})
+                        for column, value in fields.items():
+                            newer.setdefault(column, value)
+                return 0
+            finally:
+                if own_conn is not None:
+                    await own_conn.close()
+
+    @classmethod
+    async def run(cls, interval: float = FLUSH_INTERVAL_SECONDS) -> None:
+        """Flush on a timer, or early when the pending threshold is reached."""
+        if cls._conn is None:
+            cls._conn = await create_connection(DB_FILE)
+        while True:
+            try:
+                await asyncio.wait_for(cls._flush_requested.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            await cls.flush()
+
+    @classmethod
+    async def close(cls) -> None:
+        """Final flush on shutdown."""
+        await cls.flush()
+        if cls.pending_rows():
+            logger.error(f"{cls.pending_rows()} journaled rows could not be written on shutdown")
+        if cls._conn is not None:
+            await cls._conn.close()
+            cls._conn = None
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        return {
+            'pending_rows': cls.pending_rows(),
+            'flushed_rows': cls._flushed_rows,
+            'failed_flushes': cls._failed_flushes,
+        }
@@ -5,7 +5,8 @@ import asyncio
 from src.data.database.operations.ads_database import fetch_all_ads_from_database, update_ad_in_database
 from src.utils.common_vars import ads_dict
 from src.connectors.credentials import credentials_dict
-from src.data.cache.share_data import SharedData
+from src.data.cache.ad_store import AdStore
+from src.data.cache.own_ad import ensure_integer, ensure_numeric
 import logging
 from src.utils.logging_config import setup_logging
 
@@ -21,33 +22,6 @@ advNo_to_fiat = {ad['advNo']: ad['fiat'] for _, ads in ads_dict.items() for ad i
 advNo_to_transAmount = {ad['advNo']: ad['transAmount'] for _, ads in ads_dict.items() for ad in ads}
 advNo_to_minTransAmount = {ad['advNo']: ad['minTransAmount'] for _, ads in ads_dict.items() for ad in ads}
 
-def ensure_numeric(value, default=0):
-    """Ensure value is numeric (for C2C API compatibility)"""
-    if value is None:
-        return default
-    if isinstance(value, (int, float)):
-        return value
-    if isinstance(value, str):
-        try:
-            # Try to convert string to number
-            return float(value) if '.' in value else int(value)
-        except (ValueError, TypeError):
-            return default
-    return default
-
-def ensure_integer(value, default=0):
-    """Ensure value is integer (for target_spot)"""
-    if value is None:
-        return default
-    if isinstance(value, int):
-        return value
-    if isinstance(value, (float, str)):
-        try:
-            return int(float(value))
-        except (ValueError, TypeError):
-            return default
-    return default
-
 async def populate_ads_with_details(binance_api):
     try:
         ads_info = await fetch_all_ads_from_database()
@@ -112,36 +86,10 @@ async def update_ad_detail(account, binance_api, KEY, SECRET, ad_info):
         logger.error(f"Full traceback: {traceback.format_exc()}")
 
 async def populate_shared_data(ads_info):
-    successful_additions = 0
     try:
-        for ad_info in ads_info:
-            advNo = ad_info['advNo']
-            
-            # Ensure data types are correct before adding to SharedData
-            processed_ad_info = {
-                'advNo': ad_info['advNo'],                                          # string
-                'target_spot': ensure_integer(ad_info.get('target_spot', 0)),       # integer
-                'asset_type': ad_info.get('asset_type', ''),                       # string
-                'price': ensure_numeric(ad_info.get('price')),                     # float
-                'floating_ratio': ensure_numeric(ad_info.get('floating_ratio')),   # float
-                'last_updated': ad_info.get('last_updated'),                       # timestamp
-                'account': ad_info.get('account', ''),                             # string
-                'surplused_amount': ensure_numeric(ad_info.get('surplused_amount', 0)), # float
-                'fiat': ad_info.get('fiat', 'MXN'),                               # string
-                'transAmount': ensure_numeric(ad_info.get('transAmount', 0)),      # float/int (numeric)
-                'payTypes': ad_info.get('payTypes'),                              # list or None
-                'Group': ad_info.get('Group', ''),                                # string
-                'trade_type': ad_info.get('trade_type', ''),                      # string
-                'minTransAmount': ensure_numeric(ad_info.get('minTransAmount', 0)) # float/int (numeric)
-            }
-            
-            success = await SharedData.set_ad(advNo, processed_ad_info)
-            if success:
-                successful_additions += 1
-            else:
-                logger.warning(f"Failed to set ad {advNo} in SharedData.")
-        
-        logger.info(f"Successfully added {successful_additions} ads to SharedData")
+        # One new store version for the whole batch, not one copy per ad
+        snapshot = AdStore.put_many(ads_info)
+        logger.info(f"Successfully added {len(ads_info)} ads to SharedData ({len(snapshot)} total)")
         
     except Exception as e:
         logger.error(f"Error in populate_shared_data: {e}")
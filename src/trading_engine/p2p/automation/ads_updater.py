@@ -36,28 +36,6 @@ MAX_RATIO = 110.00
 RATIO_ADJUSTMENT = 0.05
 DIFF_THRESHOLD = 0.15
 
-def ensure_numeric(value, default=0.0):
-    """Convert value to numeric, handling various input types"""
-    if value is None:
-        return default
-    if isinstance(value, (int, float)):
-        return value
-    if isinstance(value, str):
-        try:
-            return float(value) if '.' in value else int(value)
-        except (ValueError, TypeError):
-            return default
-    return default
-
-def ensure_integer(value, default=0):
-    """Convert value to integer"""
-    if isinstance(value, int):
-        return value
-    try:
-        return int(float(value)) if value is not None else default
-    except (ValueError, TypeError):
-        return default
-
 def compute_base_price(price: float, floating_ratio: float) -> float:
     """Calculate base price from current price and floating ratio"""
     return round(price / (floating_ratio / 100), 2)
@@ -65,7 +43,7 @@ def compute_base_price(price: float, floating_ratio: float) -> float:
 def determine_price_threshold(payTypes, is_buy=True):
     """Determine appropriate price threshold based on payment method"""
     if payTypes is not None:
-        payTypes_to_check = payTypes if isinstance(payTypes, list) else [payTypes]
+        payTypes_to_check = payTypes if isinstance(payTypes, (list, tuple)) else [payTypes]
         
         # OXXO has specific threshold
         if 'OXXO' in payTypes_to_check:
@@ -116,6 +94,9 @@ def adjust_thresholds_for_market_conditions(base_price, asset_type, fiat, is_buy
     
     if ask is None or bid is None or asset_type != 'USDT' or fiat == 'USD':
         return
+    # Bitso book is resyncing: keep the thresholds set from the last good prices
+    if reference_prices.get("stale"):
+        return
     
     min_diff = 0.0005
     previous_sell_threshold = SELL_PRICE_THRESHOLD
@@ -155,14 +136,12 @@ async def retry_fetch_ads(binance_api, KEY, SECRET, ad, is_buy, max_pages=10):
     advNo = ad.get('advNo')
     
     for page in range(1, max_pages + 1):
-        transAmount = ensure_numeric(ad['transAmount'])
-        
         ads_data = await binance_api.fetch_ads_search(
             KEY, SECRET, 
             'BUY' if is_buy else 'SELL',
             ad['asset_type'], 
             ad['fiat'],
-            transAmount, 
+            ad['transAmount'], 
             ad['payTypes'], 
             page
         )
@@ -181,13 +160,14 @@ async def analyze_and_update_ads(ad, binance_api, KEY, SECRET, ads_data, all_ads
     if not ad:
         return
 
-    advNo = ad.get('advNo')
-    target_spot = ensure_integer(ad.get('target_spot', 0))
-    asset_type = ad.get('asset_type')
-    current_ratio = ensure_numeric(ad.get('floating_ratio', 0))
-    fiat = ad.get('fiat')
-    transAmount = ensure_numeric(ad.get('transAmount', 0))
-    minTransAmount = ensure_numeric(ad.get('minTransAmount', 0))
+    # An OwnAd: fields were parsed and typed when the ad was loaded
+    advNo = ad.advNo
+    target_spot = ad.target_spot
+    asset_type = ad.asset_type
+    current_ratio = ad.floating_ratio
+    fiat = ad.fiat
+    transAmount = ad.transAmount
+    minTransAmount = ad.minTransAmount
 
     try:
         # Get our current ad data
@@ -258,7 +238,7 @@ async def analyze_and_update_ads(ad, binance_api, KEY, SECRET, ads_data, all_ads
                     'asset_type': asset_type,
                     'floating_ratio': new_ratio,
                     'price': our_current_price,
-                    'surplusAmount': ensure_numeric(ad.get('surplused_amount', 0)),
+                    'surplusAmount': ad.surplused_amount,
                     'account': ad['account'],
                     'fiat': fiat,
                     'transAmount': transAmount,
@@ -269,10 +249,10 @@ async def analyze_and_update_ads(ad, binance_api, KEY, SECRET, ads_data, all_ads
                 # Queue shared data updates
                 shared_update_data = update_data.copy()
                 shared_update_data.update({
-                    'surplused_amount': ensure_numeric(ad.get('surplused_amount', 0)),
-                    'payTypes': ad.get('payTypes'),
-                    'Group': ad.get('Group'),
-                    'trade_type': ad.get('trade_type')
+                    'surplused_amount': ad.surplused_amount,
+                    'payTypes': ad.payTypes,
+                    'Group': ad.Group,
+                    'trade_type': ad.trade_type
                 })
                 shared_data_updates.append(shared_update_data)
 
@@ -290,8 +270,8 @@ async def process_ads_group(ads_group, binance_api, all_ads, is_buy, batch_updat
         account = ad['account']
         KEY = credentials_dict[account]['KEY']
         SECRET = credentials_dict[account]['SECRET']
-        payTypes_list = ad['payTypes'] if ad['payTypes'] is not None else []
-        transAmount = ensure_numeric(ad['transAmount'])
+        payTypes_list = ad['payTypes'] if ad['payTypes'] is not None else ()
+        transAmount = ad['transAmount']
         
         # Fetch current market data
         ads_data = await binance_api.fetch_ads_search(
@@ -370,7 +350,8 @@ async def update_ads_main(binance_api):
         
         # Execute batch updates
         await batch_update(batch_updates, update_ad_in_database)
-        await batch_update(shared_data_updates, SharedData.update_ad)
+        # One new ad snapshot for the whole cycle
+        await SharedData.update_ads(shared_data_updates)
         
         await asyncio.sleep(1)
 
@@ -0,0 +1,193 @@
+# bpa/cep_cache.py
+"""
+Persistent cache of CEP (Banxico) transfer validations.
+
+Results are keyed on (fecha, clave_rastreo, emisor, receptor, cuenta, monto).
+A successful validation never changes, so positive entries are kept for good.
+A transfer that is not found yet may still settle, so negative entries expire
+after NEGATIVE_TTL_SECONDS, or the negative_ttl a caller passes to validate()
+to match its own retry schedule. Errors (timeouts, CEP outages) are never cached.
+
+Concurrent lookups of the same key share one CEP call (singleflight). Calls
+run on a dedicated, bounded thread pool so a slow CEP cannot starve the
+default executor used by asyncio.to_thread elsewhere.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+from cep import Transferencia
+from src.data.database.connection import create_connection, DB_FILE
+import logging
+from src.utils.logging_config import setup_logging
+
+setup_logging(log_filename='binance_main.log')
+logger = logging.getLogger(__name__)
+
+CEP_THREADS = 4
+NEGATIVE_TTL_SECONDS = 30
+
+CREATE_CEP_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS cep_validations (
+        cache_key TEXT PRIMARY KEY,
+        fecha TEXT NOT NULL,
+        clave_rastreo TEXT NOT NULL,
+        emisor TEXT NOT NULL,
+        receptor TEXT NOT NULL,
+        cuenta TEXT NOT NULL,
+        monto REAL NOT NULL,
+        valid INTEGER NOT NULL,
+        checked_at REAL NOT NULL,
+        expires_at REAL
+    )
+"""
+
+
+def _as_date(fecha) -> date:
+    if isinstance(fecha, str):
+        return datetime.strptime(fecha, '%Y-%m-%d').date()
+    if isinstance(fecha, datetime):
+        return fecha.date()
+    return fecha
+
+
+def cache_key(fecha: date, clave_rastreo, emisor, receptor, cuenta, monto) -> str:
+    return '|'.join((fecha.isoformat(), str(clave_rastreo), str(emisor), str(receptor),
+                     str(cuenta), f"{float(monto):.2f}"))
+
+
+class CEPValidationCache:
+    _instance: Optional['CEPValidationCache'] = None
+    _lock = asyncio.Lock()
+
+    def __init__(self, threads: int = CEP_THREADS, negative_ttl: float = NEGATIVE_TTL_SECONDS):
+        if self.__class__._instance is not None:
+            raise RuntimeError("This class is a singleton. Use get_instance() instead.")
+        self.conn = None
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='cep')
+        self.negative_ttl = negative_ttl
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.init_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    async def get_instance(cls) -> 'CEPValidationCache':
+        if cls._instance is None:
+            async with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    async def initialize(self, conn=None) -> None:
+        async with self.init_lock:
+            if self.conn is not None:
+                return
+            self.conn = conn or await create_connection(DB_FILE)
+            await self.conn.execute(CREATE_CEP_TABLE_SQL)
+            await self.conn.execute("DELETE FROM cep_validations WHERE expires_at IS NOT NULL AND expires_at < ?",
+                                    (time.time(),))
+            await self.conn.commit()
+
+    async def _cached(self, key: str) -> Optional[bool]:
+        async with self.conn.execute(
+            "SELECT valid, expires_at FROM cep_validations WHERE cache_key = ?", (key,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        valid, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            return None
+        return bool(valid)
+
+    async def _store(self, key: str, params: Tuple, valid: bool, negative_ttl: float) -> None:
+        now = time.time()
+        fecha, clave_rastreo, emisor, receptor, cuenta, monto = params
+        await self.conn.execute(
+            """
+            INSERT OR REPLACE INTO cep_validations
+            (cache_key, fecha, clave_rastreo, emisor, receptor, cuenta, monto, valid, checked_at, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (key, fecha.isoformat(), clave_rastreo, str(emisor), str(receptor), str(cuenta), float(monto),
+             int(valid), now, None if valid else now + negative_ttl)
+        )
+        await self.conn.commit()
+
+    async def _call_cep(self, params: Tuple, retries: int, delay: float, backoff: float) -> bool:
+        fecha, clave_rastreo, emisor, receptor, cuenta, monto = params
+        loop = asyncio.get_running_loop()
+        for attempt in range(retries):
+            try:
+                tr = await loop.run_in_executor(self.executor, lambda: Transferencia.validar(
+                    fecha=fecha,
+                    clave_rastreo=clave_rastreo,
+                    emisor=emisor,
+                    receptor=receptor,
+                    cuenta=cuenta,
+                    monto=monto,
+                ))
+                return tr is not None
+            except Exception as e:
+                if attempt == retries - 1:
+                    raise
+                wait_time = delay * (backoff ** attempt)
+                logger.warning(f"CEP attempt {attempt + 1} for clave {clave_rastreo} failed: {e}. "
+                               f"Retrying in {wait_time}s...")
+                await asyncio.sleep(wait_time)
+        return False
+
+    async def validate(self, fecha, clave_rastreo, emisor, receptor, cuenta, monto,
+                       retries: int = 1, delay: float = 1, backoff: float = 2,
+                       negative_ttl: Optional[float] = None) -> bool:
+        """
+        Validate a transfer with CEP, answering from the cache when possible.
+        A negative result is cached for `negative_ttl` seconds (the cache's
+        default if None). Raises the last CEP error if every attempt failed;
+        errors are not cached.
+        """
+        await self.initialize()
+        params = (_as_date(fecha), clave_rastreo, emisor, receptor, cuenta, monto)
+        key = cache_key(*params)
+
+        cached = await self._cached(key)
+        if cached is not None:
+            self.hits += 1
+            logger.debug(f"CEP cache hit for clave {clave_rastreo}: {cached}")
+            return cached
+
+        future = self.inflight.get(key)
+        if future is not None:
+            self.hits += 1
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            valid = await self._call_cep(params, retries, delay, backoff)
+            await self._store(key, params, valid, self.negative_ttl if negative_ttl is None else negative_ttl)
+            future.set_result(valid)
+            return valid
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody else waited for is not reported as unhandled
+            future.exception()
+            raise
+        finally:
+            del self.inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'inflight': len(self.inflight)}
+
+    async def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
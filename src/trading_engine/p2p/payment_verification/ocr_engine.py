@@ -0,0 +1,246 @@
+# bpa/ocr_engine.py
+"""
+Process-pool OCR engine for bank receipts.
+
+OCR runs in long-lived worker processes so it never blocks the event loop.
+Receipts are decoded and preprocessed (see receipt_preprocessing) in the
+worker as well, so only the raw bytes and the resulting text cross processes.
+When tesserocr is installed, each worker keeps one initialized Tesseract API
+per config and reuses it. Otherwise workers fall back to pytesseract, which
+starts a tesseract subprocess per call.
+
+The async API bounds the number of in-flight jobs, rejects new jobs once the
+queue is full, and applies a per-job timeout. A timed-out job cannot be
+cancelled inside its worker, so the pool is recycled (workers killed) rather
+than left with a busy process the semaphore counts as free.
+"""
+import asyncio
+import os
+import shlex
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+from src.trading_engine.p2p.payment_verification.receipt_preprocessing import prepare, has_candidate
+
+import logging
+from src.utils.logging_config import setup_logging
+
+setup_logging(log_filename='binance_main.log')
+logger = logging.getLogger(__name__)
+
+OCR_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+MAX_QUEUED_JOBS = 32
+OCR_TIMEOUT_SECONDS = 30
+
+# ==========================================
+# WORKER PROCESS SIDE
+# ==========================================
+
+_tesserocr = None
+_apis: Dict[str, object] = {}
+
+
+def _init_worker() -> None:
+    """Runs once in each worker process."""
+    global _tesserocr
+    try:
+        import tesserocr
+        _tesserocr = tesserocr
+    except ImportError:
+        _tesserocr = None
+
+
+def _parse_config(config: str):
+    """Split a pytesseract config string into psm, oem and -c variables."""
+    psm, oem, variables = 3, 3, {}
+    args = shlex.split(config)
+    i = 0
+    while i < len(args):
+        if args[i] == '--psm' and i + 1 < len(args):
+            psm = int(args[i + 1])
+            i += 1
+        elif args[i] == '--oem' and i + 1 < len(args):
+            oem = int(args[i + 1])
+            i += 1
+        elif args[i] == '-c' and i + 1 < len(args):
+            key, _, value = args[i + 1].partition('=')
+            variables[key] = value
+            i += 1
+        i += 1
+    return psm, oem, variables
+
+
+def _get_api(config: str):
+    api = _apis.get(config)
+    if api is None:
+        psm, oem, variables = _parse_config(config)
+        api = _tesserocr.PyTessBaseAPI(psm=psm, oem=oem)
+        for key, value in variables.items():
+            api.SetVariable(key, value)
+        _apis[config] = api
+    return api
+
+
+def _ocr_image(image, config: str) -> str:
+    if _tesserocr is not None:
+        api = _get_api(config)
+        api.SetImage(image)
+        return api.GetUTF8Text()
+
+    import pytesseract
+    return pytesseract.image_to_string(image, config=config)
+
+
+def _ocr_receipt(data, bank: str, config: str, full_page_fallback: bool = True) -> Tuple[str, Dict[str, float], bool]:
+    """
+    OCR the bank's region of interest. Without a candidate in it, the full
+    page is OCR'd too, unless `full_page_fallback` is False (the caller then
+    decides itself whether a full-page pass is needed).
+    """
+    page, roi, timings = prepare(data, bank)
+    if roi is not None:
+        start = time.perf_counter()
+        text = _ocr_image(roi, config)
+        timings['ocr_roi_ms'] = (time.perf_counter() - start) * 1000
+        if not full_page_fallback or has_candidate(text, bank):
+            return text, timings, True
+
+    start = time.perf_counter()
+    text = _ocr_image(page, config)
+    timings['ocr_full_ms'] = (time.perf_counter() - start) * 1000
+    return text, timings, False
+
+
+# ==========================================
+# ASYNC API
+# ==========================================
+
+class OCRQueueFull(Exception):
+    """Raised when more OCR jobs are waiting than MAX_QUEUED_JOBS."""
+
+
+class OCREngine:
+    _instance: Optional['OCREngine'] = None
+    _lock = asyncio.Lock()
+
+    def __init__(self, workers: int = OCR_WORKERS, max_queued: int = MAX_QUEUED_JOBS):
+        if self.__class__._instance is not None:
+            raise RuntimeError("This class is a singleton. Use get_instance() instead.")
+        self.workers = workers
+        self.max_queued = max_queued
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.semaphore = asyncio.Semaphore(workers)
+        self.pending = 0
+        self.stage_totals: Dict[str, float] = {}
+        self.stage_counts: Dict[str, int] = {}
+        self.roi_hits = 0
+        self.full_page_fallbacks = 0
+
+    @classmethod
+    async def get_instance(cls) -> 'OCREngine':
+        if cls._instance is None:
+            async with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            logger.info(f"Started OCR pool with {self.workers} workers")
+        return self.executor
+
+    async def run(self, func, *args, timeout: float = OCR_TIMEOUT_SECONDS):
+        """Run a picklable function in the OCR pool."""
+        if self.pending >= self.max_queued:
+            raise OCRQueueFull(f"{self.pending} OCR jobs already pending")
+
+        self.pending += 1
+        try:
+            async with self.semaphore:
+                loop = asyncio.get_running_loop()
+                executor = self._get_executor()
+                try:
+                    future = loop.run_in_executor(executor, func, *args)
+                    return await asyncio.wait_for(future, timeout=timeout)
+                except asyncio.TimeoutError:
+                    # The worker is still running the job; free it for real
+                    self._recycle(executor, f"OCR job exceeded {timeout}s, restarting the worker pool")
+                    raise
+                except BrokenProcessPool:
+                    # A worker died (e.g. killed by the OS); start a fresh pool next time
+                    self._recycle(executor, "OCR worker pool broke, restarting it")
+                    raise
+        finally:
+            self.pending -= 1
+
+    def _recycle(self, executor: ProcessPoolExecutor, reason: str) -> None:
+        """Shut down `executor` and kill its workers, unless it was already replaced."""
+        if executor is not self.executor:
+            return
+        logger.error(reason)
+        processes = list((getattr(executor, '_processes', None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+        self.executor = None
+
+    async def image_to_string(self, image, config: str = '', timeout: float = OCR_TIMEOUT_SECONDS) -> Optional[str]:
+        """OCR a PIL image. Returns None on timeout, overload or worker failure."""
+        try:
+            return await self.run(_ocr_image, image, config, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"OCR timed out after {timeout}s")
+        except OCRQueueFull as e:
+            logger.warning(f"OCR request rejected: {e}")
+        except Exception as e:
+            logger.error(f"OCR failed: {e}")
+        return None
+
+    async def read_receipt(self, data, bank: str, config: str = '', timeout: float = OCR_TIMEOUT_SECONDS,
+                           full_page_fallback: bool = True) -> Optional[str]:
+        """Preprocess and OCR a receipt (raw bytes or PIL image). Returns None on failure."""
+        try:
+            text, timings, used_roi = await self.run(_ocr_receipt, data, bank, config, full_page_fallback,
+                                                     timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Receipt OCR timed out after {timeout}s")
+            return None
+        except OCRQueueFull as e:
+            logger.warning(f"Receipt OCR rejected: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Receipt OCR failed: {e}")
+            return None
+
+        self._record_timings(timings, used_roi)
+        logger.debug(f"{bank} receipt OCR ({'region' if used_roi else 'full page'}): {timings}")
+        return text
+
+    def _record_timings(self, timings: Dict[str, float], used_roi: bool) -> None:
+        for stage, elapsed in timings.items():
+            self.stage_totals[stage] = self.stage_totals.get(stage, 0.0) + elapsed
+            self.stage_counts[stage] = self.stage_counts.get(stage, 0) + 1
+        if used_roi:
+            self.roi_hits += 1
+        else:
+            self.full_page_fallbacks += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Average milliseconds per stage plus region/full-page counts."""
+        stats = {
+            stage: self.stage_totals[stage] / self.stage_counts[stage]
+            for stage in self.stage_totals
+        }
+        stats['roi_hits'] = self.roi_hits
+        stats['full_page_fallbacks'] = self.full_page_fallbacks
+        stats['pending'] = self.pending
+        return stats
+
+    async def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,124 @@
+# bpa/receipt_fetcher.py
+"""
+Receipt image downloader.
+
+Uses the shared aiohttp session instead of a session per attempt, streams the
+body with a hard size cap, rejects responses that are not images, and never
+decodes on the event loop: callers hand the raw bytes to OCREngine, which
+decodes them in its worker processes. Concurrent downloads are bounded by a
+semaphore and per-stage latencies are recorded.
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+import aiohttp
+
+from src.data.cache.share_data import SharedSession
+import logging
+from src.utils.logging_config import setup_logging
+
+setup_logging(log_filename='binance_main.log')
+logger = logging.getLogger(__name__)
+
+MAX_RECEIPT_BYTES = 10 * 1024 * 1024
+MAX_CONCURRENT_DOWNLOADS = 8
+DOWNLOAD_TIMEOUT_SECONDS = 20
+CHUNK_SIZE = 64 * 1024
+
+# Some CDNs serve uploads as a generic binary type; the magic bytes decide then
+ALLOWED_CONTENT_TYPES = ('image/', 'application/octet-stream', 'binary/octet-stream')
+IMAGE_SIGNATURES = (
+    b'\xff\xd8\xff',         # JPEG
+    b'\x89PNG\r\n\x1a\n',    # PNG
+    b'GIF87a', b'GIF89a',
+    b'RIFF',                 # WEBP (RIFF....WEBP)
+    b'BM',                   # BMP
+)
+
+
+class ReceiptTooLarge(Exception):
+    """Raised when a receipt exceeds MAX_RECEIPT_BYTES."""
+
+
+class NotAnImage(Exception):
+    """Raised when the response is not an image."""
+
+
+def looks_like_image(data: bytes) -> bool:
+    return data.startswith(IMAGE_SIGNATURES)
+
+
+class ReceiptFetcher:
+    _semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+    max_bytes = MAX_RECEIPT_BYTES
+    _stage_totals: Dict[str, float] = {}
+    _stage_counts: Dict[str, int] = {}
+    _failures = 0
+
+    @classmethod
+    async def _download(cls, session: aiohttp.ClientSession, url: str) -> bytes:
+        timeout = aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT_SECONDS)
+        async with session.get(url, timeout=timeout) as response:
+            response.raise_for_status()
+
+            content_type = response.headers.get('Content-Type', '').lower()
+            if content_type and not content_type.startswith(ALLOWED_CONTENT_TYPES):
+                raise NotAnImage(f"unexpected content type {content_type}")
+            if response.content_length is not None and response.content_length > cls.max_bytes:
+                raise ReceiptTooLarge(f"{response.content_length} bytes announced")
+
+            body = bytearray()
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                body.extend(chunk)
+                if len(body) > cls.max_bytes:
+                    raise ReceiptTooLarge(f"more than {cls.max_bytes} bytes received")
+
+        if not looks_like_image(bytes(body[:16])):
+            raise NotAnImage("unrecognised image signature")
+        return bytes(body)
+
+    @classmethod
+    async def fetch(cls, url: str, retries: int = 3, initial_delay: float = 1) -> Optional[bytes]:
+        """Download a receipt image as raw bytes. Returns None on failure."""
+        start = time.perf_counter()
+        async with cls._semaphore:
+            cls._record('queue_wait_ms', start)
+            session = await SharedSession.get_session()
+            delay = initial_delay
+            for attempt in range(retries):
+                download_start = time.perf_counter()
+                try:
+                    data = await cls._download(session, url)
+                    cls._record('download_ms', download_start)
+                    logger.debug(f"Downloaded receipt ({len(data)} bytes) in "
+                                 f"{(time.perf_counter() - download_start) * 1000:.0f}ms")
+                    return data
+                except (ReceiptTooLarge, NotAnImage) as e:
+                    logger.error(f"Rejected receipt {url}: {e}")
+                    break
+                except aiohttp.ClientResponseError as e:
+                    logger.error(f"Attempt {attempt + 1} - Failed to download image: {e}")
+                    if e.status in (403, 404):
+                        break
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.error(f"Attempt {attempt + 1} - Failed to download image: {e!r}")
+                if attempt < retries - 1:
+                    await asyncio.sleep(delay)
+                    delay *= 2
+
+        cls._failures += 1
+        logger.error(f"Failed to download image after {retries} attempts: {url}")
+        return None
+
+    @classmethod
+    def _record(cls, stage: str, start: float) -> None:
+        cls._stage_totals[stage] = cls._stage_totals.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+        cls._stage_counts[stage] = cls._stage_counts.get(stage, 0) + 1
+
+    @classmethod
+    def stats(cls) -> Dict[str, float]:
+        """Average milliseconds per stage plus the failure count."""
+        stats = {stage: cls._stage_totals[stage] / cls._stage_counts[stage] for stage in cls._stage_totals}
+        stats['failures'] = cls._failures
+        return stats
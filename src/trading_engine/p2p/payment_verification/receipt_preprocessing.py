@@ -0,0 +1,135 @@
+# bpa/receipt_preprocessing.py
+"""
+Image preprocessing for receipt OCR. Runs inside the OCR worker processes.
+
+Pipeline: decode at reduced size (JPEG draft mode), grayscale, downscale to
+OCR_MAX_WIDTH, crop the per-bank region where "Clave de rastreo" is printed,
+and binarize with an Otsu threshold. If the cropped region does not contain a
+candidate tracking key, the caller falls back to the full page.
+"""
+import re
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, Optional, Pattern, Tuple, Union
+
+from PIL import Image
+
+OCR_MAX_WIDTH = 1100
+
+
+@dataclass(frozen=True)
+class ReceiptTemplate:
+    # Region of interest as fractions of width/height: (left, top, right, bottom)
+    roi: Tuple[float, float, float, float]
+    # Cheap check that the OCR text of the region holds a tracking key
+    candidate: Pattern
+
+
+RECEIPT_TEMPLATES: Dict[str, ReceiptTemplate] = {
+    'BBVA': ReceiptTemplate((0.0, 0.35, 1.0, 0.85), re.compile(r'(MBAN|BNET)', re.IGNORECASE)),
+    'NU': ReceiptTemplate((0.0, 0.40, 1.0, 0.95), re.compile(r'NU[A-Z0-9]{20,}')),
+    'BANORTE': ReceiptTemplate((0.0, 0.30, 1.0, 0.90), re.compile(r'CP0', re.IGNORECASE)),
+}
+
+
+def decode(data: Union[bytes, Image.Image]) -> Image.Image:
+    """Decode to grayscale, letting JPEG decode directly at a reduced scale."""
+    if isinstance(data, Image.Image):
+        image = data
+    else:
+        image = Image.open(BytesIO(data))
+        if image.format == 'JPEG':
+            image.draft('L', (OCR_MAX_WIDTH, int(OCR_MAX_WIDTH * image.height / image.width)))
+    if image.mode != 'L':
+        image = image.convert('L')
+    return image
+
+
+def downscale(image: Image.Image) -> Image.Image:
+    if image.width <= OCR_MAX_WIDTH:
+        return image
+    height = int(image.height * OCR_MAX_WIDTH / image.width)
+    return image.resize((OCR_MAX_WIDTH, height), Image.Resampling.LANCZOS)
+
+
+def crop_roi(image: Image.Image, template: ReceiptTemplate) -> Image.Image:
+    left, top, right, bottom = template.roi
+    return image.crop((
+        int(left * image.width), int(top * image.height),
+        int(right * image.width), int(bottom * image.height),
+    ))
+
+
+def otsu_threshold(image: Image.Image) -> int:
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background = weight_background = 0
+    best_threshold, best_variance = 127, 0.0
+    for threshold, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += threshold * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = threshold, variance
+    return best_threshold
+
+
+def binarize(image: Image.Image) -> Image.Image:
+    threshold = otsu_threshold(image)
+    # A lookup table avoids calling a Python function per pixel value
+    return image.point([0] * (threshold + 1) + [255] * (255 - threshold))
+
+
+def prepare(data: Union[bytes, Image.Image], bank: str) -> Tuple[Image.Image, Optional[Image.Image], Dict[str, float]]:
+    """
+    Return (full page, region of interest or None, stage timings in ms).
+    Both images are grayscale, downscaled and binarized.
+    """
+    timings = {}
+    start = time.perf_counter()
+    image = decode(data)
+    timings['decode_ms'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    page = binarize(downscale(image))
+    template = RECEIPT_TEMPLATES.get(bank)
+    roi = crop_roi(page, template) if template else None
+    timings['preprocess_ms'] = (time.perf_counter() - start) * 1000
+    return page, roi, timings
+
+
+def has_candidate(text: str, bank: str) -> bool:
+    template = RECEIPT_TEMPLATES.get(bank)
+    return bool(template and template.candidate.search(text.replace(' ', '')))
+
+
+PHASH_SIZE = 16
+
+
+def perceptual_hash(data: Union[bytes, Image.Image], bank: str) -> int:
+    """
+    256-bit difference hash of the bank's region of interest (or the full page).
+
+    Hashing the region around the clave rather than the whole screenshot keeps
+    two different receipts from the same bank, which share a layout, apart.
+    """
+    image = downscale(decode(data))
+    template = RECEIPT_TEMPLATES.get(bank)
+    if template:
+        image = crop_roi(image, template)
+    pixels = image.resize((PHASH_SIZE + 1, PHASH_SIZE), Image.Resampling.BILINEAR).tobytes()
+    value = 0
+    for row in range(PHASH_SIZE):
+        offset = row * (PHASH_SIZE + 1)
+        for col in range(PHASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
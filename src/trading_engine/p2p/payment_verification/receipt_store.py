@@ -0,0 +1,276 @@
+# bpa/receipt_store.py
+"""
+Content-addressed store for payment receipt images.
+
+Every receipt is keyed by the SHA-256 of its bytes. Each entry remembers the
+extracted clave and the CEP validation result, and the image URLs it was
+downloaded from, so a repeated message skips download and OCR entirely and
+identical bytes from a new URL skip OCR.
+
+Receipts also carry a perceptual hash so a re-encoded or re-uploaded copy of
+a screenshot can be recognised. Two receipts from the same bank share a
+layout and can hash almost identically, so a perceptual match is only a
+candidate: it is accepted once the OCR'd clave agrees.
+
+Every order/buyer that presents a receipt is recorded. A receipt seen on a
+different order or from a different buyer is reported as reused.
+
+Image files live on local disk. When the directory grows past
+MAX_STORE_BYTES the least recently used files are deleted; their metadata
+rows stay so duplicates are still detected.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from src.data.database.connection import create_connection, DB_FILE
+import logging
+from src.utils.logging_config import setup_logging
+
+setup_logging(log_filename='binance_main.log')
+logger = logging.getLogger(__name__)
+
+RECEIPT_DIR = os.path.join(os.path.dirname(DB_FILE), 'receipts')
+MAX_STORE_BYTES = 500 * 1024 * 1024
+MAX_RECEIPT_ROWS = 50000
+PHASH_MAX_DISTANCE = 12  # Out of 256 bits
+
+CREATE_RECEIPT_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS receipts (
+        sha256 TEXT PRIMARY KEY,
+        phash TEXT NOT NULL,
+        bank TEXT,
+        clave TEXT,
+        validated INTEGER,
+        file_path TEXT,
+        size INTEGER NOT NULL DEFAULT 0,
+        orderNumber TEXT,
+        buyerName TEXT,
+        first_seen REAL NOT NULL,
+        last_used REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS receipt_urls (
+        url TEXT PRIMARY KEY,
+        sha256 TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS receipt_uses (
+        sha256 TEXT NOT NULL,
+        orderNumber TEXT NOT NULL,
+        buyerName TEXT,
+        seen_at REAL NOT NULL,
+        UNIQUE (sha256, orderNumber)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_receipts_last_used ON receipts (last_used)",
+]
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+@dataclass
+class ReceiptRecord:
+    sha256: str
+    phash: int
+    bank: Optional[str]
+    clave: Optional[str]
+    validated: Optional[bool]
+    orderNumber: Optional[str]
+    buyerName: Optional[str]
+
+
+class ReceiptStore:
+    _instance: Optional['ReceiptStore'] = None
+    _lock = asyncio.Lock()
+
+    def __init__(self, receipt_dir: str = RECEIPT_DIR, max_bytes: int = MAX_STORE_BYTES):
+        if self.__class__._instance is not None:
+            raise RuntimeError("This class is a singleton. Use get_instance() instead.")
+        self.receipt_dir = receipt_dir
+        self.max_bytes = max_bytes
+        self.conn = None
+        self.phashes: Dict[str, int] = {}
+        self.stored_bytes = 0
+        self.init_lock = asyncio.Lock()
+
+    @classmethod
+    async def get_instance(cls) -> 'ReceiptStore':
+        if cls._instance is None:
+            async with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    async def initialize(self, conn=None) -> None:
+        async with self.init_lock:
+            if self.conn is not None:
+                return
+            self.conn = conn or await create_connection(DB_FILE)
+            for sql in CREATE_RECEIPT_TABLES_SQL:
+                await self.conn.execute(sql)
+            await self.conn.commit()
+            os.makedirs(self.receipt_dir, exist_ok=True)
+
+            async with self.conn.execute("SELECT sha256, phash FROM receipts") as cursor:
+                self.phashes = {sha: int(phash, 16) for sha, phash in await cursor.fetchall()}
+            async with self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM receipts WHERE file_path IS NOT NULL") as cursor:
+                self.stored_bytes = (await cursor.fetchone())[0]
+            logger.info(f"Receipt store loaded {len(self.phashes)} receipts ({self.stored_bytes} bytes on disk)")
+
+    async def _get(self, sha256: str) -> Optional[ReceiptRecord]:
+        async with self.conn.execute(
+            "SELECT sha256, phash, bank, clave, validated, orderNumber, buyerName FROM receipts WHERE sha256 = ?",
+            (sha256,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        sha, phash, bank, clave, validated, orderNumber, buyerName = row
+        return ReceiptRecord(sha, int(phash, 16), bank, clave,
+                             None if validated is None else bool(validated), orderNumber, buyerName)
+
+    async def lookup_url(self, url: str) -> Optional[ReceiptRecord]:
+        """Receipt previously downloaded from this exact URL, if any."""
+        await self.initialize()
+        async with self.conn.execute("SELECT sha256 FROM receipt_urls WHERE url = ?", (url,)) as cursor:
+            row = await cursor.fetchone()
+        return await self._get(row[0]) if row else None
+
+    async def lookup_bytes(self, sha256: str) -> Optional[ReceiptRecord]:
+        await self.initialize()
+        return await self._get(sha256) if sha256 in self.phashes else None
+
+    async def lookup_similar(self, phash: int, clave: Optional[str]) -> Optional[ReceiptRecord]:
+        """Stored receipt within PHASH_MAX_DISTANCE that also carries the same clave."""
+        await self.initialize()
+        if not clave:
+            return None
+        candidates = sorted(
+            (distance, sha) for sha, stored in self.phashes.items()
+            if (distance := hamming_distance(phash, stored)) <= PHASH_MAX_DISTANCE
+        )
+        for _, sha in candidates:
+            record = await self._get(sha)
+            if record and record.clave == clave:
+                return record
+        return None
+
+    async def add(self, data: bytes, sha256: str, phash: int, bank: str, clave: Optional[str],
+                  orderNumber: str, buyerName: str, extension: str = 'img') -> ReceiptRecord:
+        await self.initialize()
+        file_path = os.path.join(self.receipt_dir, f"{sha256}.{extension}")
+        try:
+            await asyncio.to_thread(self._write_file, file_path, data)
+        except OSError as e:
+            logger.error(f"Could not store receipt image {sha256}: {e}")
+            file_path = None
+
+        now = time.time()
+        await self.conn.execute(
+            """
+            INSERT OR IGNORE INTO receipts
+            (sha256, phash, bank, clave, validated, file_path, size, orderNumber, buyerName, first_seen, last_used)
+            VALUES (?, ?, ?, ?, NULL, ?, ?, ?, ?, ?, ?)
+            """,
+            (sha256, format(phash, 'x'), bank, clave, file_path, len(data) if file_path else 0,
+             orderNumber, buyerName, now, now)
+        )
+        await self.conn.commit()
+        self.phashes[sha256] = phash
+        if file_path:
+            self.stored_bytes += len(data)
+        await self._evict()
+        return ReceiptRecord(sha256, phash, bank, clave, None, orderNumber, buyerName)
+
+    @staticmethod
+    def _write_file(file_path: str, data: bytes) -> None:
+        with open(file_path, 'wb') as f:
+            f.write(data)
+
+    async def remember_url(self, url: str, sha256: str) -> None:
+        await self.conn.execute("INSERT OR REPLACE INTO receipt_urls (url, sha256) VALUES (?, ?)", (url, sha256))
+        await self.conn.commit()
+
+    async def record_use(self, record: ReceiptRecord, orderNumber: str, buyerName: str) -> bool:
+        """
+        Record that an order presented this receipt.
+        Returns True if the receipt was already used by another order or buyer.
+        """
+        now = time.time()
+        await self.conn.execute(
+            "INSERT OR IGNORE INTO receipt_uses (sha256, orderNumber, buyerName, seen_at) VALUES (?, ?, ?, ?)",
+            (record.sha256, orderNumber, buyerName, now)
+        )
+        await self.conn.execute("UPDATE receipts SET last_used = ? WHERE sha256 = ?", (now, record.sha256))
+        await self.conn.commit()
+
+        async with self.conn.execute(
+            "SELECT orderNumber, buyerName FROM receipt_uses WHERE sha256 = ? AND (orderNumber != ? OR buyerName != ?)",
+            (record.sha256, orderNumber, buyerName)
+        ) as cursor:
+            others = await cursor.fetchall()
+        if others:
+            logger.warning(
+                f"Receipt {record.sha256[:12]} from order {orderNumber} ({buyerName}) "
+                f"was already used by: {others}"
+            )
+        return bool(others)
+
+    async def set_validated(self, sha256: str, validated: bool) -> None:
+        await self.conn.execute("UPDATE receipts SET validated = ? WHERE sha256 = ?", (int(validated), sha256))
+        await self.conn.commit()
+
+    async def _evict(self) -> None:
+        """Delete the least recently used image files until under max_bytes, and trim old rows."""
+        if self.stored_bytes > self.max_bytes:
+            async with self.conn.execute(
+                "SELECT sha256, file_path, size FROM receipts WHERE file_path IS NOT NULL ORDER BY last_used"
+            ) as cursor:
+                rows = await cursor.fetchall()
+            evicted = []
+            for sha, file_path, size in rows:
+                if self.stored_bytes <= self.max_bytes:
+                    break
+                try:
+                    await asyncio.to_thread(os.remove, file_path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.error(f"Could not delete receipt file {file_path}: {e}")
+                    continue
+                self.stored_bytes -= size
+                evicted.append((sha,))
+            await self.conn.executemany("UPDATE receipts SET file_path = NULL, size = 0 WHERE sha256 = ?", evicted)
+            await self.conn.commit()
+            logger.info(f"Evicted {len(evicted)} receipt images from disk")
+
+        if len(self.phashes) > MAX_RECEIPT_ROWS:
+            async with self.conn.execute(
+                "SELECT sha256 FROM receipts WHERE file_path IS NULL ORDER BY last_used LIMIT ?",
+                (len(self.phashes) - MAX_RECEIPT_ROWS,)
+            ) as cursor:
+                stale = [row[0] for row in await cursor.fetchall()]
+            for sha in stale:
+                await self.conn.execute("DELETE FROM receipts WHERE sha256 = ?", (sha,))
+                await self.conn.execute("DELETE FROM receipt_urls WHERE sha256 = ?", (sha,))
+                await self.conn.execute("DELETE FROM receipt_uses WHERE sha256 = ?", (sha,))
+                self.phashes.pop(sha, None)
+            await self.conn.commit()
+
+    async def close(self) -> None:
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
@@ -1,22 +1,29 @@
 # bpa/binance_SPEI_validation.py
 """
 Transfer validation module that handles:
-1. Queue-based transfer validation with retry logic
+1. Queue-based transfer validation with retry logic (persistent timer heap)
 2. Bank receipt OCR processing for extracting tracking codes
 3. CEP transfer validation via API calls
 """
 
 import asyncio
+import heapq
+import itertools
 import pytesseract
 import re
+import time
 import traceback
 from datetime import datetime, date, timedelta
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import List, Optional, Set, Tuple
 from abc import ABC, abstractmethod
 
-from cep import Transferencia
-from src.utils.common_utils import download_image
+from src.data.database.connection import create_connection, DB_FILE
+from src.trading_engine.p2p.payment_verification.cep_cache import CEPValidationCache
+from src.trading_engine.p2p.payment_verification.ocr_engine import OCREngine
+from src.trading_engine.p2p.payment_verification.receipt_fetcher import ReceiptFetcher
+from src.trading_engine.p2p.payment_verification.receipt_preprocessing import perceptual_hash
+from src.trading_engine.p2p.payment_verification.receipt_store import ReceiptStore, sha256_hex
 from src.customer_service.kyc.language_selection import LanguageSelector
 from src.utils.common_vars import BANK_SPEI_CODES
 import logging
@@ -30,22 +37,13 @@ logger = logging.getLogger(__name__)
 # ==========================================
 
 async def validate_transfer(fecha, clave_rastreo, emisor, receptor, cuenta, monto):
-    """Validate transfer using CEP API"""
-    if isinstance(fecha, str):
-        fecha = datetime.strptime(fecha, '%Y-%m-%d').date()
-    
+    """Validate transfer using CEP API (cached, see cep_cache)"""
     try:
-        # Validate the transfer
-        tr = await asyncio.to_thread(Transferencia.validar,
-            fecha=fecha,
-            clave_rastreo=clave_rastreo,
-            emisor=emisor,
-            receptor=receptor,
-            cuenta=cuenta,
-            monto=monto,
-        )
+        cep_cache = await CEPValidationCache.get_instance()
+        validated = await cep_cache.validate(fecha, clave_rastreo, emisor, receptor, cuenta, monto,
+                                             negative_ttl=CEP_NEGATIVE_TTL_SECONDS)
         
-        if tr is not None:
+        if validated:
             # Log successful validation without downloading the PDF
             logger.info(f"Transfer validated successfully for clave: {clave_rastreo}")
             return True
@@ -79,12 +77,22 @@ async def retry_request(func, retries=3, delay=1, backoff=2):
 # BANK RECEIPT HANDLERS
 # ==========================================
 
+GENERIC_TESSERACT_CONFIG = r'--oem 3 --psm 6'
+
 class BankReceiptHandler(ABC):
     """Abstract base class for bank receipt handlers"""
-    
-    @abstractmethod
+    tesseract_config = GENERIC_TESSERACT_CONFIG
+    # How distinctive a format match is when several banks are tried on one text
+    format_strength = 2
+
     def extract_clave_de_rastreo(self, image):
-        """Extract tracking number from image"""
+        """Extract tracking number from image (blocking, runs Tesseract in-process)"""
+        text = pytesseract.image_to_string(image, config=self.tesseract_config)
+        return self.parse_clave_de_rastreo(text)
+
+    @abstractmethod
+    def parse_clave_de_rastreo(self, raw_text):
+        """Extract tracking number from OCR text"""
         pass
     
     @abstractmethod
@@ -92,48 +100,39 @@ class BankReceiptHandler(ABC):
         """Validate the format of tracking number"""
         pass
 
-class BBVAReceiptHandler(BankReceiptHandler):
-    def extract_clave_de_rastreo(self, image):        
-        custom_config = r'--oem 3 --psm 6'
-        logger.info(f"Using Tesseract config: {custom_config}")
+BBVA_CLAVE_PATTERN = re.compile(r'(?:MBAN|BNET)[A-Z0-9]{20}')
+BBVA_CLAVE_FORMAT = re.compile(r'^(MBAN|BNET)[A-Za-z0-9]{20}$')
+NU_CLAVE_PATTERN = re.compile(r'NU[A-Z0-9]{26}')
+NU_CLAVE_FORMAT = re.compile(r'^NU[A-Z0-9]{26}$')
+BANORTE_CLAVE_PATTERN = re.compile(r'[A-Za-z0-9]*CP0[A-Za-z0-9]{2,26}')
+BANORTE_CLAVE_FORMAT = re.compile(r'^.*CP0[A-Z0-9]{2,26}$')
 
-        raw_text = pytesseract.image_to_string(image, config=custom_config)
-        logger.info(f"raw OCR text:\n{raw_text}")
-        
-        # Log each line separately for better analysis
-        logger.info("OCR text by lines:")
-        for i, line in enumerate(raw_text.split('\n')):
-            logger.info(f"Line {i+1}: {repr(line)}")
+class BBVAReceiptHandler(BankReceiptHandler):
+    def parse_clave_de_rastreo(self, raw_text):
+        logger.debug(f"raw OCR text:\n{raw_text}")
         
-        # Look for text containing "Clave" and log the search process
+        # Look for the line after "Clave de rastreo"
         lines = raw_text.split('\n')
-        clave_text = None
         for i, line in enumerate(lines):
             if 'lave' in line.lower() and 'rastreo' in line.lower():
-                logger.info(f"Found potential clave line at index {i}: {repr(line)}")
+                logger.debug(f"Found potential clave line at index {i}: {repr(line)}")
                 if i + 1 < len(lines):
                     next_line = lines[i+1].strip()
-                    logger.info(f"Next line: {repr(next_line)}")
                     if next_line.startswith('MBAN') or next_line.startswith('BNET'):
                         cleaned = next_line.upper().replace('O', '0').replace('I', '1')
                         if self.validate_clave_format(cleaned):
                             logger.info(f"Valid clave found: {cleaned}")
                             return cleaned
-                    clave_text = line + next_line
                 break
         
         # If not found directly after "Clave de rastreo", try cleaning full text
-        logger.info("Attempting fallback search in full text...")
         cleaned_text = raw_text.upper()
         cleaned_text = cleaned_text.replace('O', '0').replace('I', '1')
         cleaned_text = cleaned_text.replace(' ', '')
         
         # Look for both MBAN and BNET patterns
-        mban_matches = re.findall(r'MBAN[A-Z0-9]{20}', cleaned_text)
-        bnet_matches = re.findall(r'BNET[A-Z0-9]{20}', cleaned_text)
-        matches = mban_matches + bnet_matches
-        
-        logger.info(f"Fallback matches - MBAN: {mban_matches}, BNET: {bnet_matches}")
+        matches = BBVA_CLAVE_PATTERN.findall(cleaned_text)
+        logger.debug(f"Fallback matches: {matches}")
         
         if matches:
             clave = matches[0]
@@ -152,13 +151,13 @@ class BBVAReceiptHandler(BankReceiptHandler):
         if not clave or len(clave) != 24:
             return False
         # Allow both MBAN and BNET formats
-        return bool(re.match(r'^(MBAN|BNET)[A-Za-z0-9]{20}$', clave))
+        return bool(BBVA_CLAVE_FORMAT.match(clave))
 
 class NUReceiptHandler(BankReceiptHandler):
-    def extract_clave_de_rastreo(self, image):
-        custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=NUJABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-        text = pytesseract.image_to_string(image, config=custom_config)
-        matches = re.findall(r'NU[A-Z0-9]{26}', text)
+    tesseract_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=NUJABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
+    def parse_clave_de_rastreo(self, text):
+        matches = NU_CLAVE_PATTERN.findall(text)
         
         if matches:
             clave = matches[0]
@@ -169,13 +168,14 @@ class NUReceiptHandler(BankReceiptHandler):
     def validate_clave_format(self, clave):
         if not clave or len(clave) != 28:
             return False
-        return bool(re.match(r'^NU[A-Z0-9]{26}$', clave))
+        return bool(NU_CLAVE_FORMAT.match(clave))
 
 class BanorteReceiptHandler(BankReceiptHandler):
-    def extract_clave_de_rastreo(self, image):
-        custom_config = r'--oem 3 --psm 6'
-        text = pytesseract.image_to_string(image, config=custom_config)
-        matches = re.findall(r'[A-Za-z0-9]*CP0[A-Za-z0-9]{2,26}', text)
+    # Any alphanumeric run around "CP0" matches, so it is the weakest signal
+    format_strength = 1
+
+    def parse_clave_de_rastreo(self, text):
+        matches = BANORTE_CLAVE_PATTERN.findall(text)
         
         if matches:
             clave = matches[0]
@@ -186,50 +186,188 @@ class BanorteReceiptHandler(BankReceiptHandler):
     def validate_clave_format(self, clave):
         if not clave:
             return False
-        return bool(re.match(r'^.*CP0[A-Z0-9]{2,26}$', clave))
+        return bool(BANORTE_CLAVE_FORMAT.match(clave))
+
+BANK_HANDLERS = {
+    "BBVA": BBVAReceiptHandler,
+    "NU": NUReceiptHandler,
+    "BANORTE": BanorteReceiptHandler
+}
 
 def get_bank_handler(bank):
     """Factory function to get the appropriate bank handler"""
-    handlers = {
-        "BBVA": BBVAReceiptHandler,
-        "NU": NUReceiptHandler,
-        "BANORTE": BanorteReceiptHandler
-    }
-    handler_class = handlers.get(bank)
+    handler_class = BANK_HANDLERS.get(bank)
     if handler_class:
         return handler_class()
     raise ValueError(f"No handler available for bank: {bank}")
 
-async def extract_clave_de_rastreo(image_url, bank):
-    """Extract tracking code from bank receipt image"""
-    img = await download_image(image_url)
-    if not img:
-        logger.error("Failed to download image")
-        return None
+def _score_clave(bank, clave, text):
+    """Confidence that clave is this bank's tracking key, 0 if it is not one at all."""
+    handler = get_bank_handler(bank)
+    if not handler.validate_clave_format(clave):
+        return 0
+    score = handler.format_strength
+    lines = [line.replace(' ', '').upper() for line in text.split('\n')]
+    for i, line in enumerate(lines):
+        if 'LAVE' in line and 'RASTREO' in line:
+            # Printed next to (or right under) the "Clave de rastreo" label
+            nearby = ''.join(lines[i:i + 2]).replace('O', '0').replace('I', '1')
+            if clave.replace('O', '0').replace('I', '1') in nearby:
+                score += 1
+            break
+    return score
 
+def detect_clave(text, preferred_bank=None):
+    """
+    Match every bank's pattern against one OCR text and keep the best match.
+    Returns (bank, clave) or None. Ties go to preferred_bank.
+    """
+    best = None
+    for bank in BANK_HANDLERS:
+        try:
+            clave = get_bank_handler(bank).parse_clave_de_rastreo(text)
+        except Exception as e:
+            logger.debug(f"{bank} parser failed on shared OCR text: {e}")
+            continue
+        if not clave:
+            continue
+        score = _score_clave(bank, clave, text)
+        if score == 0:
+            continue
+        rank = (score, bank == preferred_bank)
+        if best is None or rank > best[0]:
+            best = (rank, bank, clave)
+    return (best[1], best[2]) if best else None
+
+@dataclass
+class ReceiptResult:
+    clave: Optional[str]
+    sha256: Optional[str]
+    # True when another order or buyer already presented this receipt
+    reused: bool = False
+    # Cached CEP outcome for this receipt, None if it was never validated
+    validated: Optional[bool] = None
+    # Bank whose format the clave matched, which may differ from the stated one
+    bank: Optional[str] = None
+
+
+async def _ocr_clave(img: bytes, bank: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Returns (bank, clave). The stated bank's handler is tried first, on its
+    region of interest only. If that bank has no handler or the region yields
+    no clave, a single generic full-page OCR pass is matched against every
+    bank's patterns at once, so a page is OCR'd at most once per receipt.
+    """
     try:
-        handler = get_bank_handler(bank)
-        logger.info(f"Processing image for bank: {bank}")
-        
-        clave = handler.extract_clave_de_rastreo(img)
-        if clave:
-            logger.info(f"Extracted clave using {bank} handler: {clave}")
-            return clave
-            
-        logger.info(f"No clave found for {bank}")
-        return None
-        
-    except ValueError as e:
-        logger.warning(f"Bank handler error: {e}")
+        ocr_engine = await OCREngine.get_instance()
+        if bank in BANK_HANDLERS:
+            handler = get_bank_handler(bank)
+            logger.info(f"Processing image for bank: {bank}")
+            text = await ocr_engine.read_receipt(img, bank, handler.tesseract_config, full_page_fallback=False)
+            if text is None:
+                logger.error(f"OCR failed for {bank} receipt")
+                return None, None
+
+            clave = handler.parse_clave_de_rastreo(text)
+            if clave:
+                logger.info(f"Extracted clave using {bank} handler: {clave}")
+                return bank, clave
+
+            detected = detect_clave(text, bank)
+            if detected:
+                logger.info(f"Receipt labelled {bank} matched {detected[0]} pattern: {detected[1]}")
+                return detected
+            logger.info(f"No clave found in the {bank} region, trying all banks on a full-page pass")
+
+        text = await ocr_engine.read_receipt(img, None, GENERIC_TESSERACT_CONFIG)
+        if text is None:
+            logger.error("Generic receipt OCR failed")
+            return None, None
+        detected = detect_clave(text, bank)
+        if detected:
+            logger.info(f"Detected {detected[0]} receipt (stated bank: {bank}): {detected[1]}")
+            return detected
+
+        logger.info(f"No clave found for any bank (stated bank: {bank})")
     except Exception as e:
         logger.error(f"Error processing with bank handler: {e}", exc_info=True)
     
-    return None
+    return None, None
+
+async def read_receipt(image_url, bank, order_no, buyer_name) -> ReceiptResult:
+    """
+    Extract the tracking code from a bank receipt, reusing earlier results.
+
+    A URL seen before skips download and OCR; identical bytes skip OCR. A
+    re-encoded copy is matched by perceptual hash plus clave. Every use is
+    recorded against the order so a receipt shown on another order or by
+    another buyer is flagged.
+    """
+    store = await ReceiptStore.get_instance()
+    record = await store.lookup_url(image_url)
+    if record is None:
+        img = await ReceiptFetcher.fetch(image_url)
+        if not img:
+            logger.error("Failed to download image")
+            return ReceiptResult(None, None)
+
+        sha256 = sha256_hex(img)
+        record = await store.lookup_bytes(sha256)
+        if record is None:
+            try:
+                phash = await (await OCREngine.get_instance()).run(perceptual_hash, img, bank)
+            except Exception as e:
+                logger.error(f"Could not hash receipt image: {e}")
+                detected_bank, clave = await _ocr_clave(img, bank)
+                return ReceiptResult(clave, sha256, bank=detected_bank)
+
+            detected_bank, clave = await _ocr_clave(img, bank)
+            if not clave:
+                # Not stored, so a resend gets another OCR attempt
+                return ReceiptResult(None, sha256)
+            record = await store.lookup_similar(phash, clave)
+            if record is not None:
+                logger.info(f"Receipt {sha256[:12]} is a re-encoded copy of {record.sha256[:12]}")
+            else:
+                record = await store.add(img, sha256, phash, detected_bank, clave, order_no, buyer_name)
+        await store.remember_url(image_url, record.sha256)
+    else:
+        logger.info(f"Receipt URL already processed as {record.sha256[:12]}, skipping download and OCR")
+
+    reused = await store.record_use(record, order_no, buyer_name)
+    return ReceiptResult(record.clave, record.sha256, reused, record.validated, record.bank)
+
+async def extract_clave_de_rastreo(image_url, bank, order_no=None, buyer_name=None):
+    """Extract tracking code from bank receipt image"""
+    result = await read_receipt(image_url, bank, order_no or image_url, buyer_name)
+    return result.clave
 
 # ==========================================
 # QUEUE-BASED VALIDATION SYSTEM
 # ==========================================
 
+RETRY_BASE_SECONDS = 30
+# Negative CEP results must expire before the first retry (RETRY_BASE_SECONDS * 2)
+CEP_NEGATIVE_TTL_SECONDS = RETRY_BASE_SECONDS
+MAX_CONCURRENT_VALIDATIONS = 4
+# CEP (Banxico) throttles aggressive clients; keep well under it
+CEP_REQUESTS_PER_SECOND = 1.0
+CEP_BURST = 3
+
+CREATE_VALIDATION_TASKS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS transfer_validation_tasks (
+        order_no TEXT PRIMARY KEY,
+        clave_rastreo TEXT NOT NULL,
+        emisor TEXT NOT NULL,
+        receptor TEXT NOT NULL,
+        monto REAL NOT NULL,
+        fecha TEXT NOT NULL,
+        last_tried TEXT NOT NULL,
+        retry_count INTEGER NOT NULL,
+        account_number TEXT NOT NULL
+    )
+"""
+
 @dataclass
 class TransferValidationTask:
     clave_rastreo: str
@@ -242,36 +380,148 @@ class TransferValidationTask:
     order_no: str
     account_number: str
 
+    def due_at(self) -> datetime:
+        return self.last_tried + timedelta(seconds=RETRY_BASE_SECONDS * (2 ** self.retry_count))
+
+class CEPRateLimiter:
+    """Token bucket shared by all CEP validations."""
+
+    def __init__(self, rate: float = CEP_REQUESTS_PER_SECOND, burst: int = CEP_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
 class TransferValidationQueue:
-    def __init__(self):
-        self.queue: List[TransferValidationTask] = []
-    
+    """
+    Delay queue of validation retries: a min-heap keyed on the next attempt
+    time. Tasks are persisted in SQLite until they complete, so a restart
+    reloads everything that was pending or in flight.
+    """
+
+    def __init__(self, conn=None):
+        self.heap: List[Tuple[datetime, int, TransferValidationTask]] = []
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.conn = conn
+        self.initialized = False
+
+    async def initialize(self) -> None:
+        if self.initialized:
+            return
+        self.initialized = True
+        if self.conn is None:
+            self.conn = await create_connection(DB_FILE)
+        await self.conn.execute(CREATE_VALIDATION_TASKS_TABLE_SQL)
+        await self.conn.commit()
+        async with self.conn.execute(
+            """
+            SELECT clave_rastreo, emisor, receptor, monto, fecha, last_tried, retry_count, order_no, account_number
+            FROM transfer_validation_tasks
+            """
+        ) as cursor:
+            rows = await cursor.fetchall()
+        for clave, emisor, receptor, monto, fecha, last_tried, retry_count, order_no, account_number in rows:
+            self._push(TransferValidationTask(
+                clave, emisor, receptor, monto, datetime.fromisoformat(fecha),
+                datetime.fromisoformat(last_tried), retry_count, order_no, account_number
+            ))
+        if rows:
+            logger.info(f"Restored {len(rows)} pending transfer validations")
+
+    def _push(self, task: TransferValidationTask) -> None:
+        heapq.heappush(self.heap, (task.due_at(), next(self.counter), task))
+        self.wakeup.set()
+
     async def add_task(self, task: TransferValidationTask):
-        self.queue.append(task)
+        await self.initialize()
+        await self.conn.execute(
+            """
+            INSERT OR REPLACE INTO transfer_validation_tasks
+            (order_no, clave_rastreo, emisor, receptor, monto, fecha, last_tried, retry_count, account_number)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (task.order_no, task.clave_rastreo, task.emisor, task.receptor, task.monto,
+             task.fecha.isoformat(), task.last_tried.isoformat(), task.retry_count, task.account_number)
+        )
+        await self.conn.commit()
+        self._push(task)
+
+    async def complete_task(self, task: TransferValidationTask) -> None:
+        """Forget a task that succeeded or ran out of retries."""
+        await self.conn.execute("DELETE FROM transfer_validation_tasks WHERE order_no = ?", (task.order_no,))
+        await self.conn.commit()
     
     async def get_next_task(self) -> Optional[TransferValidationTask]:
-        now = datetime.now()
-        for i, task in enumerate(self.queue):
-            if now - task.last_tried >= timedelta(seconds=30 * (2 ** task.retry_count)):
-                return self.queue.pop(i)
+        """Pop the earliest task if it is due, without waiting."""
+        await self.initialize()
+        if self.heap and self.heap[0][0] <= datetime.now():
+            return heapq.heappop(self.heap)[2]
         return None
 
+    async def wait_next_task(self) -> TransferValidationTask:
+        """Sleep until the earliest task is due (or an earlier one is added) and pop it."""
+        await self.initialize()
+        while True:
+            self.wakeup.clear()
+            if self.heap:
+                delay = (self.heap[0][0] - datetime.now()).total_seconds()
+                if delay <= 0:
+                    return heapq.heappop(self.heap)[2]
+            else:
+                delay = None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
 class TransferValidator:
-    def __init__(self, queue: TransferValidationQueue, connection_manager):
+    def __init__(self, queue: TransferValidationQueue, connection_manager,
+                 max_concurrent: int = MAX_CONCURRENT_VALIDATIONS, rate_limiter: Optional[CEPRateLimiter] = None):
         self.queue = queue
         self.connection_manager = connection_manager
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.rate_limiter = rate_limiter or CEPRateLimiter()
+        self.running: Set[asyncio.Task] = set()
     
     async def process_queue(self):
-        """Process the validation queue continuously"""
+        """Run due validations as they come up, up to max_concurrent at a time"""
         while True:
-            task = await self.queue.get_next_task()
-            if task:
-                await self.process_task(task)
-            await asyncio.sleep(1)  # Avoid tight loop
+            await self.semaphore.acquire()
+            try:
+                task = await self.queue.wait_next_task()
+            except BaseException:
+                self.semaphore.release()
+                raise
+            worker = asyncio.create_task(self._run_task(task))
+            self.running.add(worker)
+            worker.add_done_callback(self.running.discard)
+
+    async def _run_task(self, task: TransferValidationTask):
+        try:
+            await self.process_task(task)
+        finally:
+            self.semaphore.release()
     
     async def process_task(self, task: TransferValidationTask):
         """Process a single validation task"""
         try:
+            await self.rate_limiter.acquire()
             validation_successful = await validate_transfer(
                 task.fecha, task.clave_rastreo, task.emisor, task.receptor,
                 task.account_number, task.monto
@@ -279,6 +529,7 @@ class TransferValidator:
            
             if validation_successful:
                 logger.info(f"Transfer validation successful for order {task.order_no}")
+                await self.queue.complete_task(task)
                 await self.connection_manager.send_text_message(
                     task.account_number,
                     "Transfer validated successfully.",
@@ -297,6 +548,7 @@ class TransferValidator:
                     )
                 else:
                     logger.error(f"Max retries reached for order {task.order_no}. Transfer validation ultimately failed.")
+                    await self.queue.complete_task(task)
                     await self.connection_manager.send_text_message(
                         task.account_number,
                         "Transfer validation failed after multiple attempts. Please check your transfer details and try again later.",
@@ -313,7 +565,7 @@ class TransferValidator:
     async def handle_bank_validation(
         self,
         order_data,
-        buyer_bank: str,
+        buyer_bank: Optional[str],
         seller_bank: str,
         image_URL: str,
         conn,
@@ -323,43 +575,76 @@ class TransferValidator:
         """Handle bank validation process for image messages."""
         try:
             # Validate SPEI codes
-            emisor_code = BANK_SPEI_CODES.get(buyer_bank.lower())
             receptor_code = BANK_SPEI_CODES.get(seller_bank.lower())
             
-            if not emisor_code or not receptor_code:
+            if not receptor_code:
                 logger.error(
                     f"SPEI codes not found - Order: {order_data.orderNumber}, "
                     f"Buyer Bank: {buyer_bank}, Seller Bank: {seller_bank}"
                 )
                 return False
 
-            # Extract and validate tracking key
-            clave_rastreo = await extract_clave_de_rastreo(
+            # Extract and validate tracking key. The buyer's stated bank is only
+            # a hint: a mislabelled or unsupported bank is detected from the receipt.
+            stated_bank = (buyer_bank or '').upper() or None
+            receipt = await read_receipt(
                 image_URL,
-                buyer_bank.upper()
+                stated_bank,
+                order_data.orderNumber,
+                buyer_name
             )
+            if receipt.reused:
+                logger.warning(
+                    f"Receipt reused across orders - Order: {order_data.orderNumber}, "
+                    f"Buyer: {buyer_name}, Receipt: {receipt.sha256}. Needs manual review."
+                )
+                return False
+
+            clave_rastreo = receipt.clave
             if not clave_rastreo:
                 logger.error(
                     f"No Clave de Rastreo found - Order: {order_data.orderNumber}, "
                     f"Bank: {buyer_bank}"
                 )
                 return False
+
+            emisor_bank = receipt.bank or stated_bank or ''
+            if receipt.bank and receipt.bank != stated_bank:
+                logger.info(
+                    f"Receipt bank {receipt.bank} differs from stated bank {buyer_bank} - "
+                    f"Order: {order_data.orderNumber}"
+                )
+            emisor_code = BANK_SPEI_CODES.get(emisor_bank.lower())
+            if not emisor_code:
+                logger.error(
+                    f"SPEI codes not found - Order: {order_data.orderNumber}, "
+                    f"Buyer Bank: {emisor_bank}, Seller Bank: {seller_bank}"
+                )
+                return False
             
             # Perform validation
             fecha = date.today()
-            validation_successful = await retry_request(
-                lambda: Transferencia.validar(
-                    fecha=fecha,
-                    clave_rastreo=clave_rastreo,
-                    emisor=emisor_code,
-                    receptor=receptor_code,
-                    cuenta=order_data.account_number,
-                    monto=order_data.totalPrice
-                ),
-                retries=5,
-                delay=2,
-                backoff=2
-            )
+            if receipt.validated:
+                logger.info(f"Receipt {receipt.sha256[:12]} already validated with CEP")
+                validation_successful = True
+            else:
+                cep_cache = await CEPValidationCache.get_instance()
+                validation_successful = await cep_cache.validate(
+                    fecha,
+                    clave_rastreo,
+                    emisor_code,
+                    receptor_code,
+                    order_data.account_number,
+                    order_data.totalPrice,
+                    retries=5,
+                    delay=2,
+                    backoff=2,
+                    negative_ttl=CEP_NEGATIVE_TTL_SECONDS
+                )
+
+            if receipt.sha256 and not receipt.validated:
+                store = await ReceiptStore.get_instance()
+                await store.set_validated(receipt.sha256, bool(validation_successful))
 
             if validation_successful:
                 logger.info(
@@ -386,7 +671,7 @@ class TransferValidator:
             logger.error(
                 f"Transfer validation failed - Order: {order_data.orderNumber}, "
                 f"Buyer: {buyer_name}, "
-                f"Banks: {buyer_bank}->{seller_bank}, "
+                f"Banks: {emisor_bank}->{seller_bank}, "
                 f"Amount: {order_data.totalPrice}, "
                 f"Clave: {clave_rastreo}"
             )
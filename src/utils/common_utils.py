@@ -93,20 +93,28 @@ async def get_server_timestamp(resync=False):
     current_timestamp = int(time.time() * 1000) + ServerTimestampCache.offset + ServerTimestampCache.buffer_ms
     return current_timestamp
 
+def _decode_image(img_data):
+    # Image.open is lazy; load() forces the decode while still off the event loop
+    img = Image.open(BytesIO(img_data))
+    img.load()
+    return img
+
 async def download_image(url, retries=3, initial_delay=1):
     delay = initial_delay
-    for attempt in range(retries):
-        try:
-            async with aiohttp.ClientSession() as session:
+    async with aiohttp.ClientSession() as session:
+        for attempt in range(retries):
+            try:
                 async with session.get(url) as response:
                     response.raise_for_status()
                     img_data = await response.read()
-                    return Image.open(BytesIO(img_data))
-        except aiohttp.ClientResponseError as e:
-            logger.error(f"Attempt {attempt + 1} - Failed to download image: {e}")
-            if e.status == 403:
-                logger.error("Access denied. Check permissions or credentials.")
-                break
+                return await asyncio.to_thread(_decode_image, img_data)
+            except aiohttp.ClientResponseError as e:
+                logger.error(f"Attempt {attempt + 1} - Failed to download image: {e}")
+                if e.status == 403:
+                    logger.error("Access denied. Check permissions or credentials.")
+                    break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Attempt {attempt + 1} - Failed to download image: {e!r}")
             if attempt < retries - 1:
                 await asyncio.sleep(delay)
                 delay *= 2
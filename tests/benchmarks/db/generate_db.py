@@ -0,0 +1,185 @@
+# bpa/tests/benchmarks/db/generate_db.py
+"""
+Build a synthetic, deterministic binance_main.db at production scale for the
+database benchmark.
+
+Tables are created with the same statements the bot uses (schema.py, the
+deposit and blacklist initializers, the ads table) and then migrated with
+run_migrations, so indexes and materialized aggregates match production.
+Row counts are recorded in a bench_meta table so run_benchmark.py can tell
+whether an existing file still matches the requested scale.
+
+Usage:
+    python -m tests.benchmarks.db.generate_db [--orders 300000] [--users 100000] [--seed 7]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+import aiosqlite
+
+from src.customer_service.kyc.blacklist import initialize_database as initialize_blacklist
+from src.data.database.deposits.binance_bank_deposit_db import initialize_database as initialize_deposits
+from src.data.database.migrations import run_migrations
+from src.data.database.schema import CREATE_TABLE_STATEMENTS
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DB_PATH = os.path.join(DATA_DIR, 'binance_main.db')
+
+DEFAULT_SCALE = {
+    'users': 100_000,
+    'orders': 300_000,
+    'deposits': 300_000,
+    'blacklist': 20_000,
+    'ads': 60,
+}
+
+HISTORY_DAYS = 365
+INSERT_CHUNK = 20_000
+
+# Completed, cancelled, cancelled by system, then still-open statuses
+ORDER_STATUSES = [4] * 85 + [6] * 7 + [7] * 5 + [1] * 2 + [2]
+
+ADS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS ads (
+        advNo TEXT PRIMARY KEY,
+        target_spot INTEGER DEFAULT 0,
+        asset_type TEXT NOT NULL,
+        price REAL,
+        floating_ratio REAL,
+        last_updated TIMESTAMP,
+        account TEXT NOT NULL,
+        surplused_amount REAL DEFAULT 0,
+        fiat TEXT NOT NULL DEFAULT 'Unknown',
+        transAmount REAL,
+        payTypes TEXT NOT NULL DEFAULT '[]',
+        `Group` TEXT NOT NULL DEFAULT 'Unknown',
+        trade_type TEXT NOT NULL,
+        minTransAmount REAL DEFAULT 0.0
+    )
+'''
+
+
+def user_name(i: int) -> str:
+    return f"BUYER {i:06d}"
+
+
+def order_number(i: int) -> str:
+    return f"22{i:016d}"
+
+
+def adv_number(i: int) -> str:
+    return f"11{i:016d}"
+
+
+def _timestamp(rng: random.Random, now: datetime) -> str:
+    return (now - timedelta(seconds=rng.randint(0, HISTORY_DAYS * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+
+
+async def _insert_chunked(conn, sql: str, rows) -> None:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= INSERT_CHUNK:
+            await conn.executemany(sql, chunk)
+            chunk = []
+    if chunk:
+        await conn.executemany(sql, chunk)
+
+
+async def read_meta(path: str = DB_PATH):
+    if not os.path.exists(path):
+        return None
+    async with aiosqlite.connect(path) as conn:
+        try:
+            async with conn.execute("SELECT value FROM bench_meta WHERE key = 'scale'") as cursor:
+                row = await cursor.fetchone()
+        except aiosqlite.OperationalError:
+            return None
+    return json.loads(row[0]) if row else None
+
+
+async def generate(path: str = DB_PATH, scale: dict = None, seed: int = 7) -> dict:
+    scale = {**DEFAULT_SCALE, **(scale or {})}
+    rng = random.Random(seed)
+    now = datetime.now()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+
+    async with aiosqlite.connect(path) as conn:
+        await conn.execute("PRAGMA journal_mode = WAL")
+        for table in ('merchants', 'users', 'orders', 'transactions'):
+            await conn.execute(CREATE_TABLE_STATEMENTS[table])
+        await conn.execute(ADS_TABLE_SQL)
+        await initialize_blacklist(conn)
+        await initialize_deposits(conn)
+        await conn.commit()
+
+        async with conn.execute("SELECT pay_type, account_details, fiat FROM payment_accounts") as cursor:
+            accounts = await cursor.fetchall()
+
+        await _insert_chunked(conn, """
+            INSERT INTO users (name, kyc_status, total_crypto_sold_lifetime, anti_fraud_stage, user_bank,
+                               usd_verification_stage, language_preference, language_selection_stage)
+            VALUES (?, ?, ?, ?, ?, 0, ?, 0)
+        """, ((user_name(i), rng.choice([0, 1, 1, 1]), round(rng.uniform(0, 500000), 2), rng.randint(0, 5),
+               rng.choice(['BBVA', 'NU', 'Banorte', 'Santander', None]), rng.choice(['es', 'en', None]))
+              for i in range(scale['users'])))
+
+        def orders():
+            for i in range(scale['orders']):
+                pay_type, _, fiat = rng.choice(accounts)
+                amount = round(rng.uniform(5, 2000), 2)
+                price = round(rng.uniform(17.0, 20.0), 2)
+                yield (order_number(i), adv_number(rng.randrange(scale['ads'])), user_name(rng.randrange(scale['users'])),
+                       'MERCHANT', 'SELL', rng.choice(ORDER_STATUSES), round(amount * price, 2), price, fiat,
+                       'USDT', amount, pay_type, _timestamp(rng, now))
+
+        await _insert_chunked(conn, """
+            INSERT INTO orders (orderNumber, advOrderNumber, buyerName, sellerName, tradeType, orderStatus,
+                                totalPrice, price, fiatUnit, asset, amount, payType, order_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, orders())
+
+        await _insert_chunked(conn, """
+            INSERT INTO deposits (timestamp, account_details, amount_deposited, deposit_from, year, month)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, ((ts, rng.choice(accounts)[1], round(rng.uniform(100, 20000), 2), user_name(rng.randrange(scale['users'])),
+               int(ts[:4]), int(ts[5:7]))
+              for ts in (_timestamp(rng, now) for _ in range(scale['deposits']))))
+
+        # Half the blacklist are known users, the rest never traded with us
+        await _insert_chunked(conn, """
+            INSERT OR IGNORE INTO P2PBlacklist (name, order_no, country) VALUES (?, ?, ?)
+        """, ((user_name(rng.randrange(scale['users'])) if i % 2 else f"BLOCKED {i:06d}",
+               order_number(i), rng.choice(['MX', 'CO', 'VE', None]))
+              for i in range(scale['blacklist'])))
+
+        await _insert_chunked(conn, """
+            INSERT INTO ads (advNo, target_spot, asset_type, price, floating_ratio, account, fiat, transAmount,
+                             trade_type, minTransAmount)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, ((adv_number(i), rng.randint(1, 5), rng.choice(['USDT', 'BTC', 'USDC']), round(rng.uniform(17, 20), 2),
+               round(rng.uniform(99, 102), 2), 'account_1', 'MXN', 50000.0, rng.choice(['SELL', 'BUY']), 500.0)
+              for i in range(scale['ads'])))
+
+        await conn.execute("CREATE TABLE bench_meta (key TEXT PRIMARY KEY, value TEXT)")
+        await conn.execute("INSERT INTO bench_meta VALUES ('scale', ?)", (json.dumps({**scale, 'seed': seed}),))
+        await conn.commit()
+        await run_migrations(conn)
+    return scale
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the synthetic benchmark database")
+    for name, default in DEFAULT_SCALE.items():
+        parser.add_argument(f'--{name}', type=int, default=default)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', default=DB_PATH)
+    args = parser.parse_args()
+    written = asyncio.run(generate(args.output, {name: getattr(args, name) for name in DEFAULT_SCALE}, args.seed))
+    print(f"Wrote {written} to {args.output}")
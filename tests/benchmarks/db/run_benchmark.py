@@ -0,0 +1,271 @@
+# bpa/tests/benchmarks/db/run_benchmark.py
+"""
+Database hot-path benchmark.
+
+Times the functions the bot calls on every order against a synthetic
+production-scale database (see generate_db.py): once sequentially and then
+with several asyncio tasks sharing one aiosqlite connection, the way the chat
+handlers do. Each run works on a fresh copy of the generated file, so results
+from different commits start from identical data. Reports ops/s and
+p50/p95/p99 latency per operation as JSON.
+
+Caches (BlacklistIndex, DepositLedger) are loaded as in main.py; --cold skips
+them so the SQL fallbacks are measured instead.
+
+Usage:
+    python -m tests.benchmarks.db.run_benchmark --concurrency 1 8 32 --output report.json
+    python -m tests.benchmarks.db.run_benchmark --compare old.json new.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import aiosqlite
+
+from src.customer_service.kyc.blacklist import is_blacklisted
+from src.data.cache.blacklist_index import BlacklistIndex
+from src.data.cache.deposit_ledger import DepositLedger
+from src.data.database.deposits.binance_bank_deposit import PaymentManager
+from src.data.database.operations import ads_database
+from src.data.database.operations.binance_db_get import calculate_crypto_sold_30d, get_order_details
+from src.data.database.operations.binance_db_set import insert_or_update_order
+from tests.benchmarks.db.generate_db import (DB_PATH, DEFAULT_SCALE, adv_number, generate, order_number,
+                                             read_meta, user_name)
+
+
+class BenchContext:
+    def __init__(self, conn, scale: dict, seed: int):
+        self.conn = conn
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.next_order = scale['orders']
+        self.manager = None
+        self.pay_types = []
+
+
+async def op_get_order_details(ctx: BenchContext, i: int):
+    return await get_order_details(ctx.conn, order_number(ctx.rng.randrange(ctx.scale['orders'])))
+
+
+async def op_insert_or_update_order(ctx: BenchContext, i: int):
+    # Alternate between status updates of known orders and brand new orders
+    if i % 2:
+        number = order_number(ctx.rng.randrange(ctx.scale['orders']))
+    else:
+        number = order_number(ctx.next_order)
+        ctx.next_order += 1
+    amount = round(ctx.rng.uniform(5, 2000), 2)
+    payload = {'data': {
+        'orderNumber': number, 'advOrderNumber': adv_number(ctx.rng.randrange(ctx.scale['ads'])),
+        'buyerName': user_name(ctx.rng.randrange(ctx.scale['users'])), 'sellerName': 'MERCHANT',
+        'tradeType': 'SELL', 'orderStatus': ctx.rng.choice([1, 2, 4]), 'totalPrice': str(round(amount * 18.5, 2)),
+        'price': '18.5', 'fiatUnit': 'MXN', 'asset': 'USDT', 'amount': str(amount), 'payType': 'BBVABank',
+    }}
+    return await insert_or_update_order(ctx.conn, payload)
+
+
+async def op_assign_account(ctx: BenchContext, i: int):
+    number = f"bench-{i}"
+    result = await ctx.manager._assign_account(ctx.conn, ctx.rng.choice(ctx.pay_types), number,
+                                               user_name(ctx.rng.randrange(ctx.scale['users'])),
+                                               round(ctx.rng.uniform(100, 5000), 2))
+    # Give the amount back, as a cancelled order would, so accounts never fill up mid-run
+    ctx.manager.release_reservation(number)
+    return result
+
+
+async def op_is_blacklisted(ctx: BenchContext, i: int):
+    index = ctx.rng.randrange(ctx.scale['users'])
+    return await is_blacklisted(ctx.conn, user_name(index) if i % 2 else f"BLOCKED {index:06d}")
+
+
+async def op_update_ad_in_database(ctx: BenchContext, i: int):
+    return await ads_database.update_ad_in_database(
+        ctx.rng.randint(1, 5), adv_number(ctx.rng.randrange(ctx.scale['ads'])), 'USDT',
+        round(ctx.rng.uniform(99, 102), 2), round(ctx.rng.uniform(17, 20), 2), 5000.0, 'account_1', 'MXN',
+        50000.0, 500.0
+    )
+
+
+async def op_calculate_crypto_sold_30d(ctx: BenchContext, i: int):
+    return await calculate_crypto_sold_30d(ctx.conn, user_name(ctx.rng.randrange(ctx.scale['users'])))
+
+
+OPERATIONS = {
+    'get_order_details': op_get_order_details,
+    'insert_or_update_order': op_insert_or_update_order,
+    '_assign_account': op_assign_account,
+    'is_blacklisted': op_is_blacklisted,
+    'update_ad_in_database': op_update_ad_in_database,
+    'calculate_crypto_sold_30d': op_calculate_crypto_sold_30d,
+}
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def measure(ctx: BenchContext, operation, iterations: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    counter = iter(range(iterations))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                await operation(ctx, i)
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'ops_per_s': iterations / elapsed,
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+    }
+
+
+async def prepare_database(scale: dict, seed: int, regenerate: bool) -> str:
+    meta = await read_meta(DB_PATH)
+    if regenerate or meta != {**scale, 'seed': seed}:
+        print(f"Generating benchmark database {scale} (seed {seed}), this takes a while")
+        await generate(DB_PATH, scale, seed)
+    work_dir = tempfile.mkdtemp(prefix='bpa_db_bench_')
+    work_path = os.path.join(work_dir, 'binance_main.db')
+    shutil.copyfile(DB_PATH, work_path)
+    return work_path
+
+
+async def run_benchmark(operations, concurrency_list, iterations: int, scale: dict, seed: int,
+                        cold: bool, regenerate: bool) -> dict:
+    work_path = await prepare_database(scale, seed, regenerate)
+    # update_ad_in_database opens its own connection to the module-level path
+    original_db_file = ads_database.DB_FILE
+    ads_database.DB_FILE = work_path
+    runs = []
+    try:
+        async with aiosqlite.connect(work_path) as conn:
+            ctx = BenchContext(conn, scale, seed)
+            ctx.manager = PaymentManager()
+            await ctx.manager.initialize_payment_account_cache(conn)
+            ctx.pay_types = sorted(ctx.manager.accounts_cache)
+            if not cold:
+                await BlacklistIndex.load(conn)
+                await DepositLedger.load(conn)
+
+            for concurrency in concurrency_list:
+                results = {}
+                for name in operations:
+                    results[name] = await measure(ctx, OPERATIONS[name], iterations, concurrency)
+                    print(f"concurrency={concurrency:>3} {name:>26}: {results[name]['ops_per_s']:9.1f} ops/s, "
+                          f"p50={results[name]['p50_ms']:.2f}ms p95={results[name]['p95_ms']:.2f}ms "
+                          f"p99={results[name]['p99_ms']:.2f}ms errors={results[name]['errors']}")
+                runs.append({'concurrency': concurrency, 'operations': results})
+    finally:
+        ads_database.DB_FILE = original_db_file
+        shutil.rmtree(os.path.dirname(work_path), ignore_errors=True)
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'caches': not cold,
+        'scale': scale,
+        'seed': seed,
+        'iterations': iterations,
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'runs': runs,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path: str, candidate_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+
+    print(f"baseline: {baseline['commit']} ({baseline['generated_at']})")
+    print(f"candidate: {candidate['commit']} ({candidate['generated_at']})")
+    if baseline['scale'] != candidate['scale'] or baseline['caches'] != candidate['caches']:
+        print("warning: reports were taken at different scales or cache settings")
+    baseline_runs = {run['concurrency']: run['operations'] for run in baseline['runs']}
+    for run in candidate['runs']:
+        base_ops = baseline_runs.get(run['concurrency'])
+        if base_ops is None:
+            continue
+        print(f"concurrency={run['concurrency']}:")
+        for name, result in run['operations'].items():
+            base = base_ops.get(name)
+            if base is None:
+                continue
+            print(f"  {name}:")
+            for metric in ('ops_per_s', 'p50_ms', 'p95_ms', 'p99_ms'):
+                before, after = base[metric], result[metric]
+                change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+                print(f"    {metric:>10}: {before:10.3f} -> {after:10.3f} ({change})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Database hot-path benchmark")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--iterations', type=int, default=2000, help="Calls per operation per concurrency level")
+    parser.add_argument('--operations', nargs='+', choices=sorted(OPERATIONS), default=list(OPERATIONS))
+    for name, default in DEFAULT_SCALE.items():
+        parser.add_argument(f'--{name}', type=int, default=default, help=f"Synthetic {name} rows")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--cold', action='store_true', help="Do not load the in-memory caches")
+    parser.add_argument('--regenerate', action='store_true', help="Rebuild the synthetic database")
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help="Compare two saved reports instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    # Per-call info logging would dominate the timings and flood binance_main.log
+    logging.disable(logging.WARNING)
+    scale = {name: getattr(args, name) for name in DEFAULT_SCALE}
+    report = asyncio.run(run_benchmark(args.operations, args.concurrency, args.iterations, scale, args.seed,
+                                       args.cold, args.regenerate))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
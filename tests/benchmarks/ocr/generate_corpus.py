@@ -0,0 +1,107 @@
+# bpa/tests/benchmarks/ocr/generate_corpus.py
+"""
+Generate a synthetic, deterministic receipt corpus for the OCR benchmark.
+
+Each receipt imitates a BBVA, NU or Banorte SPEI transfer screenshot, with the
+tracking key printed under a "Clave de rastreo" label somewhere inside that
+bank's region of interest. Images are written to corpus/ next to this file,
+together with ground_truth.json mapping file name -> bank and clave.
+
+Usage:
+    python -m tests.benchmarks.ocr.generate_corpus [--per-bank 10] [--seed 7]
+"""
+import argparse
+import json
+import os
+import random
+import string
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from src.trading_engine.p2p.payment_verification.receipt_preprocessing import RECEIPT_TEMPLATES
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+GROUND_TRUTH_FILE = 'ground_truth.json'
+
+# O and I are left out: the BBVA parser maps them to 0 and 1
+KEY_CHARS = ''.join(c for c in string.ascii_uppercase + string.digits if c not in 'OI')
+
+FILLER_LINES = [
+    'Transferencia enviada', 'Cuenta destino', 'Beneficiario', 'Concepto de pago',
+    'Referencia numerica', 'Fecha de operacion', 'Hora', 'Importe', 'Comision $0.00',
+    'Folio de operacion', 'Banco destino', 'Metodo SPEI',
+]
+
+
+def random_clave(bank: str, rng: random.Random) -> str:
+    if bank == 'BBVA':
+        prefix = rng.choice(['MBAN01', 'BNET01'])
+        return prefix + ''.join(rng.choice(string.digits) for _ in range(18))
+    if bank == 'NU':
+        return 'NU' + ''.join(rng.choice(KEY_CHARS) for _ in range(26))
+    if bank == 'BANORTE':
+        return (''.join(rng.choice(string.digits) for _ in range(7)) + 'CP0'
+                + ''.join(rng.choice(KEY_CHARS) for _ in range(8)))
+    raise ValueError(f"Unknown bank: {bank}")
+
+
+def render_receipt(bank: str, clave: str, rng: random.Random) -> Image.Image:
+    width = rng.choice([1080, 1170, 2160])
+    height = int(width * rng.uniform(1.9, 2.2))
+    scale = width / 1080
+    image = Image.new('RGB', (width, height), (rng.randint(240, 255),) * 3)
+    draw = ImageDraw.Draw(image)
+    title_font = ImageFont.load_default(size=int(56 * scale))
+    font = ImageFont.load_default(size=int(38 * scale))
+
+    draw.text((60 * scale, 80 * scale), bank, font=title_font, fill=(10, 40, 120))
+    draw.text((60 * scale, 180 * scale), f"${rng.randint(500, 50000):,}.00 MXN", font=title_font, fill=(20, 20, 20))
+
+    # Put the clave somewhere inside the bank's region of interest
+    _, top, _, bottom = RECEIPT_TEMPLATES[bank].roi
+    clave_y = int(height * rng.uniform(top + 0.05, bottom - 0.1))
+    line_height = int(70 * scale)
+
+    y = int(320 * scale)
+    while y < height - line_height:
+        if clave_y <= y < clave_y + 2 * line_height:
+            draw.text((60 * scale, y), 'Clave de rastreo', font=font, fill=(90, 90, 90))
+            draw.text((60 * scale, y + line_height), clave, font=font, fill=(20, 20, 20))
+            clave_y = -1
+            y += 2 * line_height
+            continue
+        draw.text((60 * scale, y), rng.choice(FILLER_LINES), font=font, fill=(90, 90, 90))
+        y += line_height
+
+    if rng.random() < 0.5:
+        image = image.filter(ImageFilter.GaussianBlur(radius=rng.uniform(0.3, 1.0)))
+    return image
+
+
+def generate(per_bank: int = 10, seed: int = 7, output_dir: str = CORPUS_DIR) -> dict:
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    ground_truth = {}
+    for bank in RECEIPT_TEMPLATES:
+        for i in range(per_bank):
+            clave = random_clave(bank, rng)
+            image = render_receipt(bank, clave, rng)
+            # Mix JPEG and PNG like real uploads
+            extension = 'jpg' if i % 2 else 'png'
+            file_name = f"{bank.lower()}_{i:03d}.{extension}"
+            image.save(os.path.join(output_dir, file_name), quality=85)
+            ground_truth[file_name] = {'bank': bank, 'clave': clave}
+
+    with open(os.path.join(output_dir, GROUND_TRUTH_FILE), 'w') as f:
+        json.dump(ground_truth, f, indent=2, sort_keys=True)
+    return ground_truth
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the synthetic receipt OCR corpus")
+    parser.add_argument('--per-bank', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output-dir', default=CORPUS_DIR)
+    args = parser.parse_args()
+    truth = generate(args.per_bank, args.seed, args.output_dir)
+    print(f"Wrote {len(truth)} receipts to {args.output_dir}")
@@ -0,0 +1,194 @@
+# bpa/tests/benchmarks/ocr/run_benchmark.py
+"""
+Offline receipt OCR benchmark.
+
+Runs the receipt corpus (see generate_corpus.py) through OCREngine at several
+worker counts and reports per-bank extraction accuracy, p50/p95 latency,
+throughput and average per-stage timings as JSON. Needs a local Tesseract
+install (or tesserocr); no network access.
+
+Modes:
+    pipeline   preprocessing + region-of-interest OCR (what production uses)
+    fullpage   raw full-resolution OCR, the behaviour before preprocessing
+
+Usage:
+    python -m tests.benchmarks.ocr.run_benchmark --workers 1 2 4 --output report.json
+    python -m tests.benchmarks.ocr.run_benchmark --compare old.json new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+from datetime import datetime
+from io import BytesIO
+
+from PIL import Image
+
+from src.trading_engine.p2p.payment_verification.ocr_engine import OCREngine, _ocr_image
+from src.trading_engine.p2p.payment_verification.spei_validation import get_bank_handler
+from tests.benchmarks.ocr.generate_corpus import CORPUS_DIR, GROUND_TRUTH_FILE, generate
+
+
+def _ocr_full_page(data: bytes, bank: str, config: str):
+    """Worker function for the fullpage mode: no preprocessing at all."""
+    start = time.perf_counter()
+    text = _ocr_image(Image.open(BytesIO(data)), config)
+    return text, {'ocr_full_ms': (time.perf_counter() - start) * 1000}, False
+
+
+def load_corpus(corpus_dir: str):
+    truth_path = os.path.join(corpus_dir, GROUND_TRUTH_FILE)
+    if not os.path.exists(truth_path):
+        print(f"No corpus found in {corpus_dir}, generating one")
+        generate(output_dir=corpus_dir)
+    with open(truth_path) as f:
+        ground_truth = json.load(f)
+
+    corpus = []
+    for file_name, truth in sorted(ground_truth.items()):
+        with open(os.path.join(corpus_dir, file_name), 'rb') as f:
+            corpus.append((file_name, truth['bank'], truth['clave'], f.read()))
+    return corpus
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run_once(corpus, workers: int, mode: str) -> dict:
+    engine = OCREngine(workers=workers, max_queued=len(corpus) + workers)
+    func = _ocr_full_page if mode == 'fullpage' else None
+
+    async def process(bank, data):
+        handler = get_bank_handler(bank)
+        start = time.perf_counter()
+        if func is None:
+            text = await engine.read_receipt(data, bank, handler.tesseract_config)
+        else:
+            text, timings, used_roi = await engine.run(func, data, bank, handler.tesseract_config)
+            engine._record_timings(timings, used_roi)
+        latency_ms = (time.perf_counter() - start) * 1000
+        return handler.parse_clave_de_rastreo(text) if text else None, latency_ms
+
+    try:
+        # Warm up every worker so process start-up is not measured
+        await asyncio.gather(*(process(bank, data) for _, bank, _, data in corpus[:workers]))
+        engine.stage_totals.clear()
+        engine.stage_counts.clear()
+        engine.roi_hits = engine.full_page_fallbacks = 0
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(process(bank, data) for _, bank, _, data in corpus))
+        elapsed = time.perf_counter() - start
+    finally:
+        await engine.close()
+
+    latencies = [latency for _, latency in results]
+    per_bank = {}
+    failures = []
+    for (file_name, bank, clave, _), (extracted, _) in zip(corpus, results):
+        stats = per_bank.setdefault(bank, {'total': 0, 'correct': 0})
+        stats['total'] += 1
+        if extracted == clave:
+            stats['correct'] += 1
+        else:
+            failures.append({'file': file_name, 'expected': clave, 'extracted': extracted})
+
+    correct = sum(stats['correct'] for stats in per_bank.values())
+    return {
+        'workers': workers,
+        'throughput_per_s': len(corpus) / elapsed,
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': percentile(latencies, 95),
+        'accuracy': correct / len(corpus),
+        'accuracy_by_bank': {bank: stats['correct'] / stats['total'] for bank, stats in per_bank.items()},
+        'stages': engine.stats(),
+        'failures': failures,
+    }
+
+
+def ocr_available() -> bool:
+    try:
+        import tesserocr  # noqa: F401
+        return True
+    except ImportError:
+        return shutil.which('tesseract') is not None
+
+
+async def run_benchmark(workers_list, mode: str, corpus_dir: str) -> dict:
+    corpus = load_corpus(corpus_dir)
+    runs = []
+    for workers in workers_list:
+        result = await run_once(corpus, workers, mode)
+        print(f"[{mode}] workers={workers}: {result['throughput_per_s']:.2f} receipts/s, "
+              f"p50={result['p50_ms']:.0f}ms p95={result['p95_ms']:.0f}ms, "
+              f"accuracy={result['accuracy']:.1%}")
+        runs.append(result)
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'mode': mode,
+        'corpus_size': len(corpus),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'runs': runs,
+    }
+
+
+def compare(baseline_path: str, candidate_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+
+    print(f"baseline: {baseline['mode']} ({baseline['generated_at']})")
+    print(f"candidate: {candidate['mode']} ({candidate['generated_at']})")
+    baseline_runs = {run['workers']: run for run in baseline['runs']}
+    for run in candidate['runs']:
+        base = baseline_runs.get(run['workers'])
+        if base is None:
+            continue
+        print(f"workers={run['workers']}:")
+        for metric in ('throughput_per_s', 'p50_ms', 'p95_ms', 'accuracy'):
+            before, after = base[metric], run[metric]
+            if before:
+                change = f"{(after - before) / before * 100:+.1f}%"
+            else:
+                change = "+0.0%" if after == before else "n/a"
+            print(f"  {metric:>16}: {before:10.3f} -> {after:10.3f} ({change})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Receipt OCR accuracy/latency benchmark")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--mode', choices=['pipeline', 'fullpage'], default='pipeline')
+    parser.add_argument('--corpus-dir', default=CORPUS_DIR)
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help="Compare two saved reports instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    if not ocr_available():
+        print("Tesseract is not installed (neither the tesseract binary nor tesserocr found)")
+        return 1
+
+    report = asyncio.run(run_benchmark(args.workers, args.mode, args.corpus_dir))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+# bpa/tests/benchmarks/orderbook/run_benchmark.py
+"""
+Bitso order book benchmark.
+
+Replays a synthetic diff-orders stream (seeded, so runs are comparable)
+against:
+  legacy        the former dict book: string price keys, reference prices
+                re-sorted and re-walked after every single diff
+  engine        OrderBookEngine, reference prices read after every diff
+  engine_frame  OrderBookEngine, a whole frame applied before reading once
+                (what BitsoOrderBook does)
+
+Most traffic on a real book is near the top, but cancels and new orders
+deep in the book are common; --deep-share controls the mix. Reports
+microseconds per diff (mean, p50/p99 per frame divided by its size) and
+checks that all variants end with the same reference prices.
+
+Usage:
+    python -m tests.benchmarks.orderbook.run_benchmark --levels 500 2000 --output report.json
+    python -m tests.benchmarks.orderbook.run_benchmark --compare old.json new.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from src.connectors.bitso.book_engine import REFERENCE_DEPTH_MXN, OrderBookEngine
+
+MID_PRICE = 18.50
+# Small enough that 5000 levels stay above 10 MXN: the legacy book sorted
+# price strings, which misorders '9.99' against '18.50'
+TICK = 0.001
+
+
+class LegacyBook:
+    """The previous BitsoOrderBook storage and calculate_weighted_average."""
+
+    def __init__(self, bids, asks):
+        self.order_book = {'bids': {bid['price']: bid for bid in bids}, 'asks': {ask['price']: ask for ask in asks}}
+
+    def apply_update(self, update):
+        price = update['r']
+        amount = update.get('a', '0')
+        side = 'bids' if update['t'] == 0 else 'asks'
+        if update['s'] == 'cancelled' or float(amount) == 0:
+            self.order_book[side].pop(price, None)
+        else:
+            self.order_book[side][price] = {'book': 'usdt_mxn', 'price': price, 'amount': amount}
+
+    def calculate_weighted_average(self, side, target_mxn):
+        total_mxn = 0
+        total_amount = 0
+        for price, order in sorted(self.order_book[side].items(), reverse=(side == 'bids')):
+            price = float(price)
+            amount = float(order['amount'])
+            mxn_to_add = min(price * amount, target_mxn - total_mxn)
+            total_mxn += mxn_to_add
+            total_amount += mxn_to_add / price
+            if total_mxn >= target_mxn:
+                break
+        return total_mxn / total_amount if total_amount > 0 else 0
+
+    def reference_prices(self):
+        return (self.calculate_weighted_average('bids', REFERENCE_DEPTH_MXN),
+                self.calculate_weighted_average('asks', REFERENCE_DEPTH_MXN))
+
+
+def _price(side: int, depth: int) -> str:
+    price = MID_PRICE - TICK * (depth + 1) if side == 0 else MID_PRICE + TICK * (depth + 1)
+    return f"{price:.3f}"
+
+
+def generate(levels: int, frames: int, frame_size: int, deep_share: float, seed: int):
+    """Snapshot (bids, asks) with `levels` per side, plus `frames` diff payloads."""
+    rng = random.Random(seed)
+
+    def amount():
+        return f"{rng.uniform(5, 3000):.4f}"
+
+    bids = [{'book': 'usdt_mxn', 'price': _price(0, i), 'amount': amount()} for i in range(levels)]
+    asks = [{'book': 'usdt_mxn', 'price': _price(1, i), 'amount': amount()} for i in range(levels)]
+    stream = []
+    for _ in range(frames):
+        frame = []
+        for _ in range(rng.randint(1, frame_size)):
+            side = rng.randint(0, 1)
+            depth = rng.randrange(levels) if rng.random() < deep_share else rng.randrange(min(levels, 10))
+            if rng.random() < 0.3:
+                frame.append({'r': _price(side, depth), 's': 'cancelled', 't': side})
+            else:
+                frame.append({'r': _price(side, depth), 'a': amount(), 's': 'open', 't': side})
+        stream.append(frame)
+    return bids, asks, stream
+
+
+def run_variant(name: str, bids, asks, stream) -> dict:
+    if name == 'legacy':
+        book = LegacyBook(bids, asks)
+    else:
+        book = OrderBookEngine()
+        book.load_snapshot(bids, asks)
+
+    per_diff = []
+    diffs = 0
+    start = time.perf_counter()
+    for frame in stream:
+        frame_start = time.perf_counter()
+        if name == 'engine_frame':
+            book.apply_frame(frame)
+            book.reference_prices()
+        else:
+            for update in frame:
+                book.apply_update(update)
+                book.reference_prices()
+        per_diff.append((time.perf_counter() - frame_start) * 1e6 / len(frame))
+        diffs += len(frame)
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'diffs': diffs,
+        'mean_us_per_diff': elapsed * 1e6 / diffs,
+        'p50_us_per_diff': statistics.median(per_diff),
+        'p99_us_per_diff': statistics.quantiles(per_diff, n=100)[98],
+        'reference_prices': book.reference_prices(),
+    }
+    if name != 'legacy':
+        result['recomputes'] = book.bids.recomputes + book.asks.recomputes
+    return result
+
+
+def run_benchmark(levels_list, frames: int, frame_size: int, deep_share: float, seed: int) -> dict:
+    runs = []
+    for levels in levels_list:
+        bids, asks, stream = generate(levels, frames, frame_size, deep_share, seed)
+        results = {}
+        for name in ('legacy', 'engine', 'engine_frame'):
+            results[name] = run_variant(name, bids, asks, stream)
+            extra = f" recomputes={results[name]['recomputes']}" if 'recomputes' in results[name] else ""
+            print(f"levels={levels:>6} {name:>12}: {results[name]['mean_us_per_diff']:9.2f} us/diff, "
+                  f"p50={results[name]['p50_us_per_diff']:.2f}us p99={results[name]['p99_us_per_diff']:.2f}us{extra}")
+        expected = results['legacy']['reference_prices']
+        for name, result in results.items():
+            if any(abs(a - b) > 1e-9 for a, b in zip(result['reference_prices'], expected)):
+                print(f"warning: {name} ended with {result['reference_prices']}, legacy with {expected}")
+        runs.append({'levels': levels, 'variants': results})
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'frames': frames,
+        'frame_size': frame_size,
+        'deep_share': deep_share,
+        'seed': seed,
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'runs': runs,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path: str, candidate_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+
+    print(f"baseline: {baseline['commit']} ({baseline['generated_at']})")
+    print(f"candidate: {candidate['commit']} ({candidate['generated_at']})")
+    settings = ('frames', 'frame_size', 'deep_share', 'seed')
+    if any(baseline[key] != candidate[key] for key in settings):
+        print("warning: reports were taken with different stream settings")
+    baseline_runs = {run['levels']: run['variants'] for run in baseline['runs']}
+    for run in candidate['runs']:
+        base_variants = baseline_runs.get(run['levels'])
+        if base_variants is None:
+            continue
+        print(f"levels={run['levels']}:")
+        for name, result in run['variants'].items():
+            base = base_variants.get(name)
+            if base is None:
+                continue
+            print(f"  {name}:")
+            for metric in ('mean_us_per_diff', 'p50_us_per_diff', 'p99_us_per_diff'):
+                before, after = base[metric], result[metric]
+                change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+                print(f"    {metric:>16}: {before:10.3f} -> {after:10.3f} ({change})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bitso order book benchmark")
+    parser.add_argument('--levels', type=int, nargs='+', default=[200, 1000, 5000], help="Price levels per side")
+    parser.add_argument('--frames', type=int, default=2000, help="diff-orders frames to replay")
+    parser.add_argument('--frame-size', type=int, default=10, help="Maximum diffs per frame")
+    parser.add_argument('--deep-share', type=float, default=0.5,
+                        help="Share of diffs at a random depth rather than the top 10 levels")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help="Compare two saved reports instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    logging.disable(logging.WARNING)
+    report = run_benchmark(args.levels, args.frames, args.frame_size, args.deep_share, args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
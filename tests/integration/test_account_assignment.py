@@ -0,0 +1,97 @@
+import asyncio
+
+import aiosqlite
+
+from src.data.cache.deposit_ledger import DepositLedger
+from src.data.database.deposits import binance_bank_deposit
+from src.data.database.deposits.binance_bank_deposit import PaymentManager
+from src.data.database.operations.write_behind import WriteBehindJournal
+
+ACCOUNTS = [
+    ('MXN', 'BBVA', 'A', 'bbva-1', 1000, 100000),
+    ('MXN', 'BBVA', 'B', 'bbva-2', 1000, 100000),
+    ('USD', 'Zelle', 'C', 'zelle-1', 5000, 50000),
+]
+
+
+async def _setup(conn):
+    await conn.execute('''
+        CREATE TABLE payment_accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, fiat TEXT, pay_type TEXT, beneficiary TEXT,
+            account_details TEXT UNIQUE, daily_limit REAL, monthly_limit REAL, last_used_timestamp DATETIME
+        )
+    ''')
+    await conn.execute('''
+        CREATE TABLE deposits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp DATETIME, account_details TEXT,
+            amount_deposited REAL, deposit_from TEXT, year INTEGER, month INTEGER
+        )
+    ''')
+    await conn.executemany(
+        'INSERT INTO payment_accounts (fiat, pay_type, beneficiary, account_details, daily_limit, monthly_limit) '
+        'VALUES (?, ?, ?, ?, ?, ?)', ACCOUNTS
+    )
+    await conn.commit()
+    await DepositLedger.load(conn)
+
+
+def _account_of(details):
+    for account in ('bbva-1', 'bbva-2', 'zelle-1'):
+        if account in details:
+            return account
+    return None
+
+
+async def _account_assignment():
+    async with aiosqlite.connect(':memory:') as conn:
+        await _setup(conn)
+        manager = PaymentManager()
+        try:
+            await manager.initialize_payment_account_cache(conn)
+
+            # Concurrent orders spread by load and never overbook an account
+            results = await asyncio.gather(*(
+                manager._assign_account(conn, 'BBVA', f"order-{i}", f"buyer-{i}", 400.0) for i in range(5)
+            ))
+            assigned = [_account_of(r) if r else None for r in results]
+            assert assigned.count('bbva-1') == 2 and assigned.count('bbva-2') == 2
+            assert assigned.count(None) == 1
+            assert manager.reserved_by_account == {'bbva-1': 800.0, 'bbva-2': 800.0}
+
+            # Sending details again for the same order keeps its account
+            again = await manager._assign_account(conn, 'BBVA', 'order-0', 'buyer-0', 400.0)
+            assert _account_of(again) == assigned[0]
+            assert manager.reserved_by_account[assigned[0]] == 800.0
+
+            # Cancelling frees the amount for the next order
+            manager.release_reservation('order-0')
+            retry = await manager._assign_account(conn, 'BBVA', 'order-9', 'buyer-9', 400.0)
+            assert _account_of(retry) == assigned[0]
+
+            # Expired reservations are dropped
+            for reservation in manager.reservations.values():
+                reservation.expires_at = 0
+            manager._expire_reservations()
+            assert not manager.reservations and not manager.reserved_by_account
+
+            # Different pay types use different locks
+            assert manager.pay_type_locks['BBVA'] is not manager.pay_type_locks['Zelle']
+            async with manager.pay_type_locks['BBVA']:
+                zelle = await asyncio.wait_for(
+                    manager._assign_account(conn, 'Zelle', 'order-z', 'buyer-z', 100.0), timeout=1
+                )
+            assert _account_of(zelle) == 'zelle-1'
+        finally:
+            binance_bank_deposit.PaymentManager._instance = None
+            DepositLedger._loaded = False
+            DepositLedger.clear()
+            WriteBehindJournal._dirty['orders'].clear()
+
+
+def test_account_assignment():
+    asyncio.run(_account_assignment())
+
+
+if __name__ == "__main__":
+    test_account_assignment()
+    print("Account assignment tests passed")
@@ -0,0 +1,67 @@
+import asyncio
+
+from src.data.cache.ad_store import AdStore
+from src.data.cache.share_data import SharedData
+
+
+def _ad(advNo, trade_type='SELL', group='1', account='account_1', asset='USDT', fiat='MXN', price=18.5):
+    return {'advNo': advNo, 'trade_type': trade_type, 'Group': group, 'account': account,
+            'asset_type': asset, 'fiat': fiat, 'price': price, 'payTypes': ['BBVABank']}
+
+
+def test_indexes_and_copy_on_write():
+    AdStore.clear()
+    AdStore.put_many([_ad('1'), _ad('2', group='2'), _ad('3', trade_type='BUY', asset='BTC', account='account_2')])
+
+    before = AdStore.snapshot()
+    assert [ad['advNo'] for ad in before.by_trade_type('SELL')] == ['1', '2']
+    assert [ad['advNo'] for ad in before.by_group('2')] == ['2']
+    assert [ad['advNo'] for ad in before.by_account('account_2')] == ['3']
+    assert [ad['advNo'] for ad in before.by_asset_fiat('BTC', 'MXN')] == ['3']
+
+    # A price update publishes a new version and keeps the indexes
+    assert AdStore.update('1', price=19.0, not_a_field=1)
+    after = AdStore.snapshot()
+    assert after.version == before.version + 1
+    assert after.indexes is before.indexes
+    assert after.get('1')['price'] == 19.0 and 'not_a_field' not in after.get('1')
+    # Readers holding the old version still see it unchanged
+    assert before.get('1')['price'] == 18.5
+
+    # Moving an ad to another group reindexes
+    assert AdStore.update_many([('2', {'Group': '1'}), ('missing', {'price': 1.0})]) == 1
+    assert [ad['advNo'] for ad in AdStore.snapshot().by_group('1')] == ['1', '2', '3']
+    assert AdStore.snapshot().by_group('2') == ()
+
+    try:
+        AdStore.snapshot().get('1')['price'] = 0
+        assert False, "published ads must be read-only"
+    except TypeError:
+        pass
+    AdStore.clear()
+
+
+async def _shared_data_facade():
+    AdStore.clear()
+    assert await SharedData.set_ad('10', _ad('10'))
+    assert await SharedData.set_ad('11', _ad('11', trade_type='BUY'))
+    assert await SharedData.len() == 2
+    assert [ad['advNo'] for ad in await SharedData.fetch_all_ads('BUY')] == ['11']
+    assert len(await SharedData.fetch_all_ads()) == 2
+
+    version = SharedData.snapshot().version
+    await SharedData.update_ads([{'advNo': '10', 'price': 20.0}, {'advNo': '11', 'price': 21.0}])
+    assert SharedData.snapshot().version == version + 1
+    assert (await SharedData.get_ad('11'))['price'] == 21.0
+    assert await SharedData.get_ad('missing') is None
+    AdStore.clear()
+
+
+def test_shared_data_facade():
+    asyncio.run(_shared_data_facade())
+
+
+if __name__ == "__main__":
+    test_indexes_and_copy_on_write()
+    test_shared_data_facade()
+    print("Ad store tests passed")
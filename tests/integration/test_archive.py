@@ -0,0 +1,117 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import aiosqlite
+
+from src.data.database.archive import (ArchiveReader, Archiver, enable_incremental_vacuum, fetch_archived_order,
+                                       open_readonly)
+from src.data.database.deposits.binance_bank_deposit_db import initialize_database as initialize_deposits
+from src.data.database.schema import CREATE_TABLE_STATEMENTS
+
+
+def _days_ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+async def _seed(conn):
+    for table in ('merchants', 'users', 'orders', 'transactions'):
+        await conn.execute(CREATE_TABLE_STATEMENTS[table])
+    await initialize_deposits(conn)
+    orders = [
+        ('old-done', 4, _days_ago(400)),
+        ('old-cancelled', 7, _days_ago(300)),
+        ('old-appeal', 5, _days_ago(300)),   # still open: must stay live
+        ('recent-done', 4, _days_ago(2)),
+    ]
+    await conn.executemany(
+        "INSERT INTO orders (orderNumber, buyerName, orderStatus, order_date) VALUES (?, 'alice', ?, ?)", orders
+    )
+    await conn.executemany(
+        "INSERT INTO deposits (timestamp, account_details, amount_deposited, deposit_from) VALUES (?, 'acc', 100, 'alice')",
+        [(_days_ago(days),) for days in range(0, 400, 10)]
+    )
+    await conn.executemany(
+        "INSERT INTO transactions (buyer_name, seller_name, total_price, order_date) VALUES ('alice', 'me', ?, ?)",
+        [(float(days), _days_ago(days)) for days in (1, 200, 250)]
+    )
+    await conn.commit()
+
+
+async def _count(conn, table):
+    async with conn.execute(f"SELECT COUNT(*) FROM {table}") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def _archive_pass():
+    with tempfile.TemporaryDirectory() as tmp:
+        live_path = os.path.join(tmp, 'live.db')
+        archive_path = os.path.join(tmp, 'archive.db')
+        async with aiosqlite.connect(live_path) as conn:
+            await _seed(conn)
+            deposits_before = await _count(conn, 'deposits')
+
+            moved = await Archiver.run_once(conn, archive_path, older_than_days=180, batch_size=7, pause=0)
+            assert moved == {'orders': 2, 'deposits': 21, 'transactions': 2}, moved
+            assert await _count(conn, 'orders') == 2
+            assert await _count(conn, 'deposits') == deposits_before - 21
+            # The live pass never switches the vacuum mode itself
+            async with conn.execute("PRAGMA auto_vacuum") as cursor:
+                assert (await cursor.fetchone())[0] == 0
+
+        # The offline maintenance step does, once
+        assert await enable_incremental_vacuum(live_path)
+        assert not await enable_incremental_vacuum(live_path)
+        async with aiosqlite.connect(live_path) as conn:
+            async with conn.execute("PRAGMA auto_vacuum") as cursor:
+                assert (await cursor.fetchone())[0] == 2, "incremental auto_vacuum must be enabled"
+
+            # A second pass finds nothing to move and stays idempotent
+            again = await Archiver.run_once(conn, archive_path, older_than_days=180, batch_size=7, pause=0)
+            assert again == {'orders': 0, 'deposits': 0, 'transactions': 0}
+
+        try:
+            archived = await fetch_archived_order('old-done', archive_path)
+            assert archived['orderStatus'] == 4 and archived['buyerName'] == 'alice'
+            reader = await ArchiveReader.connection(archive_path)
+            # Misses reuse the same connection instead of opening the file again
+            assert await fetch_archived_order('recent-done', archive_path) is None
+            assert await fetch_archived_order('unknown', archive_path) is None
+            assert await ArchiveReader.connection(archive_path) is reader
+        finally:
+            await ArchiveReader.close()
+
+        archive = await open_readonly(archive_path)
+        try:
+            assert await _count(archive, 'deposits') == 21
+            try:
+                await archive.execute("DELETE FROM orders")
+                assert False, "archive must be opened read-only"
+            except aiosqlite.OperationalError:
+                pass
+        finally:
+            await archive.close()
+
+
+async def _horizon_guard():
+    try:
+        await Archiver.run_once(older_than_days=7)
+        assert False, "a horizon inside the deposit limit window must be rejected"
+    except ValueError:
+        pass
+    assert await open_readonly('/nonexistent/archive.db') is None
+
+
+def test_archive_pass():
+    asyncio.run(_archive_pass())
+
+
+def test_horizon_guard():
+    asyncio.run(_horizon_guard())
+
+
+if __name__ == "__main__":
+    test_archive_pass()
+    test_horizon_guard()
+    print("Archive tests passed")
@@ -0,0 +1,66 @@
+import asyncio
+
+import aiosqlite
+
+from src.connectors.asset_balances import BalanceStore
+
+
+async def _totals(conn):
+    async with conn.execute("SELECT asset, total_balance FROM total_balances WHERE total_balance != 0") as cursor:
+        return dict(await cursor.fetchall())
+
+
+async def _batched_updates():
+    async with aiosqlite.connect(':memory:') as conn:
+        store = BalanceStore()
+        await store.initialize(conn)
+
+        written = await store.update_accounts({
+            (1, 'main'): {'USDT': 100.0, 'BTC': 0.5},
+            (1, 'second'): {'USDT': 50.0},
+            (2, 'bitso'): {'USDC': 25.0},
+        })
+        assert written == 4
+        assert await _totals(conn) == {'USDT': 150.0, 'BTC': 0.5, 'USDC': 25.0}
+        assert store.get_total_usd() == 175.0
+
+        # Unchanged rows are skipped; an asset that disappeared is zeroed
+        written = await store.update_accounts({(1, 'main'): {'USDT': 100.0}, (1, 'second'): {'USDT': 70.0}})
+        assert written == 2
+        assert store.get_balance(1, 'main') == {'USDT': 100.0, 'BTC': 0.0}
+        assert await _totals(conn) == {'USDT': 170.0, 'USDC': 25.0}
+        async with conn.execute("SELECT asset, SUM(balance) FROM balances GROUP BY asset") as cursor:
+            assert {asset: total for asset, total in await cursor.fetchall() if total} == await _totals(conn)
+        assert sorted(store.get_total_asset_balances()) == [('USDC', 25.0), ('USDT', 170.0)]
+
+        # Nothing changed: no write at all
+        assert await store.update_accounts({(2, 'bitso'): {'USDC': 25.0}}) == 0
+
+
+async def _reload_from_disk():
+    async with aiosqlite.connect(':memory:') as conn:
+        first = BalanceStore()
+        await first.initialize(conn)
+        await first.update_accounts({(1, 'main'): {'ETH': 2.0}})
+        # A stale aggregate row left by an older version is rebuilt on load
+        await conn.execute("INSERT OR REPLACE INTO total_balances VALUES ('ETH', 99.0)")
+        await conn.commit()
+
+        second = BalanceStore()
+        await second.initialize(conn)
+        assert second.get_balance(1, 'main') == {'ETH': 2.0}
+        assert await _totals(conn) == {'ETH': 2.0}
+
+
+def test_batched_updates():
+    asyncio.run(_batched_updates())
+
+
+def test_reload_from_disk():
+    asyncio.run(_reload_from_disk())
+
+
+if __name__ == "__main__":
+    test_batched_updates()
+    test_reload_from_disk()
+    print("Balance store tests passed")
@@ -0,0 +1,50 @@
+import asyncio
+
+import aiosqlite
+
+from src.customer_service.kyc.blacklist import (
+    add_to_blacklist, get_blacklist_counts_by_country, initialize_database, is_blacklisted,
+    remove_from_blacklist, remove_from_blacklist_no_country
+)
+from src.data.cache.blacklist_index import BlacklistIndex
+
+
+async def _blacklist_index():
+    async with aiosqlite.connect(':memory:') as conn:
+        await initialize_database(conn)
+        await conn.executemany(
+            "INSERT INTO P2PBlacklist (name, order_no, country) VALUES (?, ?, ?)",
+            [('A', '1', 'MX'), ('B', '2', 'MX'), ('C', '3', None)]
+        )
+        await conn.commit()
+
+        sql_counts = await get_blacklist_counts_by_country(conn)
+        assert await BlacklistIndex.load(conn) == 3
+        try:
+            assert await get_blacklist_counts_by_country(conn) == sql_counts
+            assert await is_blacklisted(conn, 'A')
+            assert not await is_blacklisted(conn, 'D')
+
+            await add_to_blacklist(conn, 'D', '4', 'CO')
+            await add_to_blacklist(conn, 'A', '5', 'CO')  # Ignored, A is already listed
+            await remove_from_blacklist(conn, 'B')
+            await remove_from_blacklist_no_country(conn)
+            assert await is_blacklisted(conn, 'D')
+            assert not await is_blacklisted(conn, 'C')
+
+            # The in-memory aggregates still match the table
+            memory_counts = await get_blacklist_counts_by_country(conn)
+            BlacklistIndex._loaded = False
+            assert memory_counts == await get_blacklist_counts_by_country(conn) == [('CO', 1), ('MX', 1)]
+        finally:
+            BlacklistIndex._loaded = False
+            BlacklistIndex.clear()
+
+
+def test_blacklist_index():
+    asyncio.run(_blacklist_index())
+
+
+if __name__ == "__main__":
+    asyncio.run(_blacklist_index())
+    print("Blacklist index tests passed")
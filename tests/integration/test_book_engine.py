@@ -0,0 +1,77 @@
+import random
+
+from src.connectors.bitso.book_engine import OrderBookEngine
+
+
+def _naive_wavg(levels, is_bid, target):
+    remaining, notional, quantity = target, 0.0, 0.0
+    for price, amount in sorted(levels.items(), reverse=is_bid):
+        take = min(price * amount, remaining)
+        notional += take
+        quantity += take / price
+        remaining -= take
+        if remaining <= 0:
+            break
+    return notional / quantity if quantity > 0 else 0
+
+
+def _level(price, amount):
+    return {'book': 'usdt_mxn', 'price': f"{price:.2f}", 'amount': f"{amount:.4f}"}
+
+
+def test_matches_full_recompute():
+    rng = random.Random(3)
+    engine = OrderBookEngine(target_notional=50000)
+    bids = {round(18.0 - i * 0.01, 2): round(rng.uniform(10, 2000), 4) for i in range(200)}
+    asks = {round(18.1 + i * 0.01, 2): round(rng.uniform(10, 2000), 4) for i in range(200)}
+    engine.load_snapshot([_level(p, a) for p, a in bids.items()], [_level(p, a) for p, a in asks.items()])
+
+    for _ in range(300):
+        frame = []
+        for _ in range(rng.randint(1, 8)):
+            is_bid = rng.random() < 0.5
+            levels = bids if is_bid else asks
+            price = round((18.0 - rng.randint(0, 250) * 0.01) if is_bid else (18.1 + rng.randint(0, 250) * 0.01), 2)
+            if rng.random() < 0.3:
+                frame.append({'r': f"{price:.2f}", 's': 'cancelled', 't': 0 if is_bid else 1})
+                levels.pop(price, None)
+            else:
+                amount = round(rng.uniform(0, 2000), 4)
+                frame.append({'r': f"{price:.2f}", 'a': f"{amount:.4f}", 's': 'open', 't': 0 if is_bid else 1})
+                if amount > 0:
+                    levels[price] = amount
+                else:
+                    levels.pop(price, None)
+        engine.apply_frame(frame)
+        bid, ask = engine.reference_prices()
+        assert abs(bid - _naive_wavg(bids, True, 50000)) < 1e-9
+        assert abs(ask - _naive_wavg(asks, False, 50000)) < 1e-9
+        assert engine.bids.top(1)[0][0] == max(bids) and engine.asks.top(1)[0][0] == min(asks)
+
+
+def test_deep_changes_skip_recompute():
+    engine = OrderBookEngine(target_notional=1000)
+    engine.load_snapshot([_level(18.0, 100), _level(17.9, 100), _level(17.0, 100)],
+                         [_level(18.2, 10)])
+    bid, ask = engine.reference_prices()
+    assert engine.bids.recomputes == 1
+    # 1000 MXN of depth is all taken from the best bid
+    assert bid == 18.0
+
+    # 17.0 is past the 1000 MXN window: changing it leaves the price as is
+    assert engine.apply_frame([{'r': '17.00', 'a': '5', 's': 'open', 't': 0}])
+    assert engine.reference_prices() == (bid, ask) and engine.bids.recomputes == 1
+    # A thin ask side is always recomputed, and malformed entries are skipped
+    assert engine.apply_frame([{'r': '18.30', 'a': '1', 's': 'open', 't': 1}, {'r': 'x', 't': 1}])
+    assert engine.reference_prices()[1] != ask
+    # Cancelling the best bid moves the window
+    engine.apply_frame([{'r': '18.00', 's': 'cancelled', 't': 0}])
+    assert engine.bids.top(1) == [(17.9, 100.0)] and engine.reference_prices()[0] < bid
+    # Removing a missing level is not a change
+    assert not engine.apply_frame([{'r': '16.00', 's': 'cancelled', 't': 0}])
+
+
+if __name__ == "__main__":
+    test_matches_full_recompute()
+    test_deep_changes_skip_recompute()
+    print("Order book engine tests passed")
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import aiosqlite
+
+from src.data.database.migrations import run_migrations
+from src.data.database.operations.binance_db_get import calculate_crypto_sold_30d
+from src.data.database.operations.binance_db_set import update_total_spent
+from src.data.database.operations.buyer_volume import get_buyer_volume, get_buyer_volume_windows
+from src.data.database.schema import CREATE_TABLE_STATEMENTS
+
+
+def _days_ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+async def _create_tables(conn):
+    for table in ('merchants', 'users', 'orders', 'transactions'):
+        await conn.execute(CREATE_TABLE_STATEMENTS[table])
+    await conn.commit()
+
+
+async def _insert_order(conn, orderNumber, buyerName, amount, totalPrice, order_date, status=4):
+    await conn.execute(
+        "INSERT INTO orders (orderNumber, buyerName, sellerName, amount, totalPrice, order_date, orderStatus) "
+        "VALUES (?, ?, 'seller', ?, ?, ?, ?)",
+        (orderNumber, buyerName, amount, totalPrice, order_date, status)
+    )
+
+
+async def _backfill_and_incremental():
+    async with aiosqlite.connect(':memory:') as conn:
+        await _create_tables(conn)
+        # History from before the buckets existed: only completed orders count
+        await _insert_order(conn, 'old-1', 'alice', 10.0, 200.0, _days_ago(40))
+        await _insert_order(conn, 'old-2', 'alice', 5.0, 100.0, _days_ago(3))
+        await _insert_order(conn, 'old-3', 'alice', 7.0, 140.0, _days_ago(3), status=7)
+        await conn.commit()
+        await run_migrations(conn)
+
+        windows = await get_buyer_volume_windows(conn, 'alice')
+        assert windows['lifetime'] == {'crypto_amount': 15.0, 'fiat_total': 300.0, 'order_count': 2}
+        assert windows['30d']['crypto_amount'] == 5.0
+        assert windows['1d']['order_count'] == 0
+
+        # A new completion lands in today's bucket and the lifetime total
+        await _insert_order(conn, 'new-1', 'alice', 2.0, 40.0, _days_ago(0))
+        await conn.commit()
+        await update_total_spent(conn, 'new-1')
+        assert (await get_buyer_volume(conn, 'alice', 1))['crypto_amount'] == 2.0
+        assert await calculate_crypto_sold_30d(conn, 'alice') == 7.0
+
+        # A retried completion job must not count the order twice
+        await update_total_spent(conn, 'new-1')
+        assert (await get_buyer_volume(conn, 'alice'))['order_count'] == 3
+        async with conn.execute("SELECT total_crypto_sold_lifetime FROM users WHERE name = 'alice'") as cursor:
+            assert (await cursor.fetchone())[0] == 40.0
+        async with conn.execute("SELECT COUNT(*) FROM transactions WHERE buyer_name = 'alice'") as cursor:
+            assert (await cursor.fetchone())[0] == 1
+
+
+async def _unknown_buyer():
+    async with aiosqlite.connect(':memory:') as conn:
+        await _create_tables(conn)
+        await run_migrations(conn)
+        assert (await get_buyer_volume(conn, 'nobody', 30))['crypto_amount'] == 0
+        assert await calculate_crypto_sold_30d(conn, 'nobody') == 0
+
+
+def test_backfill_and_incremental_buckets():
+    asyncio.run(_backfill_and_incremental())
+
+
+def test_unknown_buyer_has_no_volume():
+    asyncio.run(_unknown_buyer())
+
+
+if __name__ == "__main__":
+    test_backfill_and_incremental_buckets()
+    test_unknown_buyer_has_no_volume()
+    print("Buyer volume tests passed")
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+from datetime import date
+
+import aiosqlite
+
+from src.trading_engine.p2p.payment_verification import cep_cache
+from src.trading_engine.p2p.payment_verification.cep_cache import CEPValidationCache
+
+
+class _FakeCEP:
+    def __init__(self, found=True):
+        self.found = found
+        self.calls = 0
+        self.threads = set()
+        self.lock = threading.Lock()
+
+    def validar(self, **kwargs):
+        with self.lock:
+            self.calls += 1
+        self.threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        return object() if self.found else None
+
+
+async def _cep_cache():
+    conn = await aiosqlite.connect(':memory:')
+    original = cep_cache.Transferencia
+    fake = _FakeCEP()
+    cep_cache.Transferencia = fake
+    cache = CEPValidationCache(threads=2, negative_ttl=0.2)
+    try:
+        await cache.initialize(conn)
+        args = (date(2024, 11, 28), "MBAN01002411280012345678", '40012', '90722', '012345678901234567', 1500)
+
+        # Concurrent identical lookups share one CEP call
+        results = await asyncio.gather(*(cache.validate(*args) for _ in range(5)))
+        assert results == [True] * 5
+        assert fake.calls == 1
+        assert all(name.startswith('cep') for name in fake.threads)
+
+        # Positive results are served from SQLite, also for a string date and float amount
+        assert await cache.validate("2024-11-28", *args[1:5], 1500.0)
+        assert fake.calls == 1
+
+        # Negative results expire
+        fake.found = False
+        other = args[:1] + ("MBAN01009999999999999999",) + args[2:]
+        assert not await cache.validate(*other)
+        assert not await cache.validate(*other)
+        assert fake.calls == 2
+        await asyncio.sleep(0.25)
+        fake.found = True
+        assert await cache.validate(*other)
+        assert fake.calls == 3
+
+        # A caller's own TTL overrides the default
+        fake.found = False
+        short = args[:1] + ("MBAN01002222222222222222",) + args[2:]
+        assert not await cache.validate(*short, negative_ttl=0.05)
+        await asyncio.sleep(0.1)
+        fake.found = True
+        assert await cache.validate(*short)
+        assert fake.calls == 5
+
+        # Errors are raised and not cached
+        def broken(**kwargs):
+            raise ConnectionError("CEP down")
+        cep_cache.Transferencia = type('Broken', (), {'validar': staticmethod(broken)})
+        errored = args[:1] + ("MBAN01001111111111111111",) + args[2:]
+        try:
+            await cache.validate(*errored, retries=2, delay=0.01)
+            assert False, "CEP errors must propagate"
+        except ConnectionError:
+            pass
+        cep_cache.Transferencia = fake
+        assert await cache.validate(*errored)
+    finally:
+        cep_cache.Transferencia = original
+        await cache.close()
+
+
+def test_cep_cache():
+    asyncio.run(_cep_cache())
+
+
+if __name__ == "__main__":
+    test_cep_cache()
+    print("CEP cache tests passed")
@@ -0,0 +1,69 @@
+import asyncio
+import datetime
+
+import aiosqlite
+
+from src.data.cache.deposit_ledger import DepositLedger
+from src.data.database.deposits.binance_bank_deposit_db import (
+    initialize_database, log_deposit, sum_monthly_deposits, sum_recent_deposits
+)
+
+
+async def _sql_totals(conn, account, buyer=None):
+    DepositLedger._loaded = False
+    try:
+        return await sum_recent_deposits(conn, account, buyer), await sum_monthly_deposits(conn, account, buyer)
+    finally:
+        DepositLedger._loaded = True
+
+
+async def _deposit_ledger():
+    async with aiosqlite.connect(':memory:') as conn:
+        await initialize_database(conn)
+        now = datetime.datetime.now()
+        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        rows = [
+            (start_of_month - datetime.timedelta(days=3), 'acc1', 500.0, 'alice'),  # Last month
+            (start_of_month + datetime.timedelta(minutes=1), 'acc1', 100.0, 'alice'),
+            (now.replace(hour=0, minute=0, second=1), 'acc1', 200.0, 'bob'),
+            (now, 'acc2', 50.0, 'alice'),
+        ]
+        await conn.executemany(
+            "INSERT INTO deposits (timestamp, account_details, amount_deposited, deposit_from, year, month) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(ts, acc, amount, buyer, ts.year, ts.month) for ts, acc, amount, buyer in rows]
+        )
+        await conn.commit()
+
+        await DepositLedger.load(conn)
+        try:
+            await log_deposit(conn, 'alice', 'acc1', 25.0)
+
+            for account, buyer in [('acc1', None), ('acc1', 'alice'), ('acc1', 'bob'), ('acc2', 'alice'), ('acc3', None)]:
+                memory = (await sum_recent_deposits(conn, account, buyer),
+                          await sum_monthly_deposits(conn, account, buyer))
+                assert memory == await _sql_totals(conn, account, buyer), (account, buyer)
+
+            assert DepositLedger.monthly_total('acc1', 'alice') == 125.0
+
+            # Crossing midnight restarts the daily totals only
+            DepositLedger._day = datetime.date.today() - datetime.timedelta(days=1)
+            assert DepositLedger.daily_total('acc1') == 0.0
+            assert DepositLedger.monthly_total('acc1') > 0.0
+
+            # A new month restarts both
+            DepositLedger._day = None
+            DepositLedger._month = (1999, 1)
+            assert DepositLedger.monthly_total('acc1') == 0.0
+        finally:
+            DepositLedger._loaded = False
+            DepositLedger.clear()
+
+
+def test_deposit_ledger():
+    asyncio.run(_deposit_ledger())
+
+
+if __name__ == "__main__":
+    test_deposit_ledger()
+    print("Deposit ledger tests passed")
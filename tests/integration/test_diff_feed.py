@@ -0,0 +1,101 @@
+import asyncio
+
+import src.connectors.bitso.diff_feed as diff_feed
+import src.data.cache.bitso_cache as bitso_cache
+from src.connectors.bitso.diff_feed import DiffOrdersFeed
+
+
+def _snapshot(sequence, bid=18.0, ask=18.2):
+    return {'sequence': str(sequence),
+            'bids': [{'book': 'usdt_mxn', 'price': f"{bid:.2f}", 'amount': '10000'}],
+            'asks': [{'book': 'usdt_mxn', 'price': f"{ask:.2f}", 'amount': '10000'}]}
+
+
+def _bid(price, amount='10000'):
+    return [{'r': f"{price:.2f}", 'a': amount, 's': 'open', 't': 0}]
+
+
+class FakeSnapshots:
+    """Hands out queued snapshots (or exceptions) when the test releases them."""
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        item = await self.queue.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+async def _settle(feed):
+    for _ in range(50):
+        if not feed.syncing:
+            return
+        await asyncio.sleep(0)
+    await asyncio.wait_for(feed.resync_task, 1)
+
+
+def test_buffer_replay_and_gap_resync():
+    async def _async():
+        diff_feed.SNAPSHOT_RETRY_DELAYS = (0,)
+        snapshots = FakeSnapshots()
+        feed = DiffOrdersFeed('usdt_mxn', fetch_snapshot=snapshots)
+
+        # Diffs arriving while the snapshot loads are buffered, then replayed in order
+        await feed.resync()
+        assert bitso_cache.reference_prices['stale'] and feed.stale
+        await feed.on_frame(12, _bid(18.05))
+        await feed.on_frame(11, _bid(18.01))
+        await feed.on_frame(9, _bid(1.0))  # older than the snapshot
+        assert feed.engine.bids.top(1) == [] and len(feed.buffer) == 3
+        snapshots.queue.put_nowait(_snapshot(10))
+        await _settle(feed)
+        assert feed.sequence == 12 and not feed.stale and not feed.buffer
+        assert feed.engine.bids.top(1) == [(18.05, 10000.0)]
+        assert bitso_cache.reference_prices['highest_bid'] == 18.05
+        assert not bitso_cache.reference_prices['stale']
+
+        # Duplicates are ignored, the next sequence is applied directly
+        await feed.on_frame(12, _bid(17.0))
+        await feed.on_frame(13, _bid(18.07))
+        assert feed.sequence == 13 and bitso_cache.reference_prices['highest_bid'] == 18.07
+
+        # A gap flags the book stale but keeps serving it until a snapshot continues the buffer
+        await feed.on_frame(15, _bid(18.09))
+        assert feed.stale and feed.syncing and feed.gaps == 1
+        assert bitso_cache.reference_prices['stale']
+        assert bitso_cache.reference_prices['highest_bid'] == 18.07
+        assert feed.engine.bids.top(1) == [(18.07, 10000.0)]
+        await feed.on_frame(16, _bid(18.11))
+        snapshots.queue.put_nowait(RuntimeError("503"))
+        snapshots.queue.put_nowait(_snapshot(13, bid=18.07))  # does not reach 15: 14 is missing
+        snapshots.queue.put_nowait(_snapshot(14, bid=18.08))
+        await _settle(feed)
+        assert snapshots.calls == 4 and feed.snapshot_failures == 1
+        assert feed.sequence == 16 and not feed.stale
+        assert feed.engine.bids.top(1) == [(18.11, 10000.0)]
+        assert bitso_cache.reference_prices['highest_bid'] == 18.11
+        assert not bitso_cache.reference_prices['stale']
+
+        # A resync (reconnect) whose snapshot is newer than everything buffered
+        await feed.resync()
+        await feed.on_frame(17, _bid(18.13))
+        snapshots.queue.put_nowait(_snapshot(20, bid=18.2))
+        await _settle(feed)
+        assert feed.sequence == 20 and feed.engine.bids.top(1) == [(18.2, 10000.0)]
+        assert feed.stats()['resyncs'] == 3
+        await feed.close()
+
+    delays = diff_feed.SNAPSHOT_RETRY_DELAYS
+    try:
+        asyncio.run(_async())
+    finally:
+        diff_feed.SNAPSHOT_RETRY_DELAYS = delays
+
+
+if __name__ == "__main__":
+    test_buffer_replay_and_gap_resync()
+    print("Diff feed tests passed")
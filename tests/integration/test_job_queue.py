@@ -0,0 +1,111 @@
+import asyncio
+import os
+import tempfile
+from dataclasses import dataclass
+
+import aiosqlite
+
+from src.data.database import job_queue as job_queue_module
+from src.data.database.job_queue import Job, JobQueue
+
+
+@dataclass
+class FlakyJob(Job):
+    JOB_TYPE = 'test_flaky'
+    key: str
+    fail_times: int
+
+    def idempotency_key(self) -> str:
+        return f"{self.JOB_TYPE}:{self.key}"
+
+
+@dataclass
+class PartialWriteJob(Job):
+    JOB_TYPE = 'test_partial_write'
+    key: str
+    mode: str
+
+    def idempotency_key(self) -> str:
+        return f"{self.JOB_TYPE}:{self.key}"
+
+
+async def _job_queue():
+    calls = []
+    handler_conns = []
+
+    async def handle_flaky(job: FlakyJob, conn):
+        calls.append(job.key)
+        if calls.count(job.key) <= job.fail_times:
+            raise RuntimeError("temporary failure")
+
+    async def handle_partial_write(job: PartialWriteJob, conn):
+        handler_conns.append(conn)
+        # Like update_total_spent: a marker row first, the rest after an await
+        await conn.execute("INSERT INTO markers (key) VALUES (?)", (job.key,))
+        if job.mode == 'raise':
+            raise RuntimeError("failed after the marker")
+        if job.mode == 'hang':
+            await asyncio.sleep(10)
+        await conn.commit()
+
+    original_backoff = job_queue_module.BACKOFF_BASE_SECONDS
+    original_timeout = job_queue_module.VISIBILITY_TIMEOUT_SECONDS
+    job_queue_module.BACKOFF_BASE_SECONDS = 0
+    db_dir = tempfile.mkdtemp(prefix='bpa_job_queue_')
+    db_path = os.path.join(db_dir, 'jobs.db')
+    queue = await JobQueue.get_instance()
+    try:
+        await queue.initialize(await aiosqlite.connect(db_path), db_path=db_path)
+        await queue.conn.execute("CREATE TABLE markers (key TEXT)")
+        await queue.conn.commit()
+        queue.register(FlakyJob, handle_flaky)
+        queue.register(PartialWriteJob, handle_partial_write)
+
+        assert await queue.enqueue(FlakyJob('a', fail_times=1))
+        assert not await queue.enqueue(FlakyJob('a', fail_times=1))  # Same idempotency key
+        assert await queue.enqueue(FlakyJob('b', fail_times=5), max_attempts=2)
+
+        while await queue.run_next():
+            pass
+
+        async with queue.conn.execute("SELECT idempotency_key, status, attempts FROM jobs ORDER BY id") as cursor:
+            rows = await cursor.fetchall()
+        assert rows == [('test_flaky:a', 'done', 2), ('test_flaky:b', 'failed', 2)]
+
+        # A running job whose visibility timeout passed is claimed again
+        assert await queue.enqueue(FlakyJob('c', fail_times=0))
+        await queue.conn.execute("UPDATE jobs SET status = 'running', locked_until = 0 WHERE idempotency_key = 'test_flaky:c'")
+        await queue.conn.commit()
+        assert await queue.run_next()
+        assert calls.count('c') == 1
+
+        # Handlers get their own connection, and a failed or timed-out handler
+        # is rolled back: its marker must not be committed along with _fail
+        job_queue_module.VISIBILITY_TIMEOUT_SECONDS = 0.05
+        job_queue_module.BACKOFF_BASE_SECONDS = 60
+        handler_conn = await aiosqlite.connect(db_path)
+        try:
+            for key, mode in (('raised', 'raise'), ('timed_out', 'hang'), ('ok', 'commit')):
+                assert await queue.enqueue(PartialWriteJob(key, mode))
+                assert await queue.run_next(handler_conn)
+        finally:
+            await handler_conn.close()
+        assert all(conn is not queue.conn for conn in handler_conns)
+        async with queue.conn.execute("SELECT key FROM markers") as cursor:
+            assert await cursor.fetchall() == [('ok',)]
+        async with queue.conn.execute(
+                "SELECT status, attempts FROM jobs WHERE job_type = 'test_partial_write' ORDER BY id") as cursor:
+            assert await cursor.fetchall() == [('pending', 1), ('pending', 1), ('done', 1)]
+    finally:
+        job_queue_module.BACKOFF_BASE_SECONDS = original_backoff
+        job_queue_module.VISIBILITY_TIMEOUT_SECONDS = original_timeout
+        await queue.close()
+
+
+def test_job_queue():
+    asyncio.run(_job_queue())
+
+
+if __name__ == "__main__":
+    asyncio.run(_job_queue())
+    print("Job queue tests passed")
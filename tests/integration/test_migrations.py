@@ -0,0 +1,90 @@
+import asyncio
+
+import aiosqlite
+
+from src.customer_service.kyc.blacklist import initialize_database as initialize_blacklist
+from src.data.database.deposits.binance_bank_deposit_db import initialize_database as initialize_deposits
+from src.data.database.migrations import HOT_QUERIES, MIGRATIONS, get_schema_version, run_migrations
+from src.data.database.schema import CREATE_TABLE_STATEMENTS
+
+
+async def _create_tables(conn):
+    for table in ('merchants', 'users', 'orders'):
+        await conn.execute(CREATE_TABLE_STATEMENTS[table])
+    await initialize_blacklist(conn)
+    await initialize_deposits(conn)
+    await conn.commit()
+
+
+async def _migrations():
+    async with aiosqlite.connect(':memory:') as conn:
+        await _create_tables(conn)
+        assert await get_schema_version(conn) == 0
+
+        latest = max(number for number, _, _ in MIGRATIONS)
+        assert await run_migrations(conn) == latest
+        assert await get_schema_version(conn) == latest
+        # Running again is a no-op
+        assert await run_migrations(conn) == latest
+
+        async with conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'") as cursor:
+            assert await cursor.fetchone() is not None, "ANALYZE must have run"
+
+        for sql, params in HOT_QUERIES:
+            async with conn.execute(f"EXPLAIN QUERY PLAN {sql}", params) as cursor:
+                plan = [row[3] for row in await cursor.fetchall()]
+            scans = [step for step in plan if step.startswith('SCAN')]
+            assert not scans, f"Full scan in hot query:\n{sql}\n{plan}"
+
+
+async def _failed_migration_rolls_back():
+    async def broken(conn):
+        await conn.execute("CREATE TABLE should_not_exist (id INTEGER)")
+        raise RuntimeError("boom")
+
+    async with aiosqlite.connect(':memory:') as conn:
+        try:
+            await run_migrations(conn, [(1, "broken", broken)])
+            assert False, "a failing migration must raise"
+        except RuntimeError:
+            pass
+        assert await get_schema_version(conn) == 0
+        async with conn.execute("SELECT name FROM sqlite_master WHERE name = 'should_not_exist'") as cursor:
+            assert await cursor.fetchone() is None
+
+
+async def _table_created_after_first_run():
+    async def index_names(conn):
+        async with conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'") as cursor:
+            return {row[0] for row in await cursor.fetchall()}
+
+    async with aiosqlite.connect(':memory:') as conn:
+        for table in ('merchants', 'users', 'orders'):
+            await conn.execute(CREATE_TABLE_STATEMENTS[table])
+        await conn.commit()
+        latest = await run_migrations(conn)
+        assert 'idx_p2pblacklist_name' not in await index_names(conn)
+
+        # The table appears later; the next start still indexes it
+        await initialize_blacklist(conn)
+        assert await run_migrations(conn) == latest
+        assert 'idx_p2pblacklist_name' in await index_names(conn)
+
+
+def test_migrations_and_query_plans():
+    asyncio.run(_migrations())
+
+
+def test_failed_migration_rolls_back():
+    asyncio.run(_failed_migration_rolls_back())
+
+
+def test_table_created_after_first_run():
+    asyncio.run(_table_created_after_first_run())
+
+
+if __name__ == "__main__":
+    test_migrations_and_query_plans()
+    test_failed_migration_rolls_back()
+    test_table_created_after_first_run()
+    print("Migration tests passed")
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from src.trading_engine.p2p.payment_verification.ocr_engine import OCREngine, OCRQueueFull
+from src.trading_engine.p2p.payment_verification.receipt_preprocessing import OCR_MAX_WIDTH, prepare
+from src.trading_engine.p2p.payment_verification.spei_validation import _ocr_clave, detect_clave, get_bank_handler
+
+
+def _square(x):
+    return x * x
+
+
+def _slow(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+async def _ocr_engine_pool():
+    engine = await OCREngine.get_instance()
+    original_max_queued = engine.max_queued
+    try:
+        results = await asyncio.gather(*(engine.run(_square, i) for i in range(8)))
+        assert results == [i * i for i in range(8)]
+
+        executor = engine.executor
+        workers = list(executor._processes.values())
+        try:
+            await engine.run(_slow, 30, timeout=0.2)
+            assert False, "slow job must time out"
+        except asyncio.TimeoutError:
+            pass
+        # The pool running the abandoned job is recycled, not left busy
+        assert engine.executor is None
+        for process in workers:
+            process.join(5)
+        assert not any(process.is_alive() for process in workers)
+        assert await engine.run(_square, 3) == 9
+
+        engine.max_queued = 0
+        try:
+            await engine.run(_square, 2)
+            assert False, "full queue must reject new jobs"
+        except OCRQueueFull:
+            pass
+    finally:
+        engine.max_queued = original_max_queued
+        await engine.close()
+
+
+def test_ocr_engine_pool():
+    asyncio.run(_ocr_engine_pool())
+
+
+def test_parse_clave_de_rastreo():
+    bbva_text = "Clave de rastreo\nMBAN01002411280012345678\n"
+    assert get_bank_handler("BBVA").parse_clave_de_rastreo(bbva_text) == "MBAN01002411280012345678"
+    nu_text = "Clave de rastreo NU39ABCDEFGHIJKLMNOPQRSTUVWX"
+    assert get_bank_handler("NU").parse_clave_de_rastreo(nu_text) == "NU39ABCDEFGHIJKLMNOPQRSTUVWX"
+
+
+def test_detect_clave_across_banks():
+    # A NU receipt from a buyer who said BBVA
+    nu_text = "Transferencia enviada\nClave de rastreo\nNU39ABCDEFGHIJKLMNOPQRSTUVWX\n"
+    assert detect_clave(nu_text, 'BBVA') == ('NU', "NU39ABCDEFGHIJKLMNOPQRSTUVWX")
+
+    bbva_text = "Clave de rastreo\nMBAN01002411280012345678\nFolio 12345"
+    assert detect_clave(bbva_text) == ('BBVA', "MBAN01002411280012345678")
+
+    banorte_text = "Clave de rastreo\n8846541CP0ABCD1234\n"
+    assert detect_clave(banorte_text, None) == ('BANORTE', "8846541CP0ABCD1234")
+
+    # A clave next to the label wins over an unrelated match elsewhere
+    mixed = "Referencia 1234567CP0XYZ12\nClave de rastreo\nMBAN01002411280012345678"
+    assert detect_clave(mixed, 'BANORTE')[0] == 'BBVA'
+
+    assert detect_clave("Transferencia enviada\nImporte $1,500.00") is None
+
+
+class _FakeOCR:
+    """Stands in for OCREngine: the region pass returns `roi_text`, the full page `page_text`."""
+
+    def __init__(self, roi_text, page_text=''):
+        self.roi_text = roi_text
+        self.page_text = page_text
+        self.calls = []
+
+    async def read_receipt(self, data, bank, config='', full_page_fallback=True):
+        self.calls.append((bank, full_page_fallback))
+        return self.roi_text if bank is not None else self.page_text
+
+
+async def _clave_passes():
+    original = OCREngine._instance
+    try:
+        # The region already holds the clave: no full-page pass
+        fake = OCREngine._instance = _FakeOCR("Clave de rastreo\nMBAN01002411280012345678\n")
+        assert await _ocr_clave(b'img', 'BBVA') == ('BBVA', "MBAN01002411280012345678")
+        assert fake.calls == [('BBVA', False)]
+
+        # It does not: exactly one full-page pass
+        fake = OCREngine._instance = _FakeOCR("Importe $1,500.00", "Clave de rastreo\nMBAN01002411280012345678\n")
+        assert await _ocr_clave(b'img', 'BBVA') == ('BBVA', "MBAN01002411280012345678")
+        assert fake.calls == [('BBVA', False), (None, True)]
+    finally:
+        OCREngine._instance = original
+
+
+def test_clave_full_page_only_when_needed():
+    asyncio.run(_clave_passes())
+
+
+def test_receipt_preprocessing():
+    image = Image.new('RGB', (2200, 4000), (250, 250, 250))
+    ImageDraw.Draw(image).text((100, 2000), "Clave de rastreo MBAN01002411280012345678", fill=(20, 20, 20))
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG')
+
+    page, roi, timings = prepare(buffer.getvalue(), 'BBVA')
+    assert page.mode == 'L' and page.width <= OCR_MAX_WIDTH
+    assert {value for value, count in enumerate(page.histogram()) if count} <= {0, 255}
+    assert roi is not None and roi.height < page.height
+    assert 'decode_ms' in timings and 'preprocess_ms' in timings
+
+    # Banks without a template only get the full page
+    assert prepare(buffer.getvalue(), 'OTHER')[1] is None
+
+
+if __name__ == "__main__":
+    asyncio.run(_ocr_engine_pool())
+    test_parse_clave_de_rastreo()
+    test_detect_clave_across_banks()
+    test_clave_full_page_only_when_needed()
+    test_receipt_preprocessing()
+    print("OCR engine tests passed")
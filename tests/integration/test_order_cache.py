@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from src.data.cache import order_cache
+from src.data.cache.order_cache import OrderCache
+
+
+def _reset_cache():
+    OrderCache._orders.clear()
+    OrderCache._hits = 0
+    OrderCache._misses = 0
+    OrderCache._evictions = 0
+
+
+async def _cache_roundtrip():
+    _reset_cache()
+    row = {'orderNumber': 'TEST_1', 'buyerName': 'TestBuyer', 'orderStatus': 1,
+           'totalPrice': 1500.0, 'remark': 'not cached', 'commission': 0.1}
+    await OrderCache.set_order('TEST_1', row)
+
+    cached = await OrderCache.get_order('TEST_1')
+    assert cached['buyerName'] == 'TestBuyer'
+    assert 'remark' not in cached and 'commission' not in cached
+
+    assert await OrderCache.update_fields('TEST_1', {'anti_fraud_stage': 2})
+    assert (await OrderCache.get_order('TEST_1'))['anti_fraud_stage'] == 2
+    assert not await OrderCache.update_fields('MISSING', {'anti_fraud_stage': 2})
+
+    await OrderCache.remove_order('TEST_1')
+    assert await OrderCache.get_order('TEST_1') is None
+
+    stats = OrderCache.stats()
+    assert stats['hits'] == 2 and stats['misses'] == 1 and stats['size'] == 0
+
+
+async def _cache_eviction():
+    _reset_cache()
+    original_max = order_cache.MAX_CACHED_ORDERS
+    order_cache.MAX_CACHED_ORDERS = 3
+    try:
+        for i in range(4):
+            await OrderCache.set_order(f'TEST_{i}', {'orderNumber': f'TEST_{i}'})
+        # TEST_0 is the least recently used and must be gone
+        assert await OrderCache.get_order('TEST_0') is None
+        assert await OrderCache.get_order('TEST_3') is not None
+    finally:
+        order_cache.MAX_CACHED_ORDERS = original_max
+
+    # Age an entry past the idle limit and sweep it
+    OrderCache._orders['TEST_1'].last_access = time.monotonic() - 2 * 60 * 60
+    assert await OrderCache.clear_old_orders(max_age_minutes=60) == 1
+    assert 'TEST_1' not in OrderCache._orders
+
+
+def test_order_cache_roundtrip():
+    asyncio.run(_cache_roundtrip())
+
+
+def test_order_cache_eviction():
+    asyncio.run(_cache_eviction())
+
+
+if __name__ == "__main__":
+    asyncio.run(_cache_roundtrip())
+    asyncio.run(_cache_eviction())
+    print("Order cache tests passed")
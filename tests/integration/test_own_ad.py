@@ -0,0 +1,65 @@
+import json
+
+from src.data.cache.own_ad import OwnAd, parse_pay_types
+
+
+def _raw(advNo='1', **fields):
+    raw = {'advNo': advNo, 'target_spot': '3', 'asset_type': 'USDT', 'price': '18.52', 'floating_ratio': None,
+           'account': 'account_1', 'surplused_amount': '12.5', 'fiat': None, 'transAmount': '5000',
+           'payTypes': json.dumps(['BBVABank', 'OXXO']), 'Group': '1', 'trade_type': 'SELL',
+           'minTransAmount': 'bad'}
+    raw.update(fields)
+    return raw
+
+
+def test_parse_once():
+    ad = OwnAd.parse(_raw())
+    assert ad.target_spot == 3 and ad.price == 18.52 and ad.floating_ratio == 0.0
+    assert ad.transAmount == 5000 and ad.surplused_amount == 12.5 and ad.minTransAmount == 0
+    assert ad.fiat == 'MXN' and ad.last_updated is None
+    assert ad.payTypes == ('BBVABank', 'OXXO')
+    # Parsing an OwnAd again is free
+    assert OwnAd.parse(ad) is ad
+
+    # Identical payTypes are shared, whatever shape they came in
+    other = OwnAd.parse(_raw('2', payTypes=['BBVABank', 'OXXO']))
+    assert other.payTypes is ad.payTypes
+    assert parse_pay_types('OXXO') == ('OXXO',)
+    assert parse_pay_types(None) is None and parse_pay_types('') is None
+    assert parse_pay_types('[]') == ()
+
+    try:
+        OwnAd.parse({'price': 1})
+        assert False, "an ad needs an advNo"
+    except ValueError:
+        pass
+
+
+def test_mapping_and_read_only():
+    ad = OwnAd.parse(_raw())
+    assert ad['asset_type'] == 'USDT' and ad.get('Group') == '1' and ad.get('nope') is None
+    assert 'price' in ad and 'nope' not in ad
+    assert list(dict(ad)) == list(ad.to_dict()) and len(ad) == 14
+    assert not hasattr(ad, '__dict__')
+
+    try:
+        ad.price = 1.0
+        assert False, "OwnAd must be read-only"
+    except AttributeError:
+        pass
+
+    updated = ad.replace(floating_ratio='101.25', target_spot=1.0)
+    assert updated.floating_ratio == 101.25 and updated.target_spot == 1
+    assert ad.floating_ratio == 0.0
+    assert updated.payTypes is ad.payTypes
+    try:
+        ad.replace(not_a_field=1)
+        assert False, "unknown fields are rejected"
+    except KeyError:
+        pass
+
+
+if __name__ == "__main__":
+    test_parse_once()
+    test_mapping_and_read_only()
+    print("OwnAd tests passed")
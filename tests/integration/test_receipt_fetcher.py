@@ -0,0 +1,77 @@
+import asyncio
+from io import BytesIO
+
+from aiohttp import web
+from PIL import Image
+
+from src.data.cache.share_data import SharedSession
+from src.trading_engine.p2p.payment_verification.receipt_fetcher import ReceiptFetcher
+
+
+def _png() -> bytes:
+    buffer = BytesIO()
+    Image.new('RGB', (200, 400), (250, 250, 250)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+async def _receipt_fetcher():
+    png = _png()
+    in_flight = {'now': 0, 'max': 0}
+
+    async def receipt(request):
+        in_flight['now'] += 1
+        in_flight['max'] = max(in_flight['max'], in_flight['now'])
+        await asyncio.sleep(0.05)
+        in_flight['now'] -= 1
+        return web.Response(body=png, content_type='image/png')
+
+    async def html(request):
+        return web.Response(text='<html>login</html>', content_type='text/html')
+
+    async def huge(request):
+        response = web.StreamResponse(headers={'Content-Type': 'image/jpeg'})
+        await response.prepare(request)
+        for _ in range(64):
+            await response.write(b'\xff\xd8\xff' + b'\0' * 4096)
+        return response
+
+    app = web.Application()
+    app.router.add_get('/receipt.png', receipt)
+    app.router.add_get('/page', html)
+    app.router.add_get('/huge.jpg', huge)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+    original_max_bytes = ReceiptFetcher.max_bytes
+    original_semaphore = ReceiptFetcher._semaphore
+    ReceiptFetcher._semaphore = asyncio.Semaphore(2)
+    try:
+        results = await asyncio.gather(*(ReceiptFetcher.fetch(f"{base}/receipt.png") for _ in range(6)))
+        assert all(result == png for result in results)
+        assert in_flight['max'] == 2
+
+        assert await ReceiptFetcher.fetch(f"{base}/page", retries=1) is None
+
+        ReceiptFetcher.max_bytes = 64 * 1024
+        assert await ReceiptFetcher.fetch(f"{base}/huge.jpg", retries=1) is None
+
+        stats = ReceiptFetcher.stats()
+        assert stats['download_ms'] > 0 and 'queue_wait_ms' in stats
+        assert stats['failures'] >= 2
+    finally:
+        ReceiptFetcher.max_bytes = original_max_bytes
+        ReceiptFetcher._semaphore = original_semaphore
+        await SharedSession.close_session()
+        await runner.cleanup()
+
+
+def test_receipt_fetcher():
+    asyncio.run(_receipt_fetcher())
+
+
+if __name__ == "__main__":
+    test_receipt_fetcher()
+    print("Receipt fetcher tests passed")
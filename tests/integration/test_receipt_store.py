@@ -0,0 +1,78 @@
+import asyncio
+import os
+import tempfile
+from io import BytesIO
+
+import aiosqlite
+from PIL import Image, ImageDraw
+
+from src.trading_engine.p2p.payment_verification.receipt_preprocessing import perceptual_hash
+from src.trading_engine.p2p.payment_verification.receipt_store import ReceiptStore, sha256_hex
+
+
+def _receipt(clave: str, image_format: str = 'PNG', quality: int = 95) -> bytes:
+    image = Image.new('RGB', (1080, 2200), (250, 250, 250))
+    draw = ImageDraw.Draw(image)
+    draw.text((60, 1000), "Clave de rastreo", fill=(90, 90, 90))
+    draw.text((60, 1100), clave, fill=(20, 20, 20))
+    for y in range(1200, 1800, 80):
+        draw.rectangle((60, y, 60 + (hash(clave + str(y)) % 900), y + 30), fill=(40, 40, 40))
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, quality=quality)
+    return buffer.getvalue()
+
+
+async def _receipt_store():
+    with tempfile.TemporaryDirectory() as receipt_dir:
+        conn = await aiosqlite.connect(':memory:')
+        store = ReceiptStore(receipt_dir=receipt_dir, max_bytes=10 ** 9)
+        try:
+            await store.initialize(conn)
+
+            original = _receipt("MBAN01002411280012345678")
+            sha256 = sha256_hex(original)
+            record = await store.add(original, sha256, perceptual_hash(original, 'BBVA'), 'BBVA',
+                                     "MBAN01002411280012345678", 'order-1', 'alice')
+            await store.remember_url('https://example.com/a.png', sha256)
+            assert os.path.exists(os.path.join(receipt_dir, f"{sha256}.img"))
+
+            assert (await store.lookup_url('https://example.com/a.png')).clave == "MBAN01002411280012345678"
+            assert (await store.lookup_bytes(sha256)).sha256 == sha256
+            assert await store.lookup_url('https://example.com/other.png') is None
+
+            # A re-encoded copy of the same screenshot matches perceptually
+            recompressed = _receipt("MBAN01002411280012345678", 'JPEG', quality=60)
+            assert await store.lookup_bytes(sha256_hex(recompressed)) is None
+            similar = await store.lookup_similar(perceptual_hash(recompressed, 'BBVA'), "MBAN01002411280012345678")
+            assert similar is not None and similar.sha256 == sha256
+
+            # A different receipt from the same bank looks alike but carries another clave
+            different = _receipt("BNET01009988776655443322")
+            assert await store.lookup_similar(perceptual_hash(different, 'BBVA'), "BNET01009988776655443322") is None
+            assert await store.lookup_similar(perceptual_hash(different, 'BBVA'), None) is None
+
+            # Same order presenting it twice is fine, another order or buyer is flagged
+            assert not await store.record_use(record, 'order-1', 'alice')
+            assert not await store.record_use(record, 'order-1', 'alice')
+            assert await store.record_use(record, 'order-2', 'bob')
+
+            await store.set_validated(sha256, True)
+            assert (await store.lookup_bytes(sha256)).validated is True
+
+            # Shrinking the budget evicts the image file but keeps the metadata
+            store.max_bytes = 0
+            await store._evict()
+            assert not os.path.exists(os.path.join(receipt_dir, f"{sha256}.img"))
+            assert store.stored_bytes == 0
+            assert (await store.lookup_bytes(sha256)).clave == "MBAN01002411280012345678"
+        finally:
+            await store.close()
+
+
+def test_receipt_store():
+    asyncio.run(_receipt_store())
+
+
+if __name__ == "__main__":
+    test_receipt_store()
+    print("Receipt store tests passed")
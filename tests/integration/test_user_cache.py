@@ -0,0 +1,62 @@
+import asyncio
+
+import aiosqlite
+
+from src.customer_service.kyc.blacklist import initialize_database
+from src.data.cache.user_cache import UserProfileCache
+from src.data.database.operations.binance_db_get import get_buyer_bank, get_kyc_status
+from src.data.database.operations.binance_db_set import update_kyc_status
+from src.data.database.operations.write_behind import WriteBehindJournal
+
+
+async def _create_tables(conn):
+    await conn.execute("""
+        CREATE TABLE users (
+            name TEXT UNIQUE, kyc_status INTEGER DEFAULT 0, total_crypto_sold_lifetime REAL DEFAULT 0.0,
+            anti_fraud_stage INTEGER DEFAULT 0, user_bank TEXT, usd_verification_stage INTEGER DEFAULT 0,
+            language_preference TEXT, language_selection_stage INTEGER DEFAULT 0
+        )
+    """)
+    await initialize_database(conn)
+    await conn.execute("INSERT INTO users (name, kyc_status, user_bank) VALUES ('Buyer', 1, 'bbva')")
+    await conn.commit()
+
+
+async def _profile_cache():
+    UserProfileCache.invalidate()
+    async with aiosqlite.connect(':memory:') as conn:
+        await _create_tables(conn)
+
+        assert await UserProfileCache.warm(conn) == 1
+        assert await get_kyc_status(conn, 'Buyer') == 1
+        assert await get_kyc_status(conn, 'Unknown') is None
+
+        # Writes through the setters and the journal are visible immediately
+        await update_kyc_status(conn, 'Buyer', 2)
+        WriteBehindJournal.record_user('Buyer', user_bank='nu')
+        assert await get_kyc_status(conn, 'Buyer') == 2
+        assert await get_buyer_bank(conn, 'Buyer') == 'nu'
+
+        # A reload after invalidation still sees the unflushed journal value
+        UserProfileCache.invalidate('Buyer')
+        assert await get_buyer_bank(conn, 'Buyer') == 'nu'
+        await WriteBehindJournal.flush(conn)
+
+        # A write landing while the profile loads is not lost to the older row
+        UserProfileCache.invalidate('Buyer')
+        load = asyncio.create_task(UserProfileCache.get_profile(conn, 'Buyer'))
+        await asyncio.sleep(0)  # the load is now waiting on its SELECT
+        WriteBehindJournal.record_user('Buyer', language_preference='es')
+        profile = await load
+        assert profile.language_preference == 'es' and profile.user_bank == 'nu'
+        assert not UserProfileCache._loading
+        await WriteBehindJournal.flush(conn)
+
+
+def test_user_profile_cache():
+    asyncio.run(_profile_cache())
+
+
+if __name__ == "__main__":
+    asyncio.run(_profile_cache())
+    print("User profile cache tests passed")
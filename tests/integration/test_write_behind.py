@@ -0,0 +1,91 @@
+import asyncio
+
+import aiosqlite
+
+from src.customer_service.kyc.blacklist import initialize_database
+from src.data.cache.order_cache import OrderCache
+from src.data.cache.user_cache import UserProfileCache
+from src.data.database.operations.binance_db_get import get_kyc_status, get_order_details
+from src.data.database.operations.write_behind import WriteBehindJournal
+
+
+async def _create_tables(conn):
+    await conn.execute("""
+        CREATE TABLE users (
+            name TEXT UNIQUE, kyc_status INTEGER DEFAULT 0, total_crypto_sold_lifetime REAL DEFAULT 0.0,
+            anti_fraud_stage INTEGER DEFAULT 0, user_bank TEXT, usd_verification_stage INTEGER DEFAULT 0,
+            language_preference TEXT, language_selection_stage INTEGER DEFAULT 0
+        )
+    """)
+    await conn.execute("""
+        CREATE TABLE orders (
+            orderNumber TEXT UNIQUE, buyerName TEXT, orderStatus INTEGER,
+            account_number TEXT, seller_bank TEXT
+        )
+    """)
+    await initialize_database(conn)
+    await conn.execute("INSERT INTO orders (orderNumber, buyerName, orderStatus) VALUES ('ORD_1', 'Buyer', 1)")
+    await conn.commit()
+
+
+async def _journal_flush():
+    UserProfileCache.invalidate()
+    async with aiosqlite.connect(':memory:') as conn:
+        await _create_tables(conn)
+
+        WriteBehindJournal.record_user('Buyer', anti_fraud_stage=1)
+        WriteBehindJournal.record_user('Buyer', anti_fraud_stage=3, kyc_status=2)
+        WriteBehindJournal.record_order('ORD_1', orderStatus=4, account_number='1234', seller_bank='nvio')
+
+        # Pending values are visible before the flush
+        assert await get_kyc_status(conn, 'Buyer') == 2
+        assert (await get_order_details(conn, 'ORD_1'))['orderStatus'] == 4
+
+        assert await WriteBehindJournal.flush(conn) == 2
+        assert WriteBehindJournal.pending_rows() == 0
+
+        async with conn.execute("SELECT kyc_status, anti_fraud_stage FROM users WHERE name = 'Buyer'") as cursor:
+            assert await cursor.fetchone() == (2, 3)
+        async with conn.execute("SELECT orderStatus, account_number, seller_bank FROM orders") as cursor:
+            assert await cursor.fetchone() == (4, '1234', 'nvio')
+
+        try:
+            WriteBehindJournal.record_order('ORD_1', not_a_column=1)
+            assert False, "unknown columns must be rejected"
+        except ValueError:
+            pass
+
+
+async def _order_sync_keeps_unset_fields():
+    UserProfileCache.invalidate()
+    async with aiosqlite.connect(':memory:') as conn:
+        await _create_tables(conn)
+        await conn.execute("INSERT INTO users (name, kyc_status, user_bank) VALUES ('Buyer', 1, 'bbva')")
+        await conn.commit()
+
+        # orders.buyer_bank is never populated, so the cached order carries None
+        await OrderCache.set_order('ORD_1', {'orderNumber': 'ORD_1', 'buyerName': 'Buyer', 'orderStatus': 4,
+                                             'buyer_bank': None, 'kyc_status': None})
+        assert await OrderCache.sync_to_db(conn, 'ORD_1')
+        assert 'user_bank' not in WriteBehindJournal.pending_fields('users', 'Buyer')
+        await WriteBehindJournal.flush(conn)
+        await OrderCache.remove_order('ORD_1')
+
+        async with conn.execute("SELECT kyc_status, user_bank FROM users WHERE name = 'Buyer'") as cursor:
+            assert await cursor.fetchone() == (1, 'bbva')
+        async with conn.execute("SELECT orderStatus FROM orders WHERE orderNumber = 'ORD_1'") as cursor:
+            assert await cursor.fetchone() == (4,)
+
+
+def test_write_behind_flush():
+    asyncio.run(_journal_flush())
+
+
+def test_order_sync_keeps_unset_fields():
+    asyncio.run(_order_sync_keeps_unset_fields())
+
+
+if __name__ == "__main__":
+    asyncio.run(_journal_flush())
+    asyncio.run(_order_sync_keeps_unset_fields())
+    print("Write-behind journal tests passed")